@@ -0,0 +1,611 @@
+# api.py
+# HTTP/JSON API over criminals, officers, cases and evidence for multi-client access. One process
+# holds the database credentials and the shared connection pool; an asyncio server parses requests
+# and hands each query to a thread pool sized to the connection pool (the drivers are blocking).
+# Stdlib only.
+#
+#   python api.py --port 8080
+#   python api.py --backend sqlite --sqlite-path crimetrack.db --no-auth
+import argparse
+import asyncio
+import base64
+import binascii
+import contextvars
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, urlsplit
+
+import crimetrack
+
+API_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "workers": None,         # query threads; defaults to DB_CONFIG["pool_size"]
+    "auth": True,            # HTTP Basic against the users table
+    "auth_ttl": 60,          # seconds a checked login is remembered
+    "max_body": 1 << 20,     # largest request body in bytes
+    "page_max": 500,         # largest ?limit on list endpoints
+    "keepalive": 15,         # seconds an idle client connection stays open
+}
+VERSION_WINDOW = 1000  # newest change_log entries counted into the ETag (see data_version)
+
+log = logging.getLogger("crimetrack.api")
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+REASONS = {100: "Continue", 200: "OK", 201: "Created", 204: "No Content", 206: "Partial Content",
+           304: "Not Modified", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 411: "Length Required", 413: "Payload Too Large",
+           416: "Range Not Satisfiable", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# ------------- Database bridge -------------
+_workers = None
+_request_user = contextvars.ContextVar("request_user", default=None)  # set by authenticate
+
+def _with_connection(tag, user, work):
+    with crimetrack.query_tag(tag), crimetrack.audit_user(user):
+        conn = crimetrack.get_pool().acquire()
+        try:
+            return work(conn)
+        finally:
+            conn.close()
+
+async def run_db(tag, work):
+    # work(conn) runs on a query thread with a pooled connection, its writes audited as the
+    # request's user; the event loop keeps serving
+    return await asyncio.get_running_loop().run_in_executor(_workers, _with_connection, tag, _request_user.get(), work)
+
+def data_version(conn):
+    # changes to the record tables, for ETags: the newest change_log seq plus how many of the last
+    # VERSION_WINDOW entries exist, so a transaction that commits after a higher seq still changes it.
+    # Reads at most VERSION_WINDOW keys from the primary key.
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COALESCE(MAX(seq), 0), COUNT(*) FROM "
+                    "(SELECT seq FROM change_log ORDER BY seq DESC LIMIT %s) newest", (VERSION_WINDOW,))
+        high, n = cur.fetchone()
+        return f'W/"{high}-{n}"'
+    finally:
+        cur.close()
+
+def conditional(tag, request, build):
+    # GET helper: 304 without running build(conn) when the client's ETag is still current
+    def work(conn):
+        etag = data_version(conn)
+        if etag in request.if_none_match:
+            return 304, None, {"ETag": etag}
+        return 200, build(conn), {"ETag": etag}
+    return run_db(tag, work)
+
+# ------------- Auth -------------
+_logins = {}  # keyed HMAC of (username, password) -> time checked; no plaintext passwords are kept
+_logins_key = os.urandom(32)
+_logins_lock = threading.Lock()
+
+def _credentials(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        username, sep, password = base64.b64decode(token).decode("utf-8").partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return (username, password) if sep else None
+
+async def authenticate(request):
+    if not API_CONFIG.get("auth"):
+        return
+    creds = _credentials(request)
+    challenge = {"WWW-Authenticate": 'Basic realm="crimetrack"'}
+    if creds is None:
+        raise HTTPError(401, "Login required", challenge)
+    now = time.monotonic()
+    key = hmac.new(_logins_key, "\0".join(creds).encode("utf-8"), hashlib.sha256).digest()
+    with _logins_lock:
+        checked = _logins.get(key)
+    if checked is not None and now - checked < API_CONFIG.get("auth_ttl", 0):
+        _request_user.set(creds[0])
+        return
+    ok = await run_db("api.login", lambda conn: conn.storage.check_login(conn, *creds))
+    with _logins_lock:
+        if ok:
+            _logins[key] = now
+        else:
+            _logins.pop(key, None)
+    if not ok:
+        raise HTTPError(401, "Invalid username or password", challenge)
+    _request_user.set(creds[0])
+
+# ------------- Handlers -------------
+def _record(table, row):
+    return dict(zip(["id"] + crimetrack.TABLES[table].columns, row))
+
+def _int_param(request, name, default, lo=0, hi=None):
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+    if value < lo or (hi is not None and value > hi):
+        raise HTTPError(400, f"{name} must be between {lo} and {hi}")
+    return value
+
+def _encode_cursor(cursor):
+    raw = json.dumps(cursor, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(token):
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return value, int(last_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPError(400, "Invalid cursor")
+
+async def list_records(request, table):
+    # keyset pages: ?search=&sort=&desc=1&limit=&cursor=<next from the previous page>;
+    # archive=1 includes archived records, each row then says whether it is
+    limit = _int_param(request, "limit", crimetrack.PAGE_SIZE, 1, API_CONFIG.get("page_max", 500))
+    pager = crimetrack.RecordPager(table, crimetrack.TABLES[table].fields, pagesize=limit)
+    pager.set_search(request.query.get("search", ""))
+    sort = request.query.get("sort", "id")
+    if sort not in pager.columns:
+        raise HTTPError(400, f"Cannot sort by {sort}")
+    pager.set_sort(sort, request.query.get("desc") in ("1", "true"))
+    pager.set_include_archive(request.query.get("archive") in ("1", "true"))
+    cursor = _decode_cursor(request.query["cursor"]) if request.query.get("cursor") else None
+    def record(row):
+        if pager.include_archive:
+            return dict(_record(table, row), archived=bool(row[-1]))
+        return _record(table, row)
+    def build(conn):
+        rows, after = pager.page_after(conn, cursor)
+        return {"rows": [record(r) for r in rows], "next": _encode_cursor(after) if after else None}
+    return await conditional(f"api.list.{table}", request, build)
+
+async def get_record(request, table, record_id):
+    def build(conn):
+        found = conn.storage.get_versioned(conn, table, int(record_id))
+        if found is None:
+            raise HTTPError(404, f"No {table} record with id {record_id}")
+        return dict(_record(table, (int(record_id),) + found[0]), version=found[1])
+    return await conditional(f"api.get.{table}", request, build)
+
+async def create_record(request, table):
+    vals = crimetrack.record_values(table, request.json())
+    with_id = len(vals) > len(crimetrack.TABLES[table].columns)
+    def work(conn):
+        new_id = conn.storage.insert_record(conn, table, vals, with_id=with_id)
+        new_id = vals[0] if with_id else new_id
+        matches = []
+        if table == "criminals" and crimetrack.MATCH_CONFIG.get("check_on_add", True):
+            matches = crimetrack.find_identity_matches(conn, *vals[with_id:with_id + 3], exclude=new_id)
+            crimetrack.record_identity_matches(conn, new_id, matches)
+        conn.commit()
+        return new_id, matches
+    new_id, matches = await run_db(f"api.create.{table}", work)
+    body = {"id": int(new_id)}
+    if matches:
+        # the record is created either way; clients show these for review
+        body["possible_duplicates"] = [dict(_record(table, row), score=score) for score, row in matches]
+    return 201, body, {"Location": f"/api/{table}/{new_id}"}
+
+async def update_record(request, table, record_id):
+    # PUT and PATCH both merge the given columns into the stored row and write only those that
+    # change. With "version" (from GET) the write only happens while the record is still at it;
+    # otherwise 409 with the current record and a field-level diff.
+    changes = request.json()
+    version = changes.pop("version", None) if isinstance(changes, dict) else None
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        raise HTTPError(400, "version must be an integer")
+    def work(conn):
+        found = conn.storage.get_versioned(conn, table, int(record_id))
+        if found is None:
+            raise HTTPError(404, f"No {table} record with id {record_id}")
+        current, current_version = found
+        vals = crimetrack.record_values(table, changes, current)
+        try:
+            if version is not None and version != current_version:
+                raise crimetrack.RecordConflict(table, int(record_id), version, current, current_version)
+            conn.storage.update_columns(conn, table, int(record_id), crimetrack.changed_columns(table, vals, current),
+                                        version)
+        except crimetrack.RecordConflict as e:
+            named = {str(k).strip().lower().replace(" ", "_") for k in changes}
+            yours = {c: v for c, v in zip(crimetrack.TABLES[table].columns, vals) if c in named}
+            return 409, {"error": str(e), "version": e.current_version,
+                         "current": _record(table, (int(record_id),) + tuple(e.current)),
+                         "conflicts": [{"column": c, "yours": mine, "current": now}
+                                       for c, _, mine, now in crimetrack.record_diff(table, yours, e.current)]}
+        row, current_version = conn.storage.get_versioned(conn, table, int(record_id))
+        conn.commit()
+        return 200, dict(_record(table, (int(record_id),) + row), version=current_version)
+    status, body = await run_db(f"api.update.{table}", work)
+    return status, body, {}
+
+async def delete_record(request, table, record_id):
+    def work(conn):
+        n = conn.storage.delete_record(conn, table, int(record_id))
+        conn.commit()
+        return n
+    if not await run_db(f"api.delete.{table}", work):
+        raise HTTPError(404, f"No {table} record with id {record_id}")
+    return 204, None, {}
+
+async def search(request):
+    text = request.query.get("q", "").strip()
+    if not text:
+        raise HTTPError(400, "q is required")
+    limit = _int_param(request, "limit", crimetrack.SEARCH_PAGE_SIZE, 1, API_CONFIG.get("page_max", 500))
+    offset = _int_param(request, "offset", 0)
+    def build(conn):
+        total, rows = crimetrack.search_records(conn, text, limit=limit, offset=offset)
+        keys = ("source", "id", "title", "snippet", "score")
+        return {"total": total, "results": [dict(zip(keys, r)) for r in rows]}
+    return await conditional("api.search", request, build)
+
+async def audit(request):
+    # ?user=&table=&record_id=&since=&until=&limit=&cursor=; newest first. Not conditional:
+    # entries land after the change they describe
+    table = request.query.get("table")
+    if table is not None and table not in crimetrack.COUNT_TABLES:
+        raise HTTPError(400, f"Unknown table: {table}")
+    record_id = _int_param(request, "record_id", 0, 1) if "record_id" in request.query else None
+    if record_id is not None and table is None:
+        raise HTTPError(400, "record_id needs table")
+    limit = _int_param(request, "limit", crimetrack.AUDIT_CONFIG.get("page", 100), 1, API_CONFIG.get("page_max", 500))
+    since = crimetrack.audit_bound(request.query.get("since"))
+    until = crimetrack.audit_bound(request.query.get("until"), end=True)
+    cursor = _decode_cursor(request.query["cursor"]) if request.query.get("cursor") else None
+    def work(conn):
+        return crimetrack.query_audit(conn, request.query.get("user"), table, record_id, since, until, cursor, limit)
+    rows, after = await run_db("api.audit", work)
+    entries = [{**dict(zip(crimetrack.AUDIT_FIELDS[:7], r[:7])), "before": json.loads(r[7]) if r[7] else None,
+                "after": json.loads(r[8]) if r[8] else None} for r in rows]
+    return 200, {"entries": entries, "next": _encode_cursor(after) if after else None}, {}
+
+# ------------- Attachments -------------
+# Files move between the socket and the attachment store without being held in memory: uploads
+# arrive a chunk at a time (the route is in STREAMED, so its body is not read up front) and are
+# written by a file thread; downloads go out with loop.sendfile (zero-copy on plain sockets).
+def _attachment(row):
+    return {**dict(zip(crimetrack.ATTACHMENT_FIELDS, row)), "url": f"/api/attachments/{row[0]}"}
+
+async def _attachment_row(attachment_id):
+    row = await run_db("api.attachments.get", lambda conn: crimetrack.get_attachment(conn, int(attachment_id)))
+    if row is None:
+        raise HTTPError(404, f"No attachment with id {attachment_id}")
+    return row
+
+def _byte_range(header, size):
+    # [start, end) of a single "bytes=a-b", "bytes=a-" or "bytes=-n" range; None to send the whole
+    # file (no range, several ranges, or one we do not parse)
+    m = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if m is None or m.groups() == ("", ""):
+        return None
+    first, last = m.groups()
+    if first:
+        start, end = int(first), min(int(last) + 1, size) if last else size
+    else:
+        start, end = max(0, size - int(last)), size
+    if start >= end:
+        raise HTTPError(416, "Range not satisfiable", {"Content-Range": f"bytes */{size}"})
+    return start, end
+
+async def list_attachments(request, evidence_id):
+    def work(conn):
+        crimetrack.require_evidence(conn, int(evidence_id))
+        return crimetrack.list_attachments(conn, int(evidence_id))
+    rows = await run_db("api.attachments.list", work)
+    return 200, {"attachments": [_attachment(r) for r in rows]}, {}
+
+async def upload_attachment(request, evidence_id):
+    # the raw file as the body (Content-Length required), named by ?filename=; Content-Type is kept
+    # unless it is missing or generic
+    filename = request.query.get("filename", "").strip()
+    if not filename:
+        raise HTTPError(400, "filename is required")
+    if "content-length" not in request.headers:
+        raise HTTPError(411, "Content-Length is required")
+    store = crimetrack.get_attachment_store()
+    if request.remaining > store.max_size:
+        raise HTTPError(413, f"Attachments are limited to {store.max_size} bytes")
+    await run_db("api.attachments.check", lambda conn: crimetrack.require_evidence(conn, int(evidence_id)))
+    loop = asyncio.get_running_loop()
+    upload = await loop.run_in_executor(None, store.upload)
+    try:
+        async for chunk in request.body_chunks(store.chunk):
+            await loop.run_in_executor(None, upload.write, chunk)
+        sha256, size, stored = await loop.run_in_executor(None, upload.finish)
+    except BaseException:
+        upload.abort()
+        raise
+    def work(conn):
+        attachment_id = crimetrack.add_attachment(conn, int(evidence_id), sha256, size, filename,
+                                                  request.headers.get("content-type"))
+        conn.commit()
+        return attachment_id
+    attachment_id = await run_db("api.attachments.add", work)
+    return 201, {"id": attachment_id, "sha256": sha256, "size": size, "deduplicated": not stored}, \
+        {"Location": f"/api/attachments/{attachment_id}"}
+
+async def download_attachment(request, attachment_id):
+    # the file itself; supports If-None-Match and a single Range (resumed downloads, video seeking)
+    row = await _attachment_row(attachment_id)
+    path = crimetrack.get_attachment_store().path(row[5])
+    if not os.path.exists(path):
+        raise HTTPError(404, f"File of attachment {attachment_id} is missing from the store")
+    ascii_name = row[2].encode("ascii", "replace").decode().replace('"', "'")
+    headers = {"ETag": f'"{row[5]}"', "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=86400",
+               "Content-Disposition": f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(row[2])}"}
+    if headers["ETag"] in request.if_none_match:
+        return 304, None, headers
+    status, (start, end) = 200, (0, row[4])
+    byte_range = _byte_range(request.headers["range"], row[4]) if "range" in request.headers else None
+    if byte_range is not None:
+        status, (start, end) = 206, byte_range
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{row[4]}"
+    return status, Body(row[3] or "application/octet-stream", path=path, start=start, end=end), headers
+
+async def attachment_thumbnail(request, attachment_id):
+    # PNG scaled to fit ?size= (default ATTACHMENT_CONFIG["thumb_size"]); 404 for non-images
+    size = _int_param(request, "size", crimetrack.ATTACHMENT_CONFIG.get("thumb_size", 160), 16, 1024)
+    row = await _attachment_row(attachment_id)
+    etag = f'"{row[5]}-{size}"'
+    if etag in request.if_none_match:
+        return 304, None, {"ETag": etag}
+    thumb = await asyncio.get_running_loop().run_in_executor(None, crimetrack.thumbnail_cache.get, row[5], size)
+    if thumb is None:
+        raise HTTPError(404, f"No thumbnail for attachment {attachment_id}")
+    return 200, Body("image/png", thumb), {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+
+async def delete_attachment(request, attachment_id):
+    def work(conn):
+        n = crimetrack.delete_attachment(conn, int(attachment_id))
+        conn.commit()
+        return n
+    if not await run_db("api.attachments.delete", work):
+        raise HTTPError(404, f"No attachment with id {attachment_id}")
+    return 204, None, {}
+
+async def counts(request):
+    return await conditional("api.counts", request,
+                             lambda conn: conn.storage.count_records(conn, crimetrack.COUNT_TABLES))
+
+TABLE = "(" + "|".join(crimetrack.COUNT_TABLES) + ")"
+# (method, path pattern, handler); path groups are passed to the handler
+ROUTES = [
+    ("GET", r"/api/counts", counts),
+    ("GET", r"/api/search", search),
+    ("GET", r"/api/audit", audit),
+    ("GET", rf"/api/{TABLE}", list_records),
+    ("POST", rf"/api/{TABLE}", create_record),
+    ("GET", rf"/api/{TABLE}/(\d+)", get_record),
+    ("PUT", rf"/api/{TABLE}/(\d+)", update_record),
+    ("PATCH", rf"/api/{TABLE}/(\d+)", update_record),
+    ("DELETE", rf"/api/{TABLE}/(\d+)", delete_record),
+    ("GET", r"/api/evidence/(\d+)/attachments", list_attachments),
+    ("POST", r"/api/evidence/(\d+)/attachments", upload_attachment),
+    ("GET", r"/api/attachments/(\d+)", download_attachment),
+    ("DELETE", r"/api/attachments/(\d+)", delete_attachment),
+    ("GET", r"/api/attachments/(\d+)/thumbnail", attachment_thumbnail),
+]
+ROUTES = [(method, re.compile(pattern), handler) for method, pattern, handler in ROUTES]
+# routes whose handler streams the request body itself (Request.body_chunks)
+STREAMED = [("POST", re.compile(r"/api/evidence/\d+/attachments"))]
+
+# ------------- HTTP server -------------
+class Request:
+    def __init__(self, method, target, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path.rstrip("/") or "/"
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+        self.if_none_match = {t.strip() for t in headers.get("if-none-match", "").split(",") if t.strip()}
+        self.reader = self.writer = None
+        self.remaining = 0  # unread body bytes of a STREAMED request
+
+    async def body_chunks(self, size):
+        # the body of a STREAMED request, size bytes at a time
+        if self.remaining and self.headers.get("expect", "").lower() == "100-continue":
+            self.writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await self.writer.drain()
+        while self.remaining:
+            chunk = await self.reader.readexactly(min(size, self.remaining))
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+async def dispatch(request):
+    allowed = []
+    for method, pattern, handler in ROUTES:
+        m = pattern.fullmatch(request.path)
+        if m is None:
+            continue
+        if method != request.method:
+            allowed.append(method)
+            continue
+        await authenticate(request)
+        return await handler(request, *m.groups())
+    if allowed:
+        raise HTTPError(405, "Method not allowed", {"Allow": ", ".join(allowed)})
+    raise HTTPError(404, "Not found")
+
+async def respond(request):
+    # (status, payload, headers); exceptions become JSON error bodies
+    try:
+        return await dispatch(request)
+    except HTTPError as e:
+        return e.status, {"error": str(e)}, e.headers
+    except (ConnectionError, asyncio.IncompleteReadError):
+        raise  # the client went away mid-body
+    except ValueError as e:
+        return 400, {"error": str(e)}, {}
+    except LookupError as e:
+        return 404, {"error": str(e)}, {}
+    except (crimetrack.mysql.connector.IntegrityError, crimetrack.sqlite3.IntegrityError) as e:
+        return 409, {"error": str(e)}, {}
+    except (crimetrack.mysql.connector.DataError, crimetrack.sqlite3.DataError) as e:
+        return 400, {"error": str(e)}, {}
+    except crimetrack.mysql.connector.errors.PoolError as e:
+        return 503, {"error": str(e)}, {"Retry-After": "1"}
+    except Exception:
+        log.exception("%s %s failed", request.method, request.path)
+        return 500, {"error": "Internal error"}, {}
+
+class Body:
+    # a non-JSON response body: bytes in memory, or bytes [start, end) of a file sent with sendfile
+    def __init__(self, content_type, data=b"", path=None, start=0, end=0):
+        self.content_type = content_type
+        self.data = data
+        self.path, self.start, self.end = path, start, end
+
+    def __len__(self):
+        return len(self.data) if self.path is None else self.end - self.start
+
+    async def send(self, writer):
+        if self.path is None:
+            writer.write(self.data)
+            return
+        await writer.drain()
+        if len(self) == 0:
+            return  # sendfile would read to end of file
+        with open(self.path, "rb") as f:
+            await asyncio.get_running_loop().sendfile(writer.transport, f, self.start, self.end - self.start)
+
+def _head(status, content_type, length, headers, keep_alive):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    if content_type:
+        lines.append(f"Content-Type: {content_type}")
+    lines.append(f"Content-Length: {length}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+def _response(status, payload, headers, keep_alive):
+    body = b"" if payload is None else json.dumps(payload, default=str, separators=(",", ":")).encode()
+    return _head(status, "application/json" if payload is not None else None, len(body), headers, keep_alive) + body
+
+async def handle_client(reader, writer):
+    # HTTP/1.1 with keep-alive; one request at a time per connection
+    keepalive = API_CONFIG.get("keepalive", 15)
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), keepalive)
+            except asyncio.TimeoutError:
+                break
+            if not line.strip():
+                break
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(400, {"error": "Bad request line"}, {}, False))
+                break
+            headers = {}
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if "transfer-encoding" in headers:
+                # bodies are framed by Content-Length only; a chunked body left unread would be parsed
+                # as the next request, so answer and drop the connection before dispatching
+                writer.write(_response(411, {"error": "Content-Length is required (Transfer-Encoding is not supported)"},
+                                       {}, False))
+                break
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            request = Request(method.upper(), target, headers, b"")
+            if length >= 0 and any(m == request.method and p.fullmatch(request.path) for m, p in STREAMED):
+                request.reader, request.writer, request.remaining = reader, writer, length
+            elif length < 0 or length > API_CONFIG.get("max_body", 1 << 20):
+                writer.write(_response(413 if length > 0 else 400, {"error": "Bad or oversized body"}, {}, False))
+                break
+            elif length:
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                request.body = await reader.readexactly(length)
+            status, payload, extra = await respond(request)
+            if request.remaining:
+                keep_alive = False  # the handler answered without reading the whole body
+            if isinstance(payload, Body):
+                writer.write(_head(status, payload.content_type, len(payload), extra, keep_alive))
+                await payload.send(writer)
+            else:
+                writer.write(_response(status, payload, extra, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host, port, ready=None):
+    server = await asyncio.start_server(handle_client, host, port, reuse_address=True)
+    log.warning("CrimeTrack API listening on http://%s:%s", host, server.sockets[0].getsockname()[1])
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    global _workers
+    parser = argparse.ArgumentParser(description="CrimeTrack HTTP API")
+    parser.add_argument("--host", default=API_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=API_CONFIG["port"])
+    parser.add_argument("--backend", choices=tuple(crimetrack.STORAGE_BACKENDS), help="override DB_CONFIG['backend']")
+    parser.add_argument("--sqlite-path", help="override DB_CONFIG['sqlite_path']")
+    parser.add_argument("--workers", type=int, default=API_CONFIG["workers"])
+    parser.add_argument("--no-auth", action="store_true", help="serve without HTTP Basic login (local testing)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    if args.backend:
+        crimetrack.DB_CONFIG["backend"] = args.backend
+    if args.sqlite_path:
+        crimetrack.DB_CONFIG["sqlite_path"] = args.sqlite_path
+    if args.no_auth:
+        API_CONFIG["auth"] = False
+    # one query thread per pooled connection, so requests queue here rather than in pool.acquire()
+    workers = args.workers or crimetrack.DB_CONFIG.get("pool_size", 5)
+    _workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+    conn = crimetrack.get_pool().acquire()
+    try:
+        crimetrack.migrate(conn)
+    finally:
+        conn.close()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _workers.shutdown(wait=False, cancel_futures=True)
+        crimetrack.close_pool()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
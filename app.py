@@ -1,21 +1,40 @@
 # criminal_dbms_ui.py
+# desktop app; the database layer and the command line live in crimetrack.py
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # command-line use runs the headless CLI without loading the GUI toolkit
+    from crimetrack import cli
+    sys.exit(cli(sys.argv[1:]))
+
+import base64
 import json
+import logging
 import os
-import mysql.connector
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import filedialog, messagebox, simpledialog
 import ttkbootstrap as tb
-from ttkbootstrap.tableview import Tableview
-from datetime import datetime
+from crimetrack import (
+    ARCHIVED_TABLES, ARCHIVE_CONFIG, AUDIT_CONFIG, COUNT_TABLES, DB_ERRORS, INSTRUMENT_CONFIG, MATCH_CONFIG, PAGE_SIZE,
+    REPLICA_CONFIG, REPORT_CONFIG, RecordConflict, RecordPager, SEARCH_PAGE_SIZE, TABLES, approximate_tables,
+    archive_records, attach_file, attachment_preview, audit_bound, audit_changes, batch_preview, bulk_import,
+    changed_columns, close_pool, close_replica, delete_attachment, dossier_cache, dump_query_stats,
+    find_duplicates, find_identity_matches, format_import_stats, format_match, format_size, format_sync_stats,
+    get_attachment_store, get_counts, get_fields_for_table, get_pool, get_replica, invalidate_caches,
+    list_attachments, list_identity_matches, load_dossier, load_reports, log, migrate, parse_ids, pool_stats,
+    query_audit, query_stats, query_tag, record_diff, record_identity_matches, refresh_replica, require_evidence,
+    run_batch, search_records, set_audit_user, thumbnail_cache,
+)
 
 # ------------- CONFIG -------------
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "your_password_here",
-    "database": "criminal_db"
-}
+# database, pool and feature settings are in crimetrack.py
 OFFICIAL_FILE = "official_account.json"
+DB_WORKERS = 4  # background threads running queries for the UI
+POLL_MS = 30    # how often the Tk loop collects finished queries
+PREVIEW_PX = 320  # longest side of attachment image previews
 
 # ------------- Globals -------------
 root = None
@@ -23,77 +42,163 @@ current_user = None  # username of logged-in user
 
 # ------------- DB Helpers (unchanged logic) -------------
 def get_connection():
+    # borrows a pooled connection; callers still call conn.close() to hand it back
     try:
-        return mysql.connector.connect(**DB_CONFIG)
-    except mysql.connector.Error as err:
+        return get_pool().acquire()
+    except DB_ERRORS as err:
         messagebox.showerror("Database Error", f"Error connecting: {err}")
         return None
 
+# ------------- Background queries -------------
+class QueryTask:
+    # handle for one submitted query; cancel() drops the result and kills the running statement
+    def __init__(self, executor, busy, tag, replica=None):
+        self._executor = executor
+        self.tag = tag
+        self.replica = replica
+        self._lock = threading.Lock()
+        self.busy = busy
+        self.cancelled = False
+        self.conn = None  # set while the query runs; guarded by _lock
+        self.owner_tasks = None
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self._executor.kill(self)
+
+class QueryExecutor:
+    # runs DB work on worker threads and hands results back to the Tk loop via root.after,
+    # so button callbacks never block on MySQL
+    def __init__(self, workers=DB_WORKERS):
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._results = queue.Queue()
+        self._pending = 0
+        self._polling = False
+
+    def submit(self, fn, on_done=None, on_error=None, owner=None, busy=(), tag=None, replica=None):
+        # fn(conn) runs on a worker with a pooled connection; callbacks run on the Tk thread.
+        # Destroying owner cancels the query; busy widgets are disabled while it runs;
+        # tag labels its statements in the query stats (defaults to the submitting function).
+        # replica="read" serves fn from the local replica when one is enabled; replica="write"
+        # runs fn on the server and falls back to the replica's offline queue when it is unreachable.
+        tag = tag or fn.__qualname__.split(".")[0]
+        task = QueryTask(self, [(w, _set_busy(w)) for w in busy], tag, replica)
+        if owner is not None:
+            tasks = getattr(owner, "_query_tasks", None)
+            if tasks is None:
+                tasks = owner._query_tasks = set()
+                owner.bind("<Destroy>", lambda e: [t.cancel() for t in list(tasks)] if e.widget is owner else None, add="+")
+            tasks.add(task)
+            task.owner_tasks = tasks
+        self._pending += 1
+        self._workers.submit(self._run, task, fn, on_done, on_error or _show_query_error)
+        if not self._polling:
+            self._polling = True
+            root.after(POLL_MS, self._poll)
+        return task
+
+    def _run(self, task, fn, on_done, on_error):
+        if task.cancelled:
+            self._results.put((task, None, None))
+            return
+        conn = None
+        try:
+            with query_tag(task.tag):
+                conn = self._connect(task)
+                task.conn = conn
+                outcome = (on_done, fn(conn))
+                if task.replica == "write":
+                    refresh_replica(conn)
+        except Exception as e:
+            outcome = (on_error, e)
+        finally:
+            # a concurrent kill() holds the task lock while its KILL is in flight,
+            # so the connection cannot be reused under it
+            with task._lock:
+                task.conn = None
+            if conn is not None:
+                conn.close()
+        self._results.put((task,) + outcome)
+
+    def _connect(self, task):
+        replica = get_replica()
+        if replica is None or task.replica is None:
+            return get_pool().acquire()
+        if task.replica == "read" and replica.ready:
+            return replica.pool.acquire()
+        try:
+            conn = get_pool().acquire()
+        except DB_ERRORS as e:
+            if not replica.ready:
+                raise
+            replica.set_online(False, e)
+            return replica.pool.acquire()
+        replica.set_online(True)
+        return conn
+
+    def _poll(self):
+        while True:
+            try:
+                task, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if task.owner_tasks is not None:
+                task.owner_tasks.discard(task)
+            for widget, state in task.busy:
+                _set_busy(widget, state)
+            if task.cancelled or callback is None:
+                continue
+            try:
+                callback(value)
+            except Exception as e:
+                _show_query_error(e)
+        if self._pending:
+            root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def kill(self, task):
+        conn = task.conn
+        if conn is None:
+            return
+        threading.Thread(target=conn.storage.cancel, args=(task,), daemon=True).start()
+
+    def shutdown(self):
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+def _set_busy(widget, state=None):
+    # disable a widget while a query runs; returns the state to restore afterwards
+    try:
+        previous = str(widget.cget("state"))
+        widget.configure(state=state or "disabled")
+        return previous
+    except tk.TclError:
+        return None
+
+def _show_query_error(err):
+    messagebox.showerror("Error", str(err))
+
+_executor = None
+
+def run_query(fn, on_done=None, on_error=None, owner=None, busy=(), tag=None, replica=None):
+    global _executor
+    if _executor is None:
+        _executor = QueryExecutor()
+    return _executor.submit(fn, on_done=on_done, on_error=on_error, owner=owner, busy=busy, tag=tag, replica=replica)
+
 def init_db():
     conn = get_connection()
     if conn is None: 
         return
-    cur = conn.cursor()
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            password VARCHAR(50) NOT NULL
-        )
-    ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS criminals (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(100) NOT NULL,
-            age INT,
-            gender VARCHAR(10),
-            crime VARCHAR(255),
-            crime_date DATE,
-            status VARCHAR(50)
-        )
-    ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS officers (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(100) NOT NULL,
-            officer_rank VARCHAR(50),
-            department VARCHAR(100)
-        )
-    ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS cases (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            case_name VARCHAR(100) NOT NULL,
-            case_date DATE,
-            description TEXT,
-            officer_id INT,
-            FOREIGN KEY (officer_id) REFERENCES officers(id) ON DELETE SET NULL
-        )
-    ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS evidence (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            case_id INT,
-            evidence_type VARCHAR(100),
-            description TEXT,
-            FOREIGN KEY (case_id) REFERENCES cases(id) ON DELETE CASCADE
-        )
-    ''')
-    # create simple index if missing (non-destructive)
     try:
-        cur.execute("""
-            SELECT COUNT(1)
-            FROM INFORMATION_SCHEMA.STATISTICS
-            WHERE table_schema=DATABASE() AND table_name='criminals' AND index_name='idx_criminal_name'
-        """)
-        if cur.fetchone()[0] == 0:
-            cur.execute('CREATE INDEX idx_criminal_name ON criminals(name)')
-    except Exception:
-        pass
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        with query_tag("init_db"):
+            migrate(conn)
+    except DB_ERRORS as e:
+        messagebox.showerror("Database Error", f"Schema migration failed: {e}")
+    finally:
+        conn.close()
 
 # ------------- UI Helpers -------------
 def card_frame(parent, width=420, padx=14, pady=14):
@@ -129,39 +234,23 @@ def signup_user(uname, pwd):
     if not uname or not pwd:
         messagebox.showwarning("Input Error", "Enter username and password")
         return False
-    conn = get_connection()
-    if conn is None:
-        return False
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO users (username, password) VALUES (%s,%s)", (uname, pwd))
+    def work(conn):
+        conn.storage.create_user(conn, uname, pwd)
         conn.commit()
-        messagebox.showinfo("Success", "User registered! You can login now.")
-        return True
-    except mysql.connector.Error as e:
-        messagebox.showerror("Error", f"Error: {e}")
-        return False
-    finally:
-        cur.close()
-        conn.close()
+    run_query(work, tag="signup_user",
+              on_done=lambda _: messagebox.showinfo("Success", "User registered! You can login now."),
+              on_error=lambda e: messagebox.showerror("Error", f"Error: {e}"))
+    return True
 
 def change_password(username):
     # Simple dialog to change password
     new = simpledialog.askstring("Change Password", "Enter new password:", show="*")
     if not new:
         return
-    conn = get_connection()
-    if conn is None: return
-    cur = conn.cursor()
-    try:
-        cur.execute("UPDATE users SET password=%s WHERE username=%s", (new, username))
+    def work(conn):
+        conn.storage.set_password(conn, username, new)
         conn.commit()
-        messagebox.showinfo("Success", "Password changed.")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-    finally:
-        cur.close()
-        conn.close()
+    run_query(work, tag="change_password", on_done=lambda _: messagebox.showinfo("Success", "Password changed."))
 
 # ------------- CRUD (UI wrappers preserve DB logic) -------------
 def add_record(table_name, fields):
@@ -171,30 +260,34 @@ def add_record(table_name, fields):
             messagebox.showwarning("Input Error", "Fill all fields")
             return
         # convert dates if field name has Date
-        for i,f in enumerate(fields):
-            if "Date" in f:
-                try:
-                    vals[i] = datetime.strptime(vals[i], "%Y-%m-%d").date()
-                except Exception:
-                    messagebox.showerror("Input Error", f"Invalid date for {f} (use YYYY-MM-DD)")
-                    return
-        cols = ", ".join([f.lower().replace(" ","_") for f in fields])
-        placeholders = ", ".join(["%s"]*len(fields))
-        query = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
         try:
-            conn = get_connection()
-            if conn is None: return
-            cur = conn.cursor()
-            cur.execute(query, vals)
+            TABLES[table_name].convert_dates(vals)
+        except ValueError as e:
+            messagebox.showerror("Input Error", f"Invalid date for {e} (use YYYY-MM-DD)")
+            return
+        check = table_name == "criminals" and MATCH_CONFIG.get("check_on_add", True)
+        def work(conn):
+            new_id = conn.storage.insert_record(conn, table_name, vals)
+            if check:
+                record_identity_matches(conn, new_id, find_identity_matches(conn, *vals[:3], exclude=new_id))
             conn.commit()
+            invalidate_caches()
+        def done(_):
             messagebox.showinfo("Success", f"{table_name.capitalize()} added.")
             add_win.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-        finally:
-            try:
-                cur.close(); conn.close()
-            except Exception: pass
+        def insert(matches=()):
+            if matches:
+                lines = "\n".join(format_match(score, row) for score, row in matches[:10])
+                if not messagebox.askyesno("Possible Duplicate", f"This may be a criminal already on record:\n\n{lines}"
+                                           "\n\nAdd as a new record anyway?", parent=add_win):
+                    return
+            run_query(work, on_done=done, busy=[save_btn], tag="add_record", replica="write")
+        if check:
+            # a failed check must not block the insert
+            run_query(lambda conn: find_identity_matches(conn, *vals[:3]), on_done=insert, on_error=lambda e: insert(),
+                      owner=add_win, busy=[save_btn], tag="add_record.match", replica="read")
+        else:
+            insert()
 
     add_win = tb.Toplevel(root)
     add_win.title(f"Add {table_name.capitalize()}")
@@ -209,8 +302,10 @@ def add_record(table_name, fields):
         ent = tb.Entry(container)
         ent.pack(fill="x", pady=(0,6))
         entries.append(ent)
-    tb.Button(container, text="💾 Save", bootstyle="success", command=save).pack(pady=12)
+    save_btn = tb.Button(container, text="💾 Save", bootstyle="success", command=save)
+    save_btn.pack(pady=12)
 
+# ------------- Record views -------------
 def view_records(table_name, fields):
     view = tb.Toplevel(root)
     view.title(f"{table_name.capitalize()} Records")
@@ -219,44 +314,234 @@ def view_records(table_name, fields):
     frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     tb.Label(container, text=f"{table_name.capitalize()} Records", font=("Segoe UI", 14, "bold")).pack(pady=(4,8))
-    coldata = [{"text":"ID","stretch":False}] + [{"text":f} for f in fields]
-    rows = []
-    try:
-        conn = get_connection()
-        if conn is None: return
-        cur = conn.cursor()
-        cols = ", ".join([f.lower().replace(" ","_") for f in fields])
-        cur.execute(f"SELECT id, {cols} FROM {table_name}")
-        rows = cur.fetchall()
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-        return
-    finally:
-        try: cur.close(); conn.close()
-        except: pass
+    pager = RecordPager(table_name, fields)
+    headings = ["ID"] + list(fields)
 
-    table = Tableview(container, coldata=coldata, rowdata=rows, paginated=True, pagesize=12, searchable=True)
-    table.pack(fill="both", expand=True, padx=6, pady=6)
+    search_row = tb.Frame(container)
+    search_row.pack(fill="x", padx=6, pady=(0,6))
+    tb.Label(search_row, text="Search:", font=("Segoe UI", 10, "bold")).pack(side="left")
+    search_entry = tb.Entry(search_row)
+    search_entry.pack(side="left", fill="x", expand=True, padx=6)
+    archive_var = tk.BooleanVar(value=False)
+    if table_name in ARCHIVED_TABLES:
+        tb.Checkbutton(search_row, text="Include archive", variable=archive_var, bootstyle="round-toggle",
+                       command=lambda: toggle_archive()).pack(side="right", padx=(10,0))
+
+    tree = tb.Treeview(container, columns=pager.columns, show="headings", height=PAGE_SIZE, selectmode="extended")
+    for col, text in zip(pager.columns, headings):
+        tree.heading(col, text=text, command=lambda c=col: sort_by(c))
+        tree.column(col, width=70 if col == "id" else 160, stretch=(col != "id"))
+    tree.tag_configure("archived", foreground="#6c757d")
+    tree.pack(fill="both", expand=True, padx=6, pady=6)
+    selected = set()  # ids picked across pages; Ctrl/Shift-click adds to it (archived rows are read-only)
+
+    def live(item):
+        return "archived" not in tree.item(item, "tags")
+
+    def on_select(event=None):
+        page_ids = {int(tree.item(i, "values")[0]) for i in tree.get_children()}
+        picked = {int(tree.item(i, "values")[0]) for i in tree.selection() if live(i)}
+        selected.difference_update(page_ids - picked)
+        selected.update(picked)
+        show_status()
+    tree.bind("<<TreeviewSelect>>", on_select)
+    if table_name == "cases":
+        tree.bind("<Double-1>", lambda e: show_dossier(tree.item(tree.identify_row(e.y), "values")[0])
+                  if tree.identify_row(e.y) and live(tree.identify_row(e.y)) else None)
+
+    nav = tb.Frame(container)
+    nav.pack(fill="x", padx=6, pady=(0,6))
+    prev_btn = tb.Button(nav, text="◀ Prev", bootstyle="outline", width=10)
+    prev_btn.pack(side="left")
+    next_btn = tb.Button(nav, text="Next ▶", bootstyle="outline", width=10)
+    next_btn.pack(side="left", padx=6)
+    status = tb.Label(nav, text="", foreground="#6c757d")
+    status.pack(side="right")
+
+    batch = tb.Frame(container)
+    batch.pack(fill="x", padx=6, pady=(0,6))
+    scope = tk.StringVar(value="selected")
+    selected_radio = tb.Radiobutton(batch, variable=scope, value="selected", text="Selected rows")
+    selected_radio.pack(side="left")
+    matching_radio = tb.Radiobutton(batch, variable=scope, value="matching", text="All matching rows")
+    matching_radio.pack(side="left", padx=10)
+    tb.Button(batch, text="Clear selection", bootstyle="link",
+              command=lambda: (selected.clear(), tree.selection_remove(*tree.selection()), show_status())).pack(side="left")
+    batch_delete_btn = tb.Button(batch, text="🗑 Delete", bootstyle="danger-outline", width=10,
+                                 command=lambda: batch_action("delete"))
+    batch_delete_btn.pack(side="right")
+    batch_update_btn = tb.Button(batch, text="✏ Set field…", bootstyle="warning-outline", width=12,
+                                 command=lambda: batch_action("update"))
+    batch_update_btn.pack(side="right", padx=6)
+
+    def show_status():
+        archived = " incl. archive (grey)" if pager.include_archive else ""
+        status.configure(text=f"Page {pager.page_index + 1} of {pager.page_count} · {pager.total or 0} records{archived}")
+        selected_radio.configure(text=f"Selected rows ({len(selected)})")
+        where = f" “{pager.search}”" if pager.search else ""
+        matching_radio.configure(text=f"All {pager.total or 0} rows matching{where}")
+
+    def render():
+        tree.delete(*tree.get_children())
+        width = len(pager.columns)
+        for row in pager.rows:
+            archived = len(row) > width and row[width]
+            item = tree.insert("", "end", values=["" if v is None else v for v in row[:width]],
+                               tags=("archived",) if archived else ())
+            if row[0] in selected and not archived:
+                tree.selection_add(item)
+        for col, text in zip(pager.columns, headings):
+            mark = (" ▼" if pager.descending else " ▲") if col == pager.sort_col else ""
+            tree.heading(col, text=text + mark)
+        prev_btn.configure(state="normal" if pager.page_index > 0 else "disabled")
+        next_btn.configure(state="normal" if pager.has_next else "disabled")
+        show_status()
+
+    loading = []
+
+    def run(action):
+        # one page load at a time; the pager is only touched by that worker until it finishes
+        if loading: return
+        loading.append(True)
+        status.configure(text="Loading…")
+        def done(_):
+            loading.clear()
+            render()
+        def failed(e):
+            loading.clear()
+            status.configure(text="")
+            messagebox.showerror("Error", str(e))
+        # the archive tables are only on the server
+        run_query(action, on_done=done, on_error=failed, owner=view, busy=[prev_btn, next_btn, search_btn],
+                  tag="view_records", replica=None if pager.include_archive else "read")
+
+    def do_search(event=None):
+        if loading: return
+        pager.set_search(search_entry.get())
+        run(pager.first_page)
+
+    def toggle_archive():
+        if loading:
+            archive_var.set(pager.include_archive)
+            return
+        pager.set_include_archive(archive_var.get())
+        run(pager.first_page)
+
+    def batch_action(op):
+        ids = sorted(selected) if scope.get() == "selected" else None
+        if ids is not None and not ids:
+            messagebox.showinfo("Batch", "Select rows first (Ctrl/Shift-click), or choose all matching rows.", parent=view)
+            return
+        change = None
+        if op == "update":
+            change = ask_field_change(view, table_name, fields)
+            if change is None:
+                return
+        # preview on a snapshot of the search so paging in the view cannot change the target
+        target = None if ids is not None else RecordPager(table_name, fields)
+        if target is not None:
+            target.set_search(pager.search)
+        def confirm(count):
+            if not count:
+                messagebox.showinfo("Batch", "No rows to change.", parent=view)
+                return
+            if op == "delete":
+                what = f"Delete {count} {table_name}?"
+            else:
+                what = f"Set {change[0]} to “{'' if change[1] is None else change[1]}” on {count} {table_name}?"
+            if not messagebox.askyesno("Confirm", what, parent=view):
+                return
+            def work(conn):
+                if change is None:
+                    return run_batch(conn, table_name, op, ids=ids, pager=target)
+                return run_batch(conn, table_name, op, ids=ids, pager=target,
+                                 column=TABLES[table_name].column_of[change[0]], value=change[1])
+            def done(n):
+                messagebox.showinfo("Batch", f"{n} {table_name} {'deleted' if op == 'delete' else 'updated'}.", parent=view)
+                selected.clear()
+                pager.set_search(pager.search)
+                run(pager.first_page)
+            run_query(work, on_done=done, busy=[batch_delete_btn, batch_update_btn], tag=f"batch_{op}", replica="write")
+        run_query(lambda conn: batch_preview(conn, table_name, ids=ids, pager=target), on_done=confirm,
+                  owner=view, busy=[batch_delete_btn, batch_update_btn], tag="batch_preview", replica="read")
+
+    def sort_by(col):
+        if loading: return
+        pager.set_sort(col, descending=(col == pager.sort_col and not pager.descending))
+        run(pager.first_page)
+
+    prev_btn.configure(command=lambda: run(pager.prev_page))
+    next_btn.configure(command=lambda: run(pager.next_page))
+    search_entry.bind("<Return>", do_search)
+    search_btn = tb.Button(search_row, text="Search", bootstyle="info", command=do_search)
+    search_btn.pack(side="left")
+    run(pager.first_page)
+
+def ask_field_change(parent, table_name, fields):
+    # modal picker for a batch update: returns (field, value) with dates converted, or None
+    result = []
+    win = tb.Toplevel(parent)
+    win.title(f"Update {table_name.capitalize()}")
+    win.geometry("420x260")
+    win.transient(parent)
+    f, c, inner = card_frame(win, width=400)
+    f.pack(fill="both", expand=True, padx=10, pady=10)
+    tb.Label(inner, text="Field:", font=("Segoe UI", 11)).pack(anchor="w")
+    field = tb.Combobox(inner, values=list(fields), state="readonly")
+    field.current(len(fields) - 1)
+    field.pack(fill="x", pady=(2,8))
+    tb.Label(inner, text="New value (empty for none):", font=("Segoe UI", 11)).pack(anchor="w")
+    value = tb.Entry(inner)
+    value.pack(fill="x", pady=(2,8))
+    def ok():
+        new = value.get().strip() or None
+        if new is not None:
+            try:
+                new = TABLES[table_name].convert_date(field.get(), new)
+            except ValueError as e:
+                messagebox.showerror("Input Error", f"Invalid date for {e} (use YYYY-MM-DD)", parent=win)
+                return
+        result.append((field.get(), new))
+        win.destroy()
+    tb.Button(inner, text="Continue", bootstyle="warning", command=ok).pack(fill="x", pady=(6,0))
+    win.grab_set()
+    win.wait_window()
+    return result[0] if result else None
 
 def delete_record(table_name):
     def do_delete():
         cid = id_entry.get().strip()
         if not cid.isdigit():
-            messagebox.showerror("Input Error", "Enter valid ID")
-            return
-        try:
-            conn = get_connection()
-            if conn is None: return
-            cur = conn.cursor()
-            cur.execute(f"DELETE FROM {table_name} WHERE id=%s", (cid,))
+            try:
+                ids = parse_ids(cid)
+            except ValueError:
+                ids = []
+            if len(ids) < 2:
+                messagebox.showerror("Input Error", "Enter valid ID")
+                return
+            return delete_many(ids)
+        def work(conn):
+            conn.storage.delete_record(conn, table_name, cid)
             conn.commit()
+            invalidate_caches()
+        def done(_):
             messagebox.showinfo("Deleted", f"Record ID {cid} deleted.")
             del_win.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-        finally:
-            try: cur.close(); conn.close()
-            except: pass
+        run_query(work, on_done=done, busy=[delete_btn], tag="delete_record", replica="write")
+
+    def delete_many(ids):
+        # ids and ranges ("4, 7, 10-20"): count first, then one batch
+        def confirm(count):
+            if not count:
+                messagebox.showinfo("Delete", "None of those IDs exist.", parent=del_win)
+            elif messagebox.askyesno("Confirm", f"Delete {count} {table_name}?", parent=del_win):
+                run_query(lambda conn: run_batch(conn, table_name, "delete", ids=ids), on_done=done,
+                          busy=[delete_btn], tag="batch_delete", replica="write")
+        def done(n):
+            messagebox.showinfo("Deleted", f"{n} records deleted.")
+            del_win.destroy()
+        run_query(lambda conn: batch_preview(conn, table_name, ids=ids), on_done=confirm, owner=del_win,
+                  busy=[delete_btn], tag="batch_preview", replica="read")
 
     del_win = tb.Toplevel(root)
     del_win.title(f"Delete {table_name.capitalize()}")
@@ -265,65 +550,105 @@ def delete_record(table_name):
     frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     tb.Label(container, text=f"Delete {table_name.capitalize()}", font=("Segoe UI", 14, "bold")).pack(pady=(4,8))
-    tb.Label(container, text="Enter ID to Delete:", font=("Segoe UI", 11)).pack(anchor="w")
+    tb.Label(container, text="Enter ID(s) to Delete (e.g. 4, 7, 10-20):", font=("Segoe UI", 11)).pack(anchor="w")
     id_entry = tb.Entry(container)
     id_entry.pack(fill="x", pady=8)
-    tb.Button(container, text="🗑 Delete", bootstyle="danger", command=do_delete).pack()
+    delete_btn = tb.Button(container, text="🗑 Delete", bootstyle="danger", command=do_delete)
+    delete_btn.pack()
+
+def update_record(table_name, fields, record_id=None):
+    loaded = {}  # the record as last loaded: id, row, version
+
+    def fill(cid, row, version):
+        loaded.update(id=cid, row=row, version=version)
+        for i,v in enumerate(row):
+            entries[i].delete(0, tk.END)
+            entries[i].insert(0, v if v is not None else "")
 
-def update_record(table_name, fields):
     def load_data():
         cid = id_entry.get().strip()
         if not cid.isdigit():
             messagebox.showerror("Input Error", "Enter valid ID")
             return
-        try:
-            conn = get_connection()
-            if conn is None: return
-            cur = conn.cursor()
-            cols = ", ".join([f.lower().replace(" ","_") for f in fields])
-            cur.execute(f"SELECT {cols} FROM {table_name} WHERE id=%s", (cid,))
-            row = cur.fetchone()
-            if not row:
+        def work(conn):
+            return conn.storage.get_versioned(conn, table_name, cid)
+        def done(found):
+            if not found:
                 messagebox.showerror("Not Found", "No record found")
                 return
-            for i,v in enumerate(row):
-                entries[i].delete(0, tk.END)
-                entries[i].insert(0, v if v is not None else "")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-        finally:
-            try: cur.close(); conn.close()
-            except: pass
+            fill(int(cid), *found)
+        run_query(work, on_done=done, owner=update_win, busy=[load_btn, save_btn], tag="update_record.load_data",
+                  replica="read")
 
-    def save_update():
+    def save_update(version=None):
         cid = id_entry.get().strip()
         vals = [e.get().strip() for e in entries]
         if not cid.isdigit():
             messagebox.showerror("Input Error", "Enter valid ID")
             return
+        if loaded.get("id") != int(cid):
+            messagebox.showerror("Input Error", "Load the record before saving changes")
+            return
         # date conversion
-        for i,f in enumerate(fields):
-            if "Date" in f:
-                try:
-                    vals[i] = datetime.strptime(vals[i], "%Y-%m-%d").date()
-                except Exception:
-                    messagebox.showerror("Input Error", f"Invalid date for {f}")
-                    return
-        placeholders = ", ".join([f"{f.lower().replace(' ','_')}=%s" for f in fields])
-        query = f"UPDATE {table_name} SET {placeholders} WHERE id=%s"
         try:
-            conn = get_connection()
-            if conn is None: return
-            cur = conn.cursor()
-            cur.execute(query, (*vals, cid))
+            TABLES[table_name].convert_dates(vals)
+        except ValueError as e:
+            messagebox.showerror("Input Error", f"Invalid date for {e}")
+            return
+        # only the fields edited since loading are written, and only while nobody else has saved
+        # the record in between
+        changes = changed_columns(table_name, vals, loaded["row"])
+        if not changes:
+            messagebox.showinfo("No Changes", "Nothing to save.")
+            return
+        def work(conn):
+            conn.storage.update_columns(conn, table_name, int(cid), changes,
+                                        loaded["version"] if version is None else version)
             conn.commit()
+            invalidate_caches()
+        def done(_):
             messagebox.showinfo("Updated", "Record updated successfully!")
             update_win.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-        finally:
-            try: cur.close(); conn.close()
-            except: pass
+        def failed(err):
+            if isinstance(err, RecordConflict):
+                show_conflict(err, vals)
+            else:
+                messagebox.showerror("Error", str(err))
+        run_query(work, on_done=done, on_error=failed, busy=[load_btn, save_btn], tag="update_record.save_update",
+                  replica="write")
+
+    def show_conflict(err, vals):
+        # field-level diff of what was loaded, what is entered and what is saved now
+        win = tb.Toplevel(update_win)
+        win.title("Record Changed")
+        win.geometry("820x420")
+        tb.Label(win, text="Someone else saved this record after you loaded it.", font=("Segoe UI", 12, "bold")
+                 ).pack(anchor="w", padx=12, pady=(12,2))
+        tb.Label(win, text="Save mine writes only the fields you edited; their other changes are kept.",
+                 foreground="gray").pack(anchor="w", padx=12)
+        columns = ("field", "loaded", "yours", "current")
+        tree = tb.Treeview(win, columns=columns, show="headings", height=10)
+        for col, heading in zip(columns, ("Field", "You loaded", "Yours", "Current")):
+            tree.heading(col, text=heading)
+            tree.column(col, width=190, stretch=True)
+        tree.tag_configure("both", background="#f8d7da")    # you both changed it
+        tree.tag_configure("theirs", background="#fff3cd")  # only they did
+        tree.tag_configure("yours", background="#d1e7dd")   # only you did
+        meta = TABLES[table_name]
+        base = dict(zip(meta.columns, loaded["row"]))
+        for column, was, mine, now in record_diff(table_name, dict(zip(meta.columns, vals)), err.current, base):
+            shown = ["" if v is None else str(v) for v in (was, mine, now)]
+            tag = "yours" if shown[0] == shown[2] else "theirs" if shown[0] == shown[1] else "both"
+            tree.insert("", "end", values=(meta.fields[meta.columns.index(column)], *shown), tags=(tag,))
+        tree.pack(fill="both", expand=True, padx=12, pady=10)
+        btns = tb.Frame(win)
+        btns.pack(fill="x", padx=12, pady=(0,12))
+        tb.Button(btns, text="💾 Save mine", bootstyle="warning",
+                  command=lambda: (win.destroy(), save_update(err.current_version))).pack(side="left")
+        tb.Button(btns, text="⟳ Load current", bootstyle="info",
+                  command=lambda: (win.destroy(), fill(err.record_id, err.current, err.current_version))
+                  ).pack(side="left", padx=6)
+        tb.Button(btns, text="Cancel", bootstyle="secondary", command=win.destroy).pack(side="left")
 
     update_win = tb.Toplevel(root)
     update_win.title(f"Update {table_name.capitalize()}")
@@ -335,7 +660,8 @@ def update_record(table_name, fields):
     tb.Label(container, text="Enter Record ID:", font=("Segoe UI", 11)).pack(anchor="w")
     id_entry = tb.Entry(container)
     id_entry.pack(fill="x", pady=(6,10))
-    tb.Button(container, text="Load Data", bootstyle="info", command=load_data).pack(pady=(0,10))
+    load_btn = tb.Button(container, text="Load Data", bootstyle="info", command=load_data)
+    load_btn.pack(pady=(0,10))
 
     entries = []
     for f in fields:
@@ -343,28 +669,619 @@ def update_record(table_name, fields):
         ent = tb.Entry(container)
         ent.pack(fill="x", pady=(4,8))
         entries.append(ent)
-    tb.Button(container, text="💾 Save Update", bootstyle="success", command=save_update).pack(pady=10)
+    save_btn = tb.Button(container, text="💾 Save Update", bootstyle="success", command=save_update)
+    save_btn.pack(pady=10)
+    if AUDIT_CONFIG.get("enabled", True):
+        def history():
+            cid = id_entry.get().strip()
+            show_audit(table_name, int(cid) if cid.isdigit() else None)
+        tb.Button(container, text="🕵 History", bootstyle="outline", command=history).pack()
+    if table_name == "evidence":
+        def attachments():
+            cid = id_entry.get().strip()
+            if not cid.isdigit():
+                messagebox.showerror("Input Error", "Enter valid ID")
+                return
+            show_attachments(int(cid))
+        tb.Button(container, text="📎 Attachments", bootstyle="outline", command=attachments).pack(pady=(6,0))
 
-# ------------- Dashboard / Management Panel -------------
-def get_counts():
-    counts = {"criminals":0, "officers":0, "cases":0, "evidence":0}
-    try:
-        conn = get_connection()
-        if conn is None: return counts
-        cur = conn.cursor()
-        for k in list(counts.keys()):
-            try:
-                cur.execute(f"SELECT COUNT(1) FROM {k}")
-                r = cur.fetchone()
-                counts[k] = r[0] if r and r[0] is not None else 0
-            except Exception:
-                counts[k] = 0
-        cur.close()
-        conn.close()
-    except Exception:
-        pass
-    return counts
+    if record_id is not None:
+        # opened from a link (e.g. a search hit): load the record straight away
+        id_entry.insert(0, str(record_id))
+        load_data()
+
+# ------------- Case dossier -------------
+def ask_dossier():
+    cid = simpledialog.askinteger("Case Dossier", "Case ID:", parent=root, minvalue=1)
+    if cid is not None:
+        show_dossier(cid)
+
+def show_dossier(case_id):
+    win = tb.Toplevel(root)
+    win.title("Case Dossier")
+    win.geometry("1000x700")
+    frame, card, container = card_frame(win, width=980)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
 
+    bar = tb.Frame(container)
+    bar.pack(fill="x", padx=6, pady=(0,8))
+    back_btn = tb.Button(bar, text="◀ Back", bootstyle="outline", width=8)
+    back_btn.pack(side="left")
+    files_btn = tb.Button(bar, text="📎 Attachments", bootstyle="outline")
+    files_btn.pack(side="left", padx=6)
+    open_btn = tb.Button(bar, text="Open", bootstyle="info", width=8)
+    open_btn.pack(side="right")
+    id_entry = tb.Entry(bar, width=10)
+    id_entry.pack(side="right", padx=6)
+    tb.Label(bar, text="Case ID:").pack(side="right")
+
+    title = tb.Label(container, text="", font=("Segoe UI", 14, "bold"))
+    title.pack(anchor="w", padx=6)
+    details = tb.Label(container, text="", font=("Segoe UI", 10), justify="left", wraplength=920)
+    details.pack(anchor="w", padx=6, pady=(4,8))
+    officer = tb.Label(container, text="", font=("Segoe UI", 10, "bold"))
+    officer.pack(anchor="w", padx=6, pady=(0,8))
+    evidence_label = tb.Label(container, text="Evidence", font=("Segoe UI", 12, "bold"))
+    evidence_label.pack(anchor="w", padx=6)
+
+    columns = ("id", "evidence_type", "description")
+    table = tb.Frame(container)
+    table.pack(fill="both", expand=True, padx=6, pady=6)
+    tree = tb.Treeview(table, columns=columns, show="headings", height=14)
+    for col, text, width in zip(columns, ("ID", "Type", "Description"), (70, 180, 640)):
+        tree.heading(col, text=text)
+        tree.column(col, width=width, stretch=(col == "description"))
+    scrollbar = tb.Scrollbar(table, orient="vertical", command=tree.yview)
+    scrollbar.pack(side="right", fill="y")
+    tree.pack(side="left", fill="both", expand=True)
+    more_btn = tb.Button(container, text="Load more evidence", bootstyle="outline")
+    more_btn.pack(pady=(0,6))
+
+    state = {"case": None, "after": None, "has_next": False, "history": [], "loading": False}
+
+    def render(page, append=False):
+        state["loading"] = False
+        if not append:
+            c, o = page["case"], page["officer"]
+            title.configure(text=f"Case #{c[0]}: {c[1]}")
+            details.configure(text=f"Date: {c[2] or '—'}\n{c[3] or ''}")
+            officer.configure(text=f"Officer: {o[1]} ({o[2] or 'no rank'}, {o[3] or 'no department'}) · ID {o[0]}"
+                              if o else "Officer: unassigned")
+            evidence_label.configure(text=f"Evidence ({page['evidence_count']})")
+            tree.delete(*tree.get_children())
+        for row in page["evidence"]:
+            tree.insert("", "end", values=["" if v is None else v for v in row])
+        if page["evidence"]:
+            state["after"] = page["evidence"][-1][0]
+        state["has_next"] = page["has_next"]
+        more_btn.configure(state="normal" if page["has_next"] else "disabled")
+        back_btn.configure(state="normal" if state["history"] else "disabled")
+
+    def fetch(case_id, after, on_page):
+        # cached pages render straight away; only misses go to a worker
+        page = dossier_cache.get(case_id, after)
+        if page is not None:
+            return on_page(page)
+        state["loading"] = True
+        def failed(e):
+            state["loading"] = False
+            _show_query_error(e)
+        run_query(lambda conn: load_dossier(conn, case_id, after), on_done=on_page, on_error=failed, owner=win,
+                  busy=[more_btn, open_btn], tag="case_dossier", replica="read")
+
+    def open_case(cid, remember=True):
+        def shown(page):
+            state["loading"] = False
+            if page is None:
+                messagebox.showerror("Not Found", f"No case with ID {cid}.", parent=win)
+                return
+            if remember and state["case"] is not None and state["case"] != cid:
+                state["history"].append(state["case"])
+            state["case"] = cid
+            state["after"] = None
+            render(page)
+        fetch(cid, None, shown)
+
+    def load_more():
+        if state["loading"] or not state["has_next"]:
+            return
+        fetch(state["case"], state["after"], lambda page: render(page, append=True) if page else None)
+
+    def on_scroll(first, last):
+        # lazy paging: the next page is fetched when the list is scrolled to its end
+        scrollbar.set(first, last)
+        if float(last) >= 1.0:
+            load_more()
+
+    def open_typed(event=None):
+        text = id_entry.get().strip()
+        if not text.isdigit():
+            messagebox.showerror("Input Error", "Enter valid ID", parent=win)
+            return
+        open_case(int(text))
+
+    def open_evidence(event=None):
+        sel = tree.selection()
+        if sel:
+            update_record("evidence", get_fields_for_table("evidence"), record_id=tree.item(sel[0], "values")[0])
+
+    def open_attachments():
+        sel = tree.selection()
+        if sel:
+            show_attachments(int(tree.item(sel[0], "values")[0]))
+        else:
+            messagebox.showinfo("Attachments", "Select an evidence row first.", parent=win)
+
+    back_btn.configure(command=lambda: open_case(state["history"].pop(), remember=False) if state["history"] else None)
+    files_btn.configure(command=open_attachments)
+    open_btn.configure(command=open_typed)
+    id_entry.bind("<Return>", open_typed)
+    more_btn.configure(command=load_more)
+    tree.configure(yscrollcommand=on_scroll)
+    tree.bind("<Double-1>", open_evidence)
+    open_case(int(case_id))
+
+# ------------- Duplicate criminals -------------
+def show_duplicates():
+    win = tb.Toplevel(root)
+    win.title("Possible Duplicate Criminals")
+    win.geometry("1100x600")
+    frame, card, container = card_frame(win, width=1080)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    title = tb.Label(container, text="Possible Duplicates", font=("Segoe UI", 14, "bold"))
+    title.pack(anchor="w", pady=(4,8))
+
+    bar = tb.Frame(container)
+    bar.pack(fill="x", padx=6, pady=(0,8))
+    scan_btn = tb.Button(bar, text="🔍 Scan all", bootstyle="info")
+    scan_btn.pack(side="left")
+    refresh_btn = tb.Button(bar, text="Refresh", bootstyle="outline")
+    refresh_btn.pack(side="left", padx=6)
+    status = tb.Label(bar, text="Double-click a pair to open both records", foreground="gray")
+    status.pack(side="left", padx=10)
+
+    columns = ("score", "id", "name", "age", "gender", "crime", "match_id", "match_name", "match_age",
+               "match_gender", "match_crime")
+    headings = ("Score", "ID", "Name", "Age", "Gender", "Crime", "ID", "Name", "Age", "Gender", "Crime")
+    tree = tb.Treeview(container, columns=columns, show="headings", height=18)
+    for col, heading in zip(columns, headings):
+        tree.heading(col, text=heading)
+        tree.column(col, width=60 if col in ("score", "id", "age", "gender", "match_id", "match_age", "match_gender")
+                    else 140, stretch=col in ("name", "match_name"))
+    tree.pack(fill="both", expand=True, padx=6, pady=6)
+
+    def load():
+        def done(rows):
+            tree.delete(*tree.get_children())
+            for r in rows:
+                tree.insert("", "end", values=(f"{r[0]:.0%}",) + tuple("" if v is None else v for v in r[1:]))
+            title.configure(text=f"Possible Duplicates ({len(rows)})")
+        run_query(list_identity_matches, on_done=done, owner=win, busy=[refresh_btn], tag="duplicates.list",
+                  replica="read")
+
+    def scan():
+        def done(stats):
+            status.configure(text=f"{stats['pairs']} pairs from {stats['entries']} entries in {stats['seconds']:.1f}s")
+            load()
+        status.configure(text="Scanning…")
+        run_query(find_duplicates, on_done=done, owner=win, busy=[scan_btn, refresh_btn], tag="duplicates.scan",
+                  replica="write")
+
+    def open_pair(event=None):
+        sel = tree.selection()
+        if sel:
+            values = tree.item(sel[0], "values")
+            fields = get_fields_for_table("criminals")
+            update_record("criminals", fields, record_id=values[1])
+            update_record("criminals", fields, record_id=values[6])
+
+    scan_btn.configure(command=scan)
+    refresh_btn.configure(command=load)
+    tree.bind("<Double-1>", open_pair)
+    load()
+
+# ------------- Evidence attachments -------------
+def ask_attachments():
+    eid = simpledialog.askinteger("Attachments", "Evidence ID:", parent=root, minvalue=1)
+    if eid is not None:
+        show_attachments(eid)
+
+def show_attachments(evidence_id):
+    win = tb.Toplevel(root)
+    win.title("Evidence Attachments")
+    win.geometry("1100x620")
+    frame, card, container = card_frame(win, width=1080)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    title = tb.Label(container, text=f"Attachments · Evidence #{evidence_id}", font=("Segoe UI", 14, "bold"))
+    title.pack(anchor="w", pady=(4,8))
+
+    bar = tb.Frame(container)
+    bar.pack(fill="x", padx=6, pady=(0,8))
+    add_btn = tb.Button(bar, text="➕ Add files", bootstyle="success")
+    add_btn.pack(side="left")
+    save_btn = tb.Button(bar, text="💾 Save as", bootstyle="info", state="disabled")
+    save_btn.pack(side="left", padx=6)
+    del_btn = tb.Button(bar, text="🗑 Delete", bootstyle="danger", state="disabled")
+    del_btn.pack(side="left")
+
+    body = tb.Frame(container)
+    body.pack(fill="both", expand=True, padx=6, pady=6)
+    columns = ("id", "filename", "type", "size", "by", "at")
+    tree = tb.Treeview(body, columns=columns, show="headings", height=16)
+    for col, heading, width in zip(columns, ("ID", "File", "Type", "Size", "Uploaded by", "Uploaded at"),
+                                   (50, 240, 130, 80, 100, 150)):
+        tree.heading(col, text=heading)
+        tree.column(col, width=width, stretch=(col == "filename"))
+    tree.pack(side="left", fill="both", expand=True)
+    preview = tb.Frame(body, width=PREVIEW_PX + 20)
+    preview.pack(side="right", fill="y", padx=(10,0))
+    preview.pack_propagate(False)
+    image_label = tb.Label(preview, text="Select a file to preview", anchor="center", justify="center")
+    image_label.pack(fill="both", expand=True)
+    text_box = tk.Text(preview, wrap="word", height=20, font=("Consolas", 9))
+
+    rows = {}  # tree item -> attachment row (ATTACHMENT_FIELDS)
+
+    def selected():
+        sel = tree.selection()
+        return rows.get(sel[0]) if sel else None
+
+    def load():
+        def done(result):
+            tree.delete(*tree.get_children())
+            rows.clear()
+            for r in result:
+                item = tree.insert("", "end", values=(r[0], r[2], r[3] or "", format_size(r[4]), r[6] or "",
+                                                      str(r[7] or "")[:19]))
+                rows[item] = r
+            title.configure(text=f"Attachments · Evidence #{evidence_id} ({len(result)})")
+            on_select()
+        def work(conn):
+            require_evidence(conn, evidence_id)
+            return list_attachments(conn, evidence_id)
+        run_query(work, on_done=done, owner=win, busy=[add_btn], tag="attachments.list")
+
+    def show_preview(kind, value):
+        text_box.pack_forget()
+        image_label.configure(image="", text="")
+        image_label.image = None
+        if kind == "image":
+            image_label.image = tk.PhotoImage(data=base64.b64encode(value))
+            image_label.configure(image=image_label.image)
+        elif kind == "text":
+            image_label.pack_forget()
+            text_box.configure(state="normal")
+            text_box.delete("1.0", tk.END)
+            text_box.insert("1.0", value)
+            text_box.configure(state="disabled")
+            text_box.pack(fill="both", expand=True)
+            return
+        else:
+            image_label.configure(text=value)
+        image_label.pack(fill="both", expand=True)
+
+    def on_select(event=None):
+        r = selected()
+        state = "normal" if r else "disabled"
+        save_btn.configure(state=state)
+        del_btn.configure(state=state)
+        if r is None:
+            show_preview(None, "Select a file to preview")
+            return
+        sha, content_type = r[5], r[3] or ""
+        def work(conn):
+            # thumbnails come from the LRU cache; text previews read only the file's first pages
+            if content_type.startswith("image/"):
+                thumb = thumbnail_cache.get(sha, PREVIEW_PX)
+                if thumb is not None:
+                    return "image", thumb
+            if content_type.startswith("text/") or content_type in ("application/json", "application/xml"):
+                return "text", attachment_preview(sha)
+            return None, f"{r[2]}\n{content_type or 'unknown type'}, {format_size(r[4])}\n\nNo preview"
+        run_query(work, on_done=lambda result: show_preview(*result) if selected() is r else None, owner=win,
+                  tag="attachments.preview")
+
+    def add_files():
+        paths = filedialog.askopenfilenames(parent=win, title="Attach files")
+        if not paths:
+            return
+        def work(conn):
+            for path in paths:
+                attach_file(conn, evidence_id, path)
+            conn.commit()
+            invalidate_caches()
+        run_query(work, on_done=lambda _: load(), owner=win, busy=[add_btn, save_btn, del_btn], tag="attachments.add")
+
+    def save_as():
+        r = selected()
+        if r is None:
+            return
+        dest = filedialog.asksaveasfilename(parent=win, initialfile=r[2], title="Save attachment")
+        if dest:
+            run_query(lambda conn: get_attachment_store().copy_to(r[5], dest), owner=win, busy=[save_btn],
+                      on_done=lambda _: messagebox.showinfo("Saved", f"Saved {r[2]} to {dest}", parent=win),
+                      tag="attachments.save")
+
+    def delete():
+        r = selected()
+        if r is None or not messagebox.askyesno("Confirm", f"Remove {r[2]} from this evidence?", parent=win):
+            return
+        def work(conn):
+            delete_attachment(conn, r[0])
+            conn.commit()
+            invalidate_caches()
+        run_query(work, on_done=lambda _: load(), owner=win, busy=[del_btn], tag="attachments.delete")
+
+    add_btn.configure(command=add_files)
+    save_btn.configure(command=save_as)
+    del_btn.configure(command=delete)
+    tree.bind("<<TreeviewSelect>>", on_select)
+    tree.bind("<Double-1>", lambda e: save_as())
+    load()
+
+# ------------- Reports -------------
+def draw_bar_chart(canvas, items, color, vertical=False):
+    # items: [(label, value)]; call again on <Configure> to fit the new size
+    canvas.delete("all")
+    w, h = max(canvas.winfo_width(), 60), max(canvas.winfo_height(), 60)
+    if not items:
+        canvas.create_text(w / 2, h / 2, text="No data yet", fill="#6c757d")
+        return
+    peak = max(v for _, v in items) or 1
+    font = ("Segoe UI", 8)
+    if vertical:
+        slot = w / len(items)
+        for i, (label, value) in enumerate(items):
+            x0, x1 = i * slot + slot * 0.15, (i + 1) * slot - slot * 0.15
+            bar = (h - 36) * value / peak
+            canvas.create_rectangle(x0, h - 18 - bar, x1, h - 18, fill=color, width=0)
+            canvas.create_text((x0 + x1) / 2, h - 26 - bar, text=str(value), font=font)
+            canvas.create_text((x0 + x1) / 2, h - 8, text=label, font=font)
+    else:
+        slot, label_w = h / len(items), min(120, w // 3)
+        for i, (label, value) in enumerate(items):
+            y0, y1 = i * slot + slot * 0.15, (i + 1) * slot - slot * 0.15
+            bar = (w - label_w - 44) * value / peak
+            canvas.create_text(label_w - 6, (y0 + y1) / 2, text=str(label)[:18], anchor="e", font=font)
+            canvas.create_rectangle(label_w, y0, label_w + bar, y1, fill=color, width=0)
+            canvas.create_text(label_w + bar + 4, (y0 + y1) / 2, text=str(value), anchor="w", font=font)
+
+# (report, title, bar color, vertical) for the dashboard charts
+REPORT_CHARTS = (
+    ("months", "Crimes per Month", "#d9534f", True),
+    ("departments", "Case Load by Department", "#f0ad4e", False),
+    ("evidence", "Evidence by Type", "#17a2b8", False),
+)
+
+def show_reports():
+    win = tb.Toplevel(root)
+    win.title("Reports")
+    win.geometry("900x640")
+    frame, card, container = card_frame(win, width=880)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    tb.Label(container, text="Reports", font=("Segoe UI", 14, "bold")).pack(anchor="w", pady=(4,8))
+    grid = tb.Frame(container)
+    grid.pack(fill="both", expand=True)
+    views = {}
+    for i, (key, title, headings) in enumerate((("crimes", "Top Crimes", ("Crime", "Count")),
+                                                 ("officers", "Case Load by Officer", ("Officer", "Department", "Cases")),
+                                                 ("departments", "Case Load by Department", ("Department", "Cases")),
+                                                 ("evidence", "Evidence by Type", ("Type", "Count")))):
+        box = tb.Labelframe(grid, text=title, padding=6)
+        box.grid(row=i // 2, column=i % 2, padx=6, pady=6, sticky="nsew")
+        cols = [f"c{j}" for j in range(len(headings))]
+        tv = tb.Treeview(box, columns=cols, show="headings", height=REPORT_CONFIG.get("top", 8))
+        for col, heading in zip(cols, headings):
+            numeric = heading in ("Count", "Cases")
+            tv.heading(col, text=heading)
+            tv.column(col, width=80 if numeric else 160, stretch=not numeric)
+        tv.pack(fill="both", expand=True)
+        views[key] = tv
+    grid.columnconfigure(0, weight=1); grid.columnconfigure(1, weight=1)
+
+    def fill(reports):
+        for key, tv in views.items():
+            tv.delete(*tv.get_children())
+            for row in reports[key]:
+                tv.insert("", "end", values=row[1:] if key == "officers" else row)
+    def load():
+        run_query(load_reports, on_done=fill, owner=win, busy=[refresh_btn], replica="read")
+    refresh_btn = tb.Button(container, text="Refresh", bootstyle="info", command=load)
+    refresh_btn.pack(anchor="w", padx=6, pady=(6,0))
+    load()
+
+# ------------- Audit log -------------
+def show_audit(table=None, record_id=None):
+    win = tb.Toplevel(root)
+    win.title("Audit Log")
+    win.geometry("1200x640")
+    frame, card, container = card_frame(win, width=1180)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    tb.Label(container, text="Audit Log", font=("Segoe UI", 14, "bold")).pack(anchor="w", pady=(4,8))
+
+    bar = tb.Frame(container)
+    bar.pack(fill="x", padx=6, pady=(0,8))
+    entries = {}
+    for key, label, width in (("user", "User", 14), ("record", "Record ID", 8), ("since", "From", 18), ("until", "To", 18)):
+        tb.Label(bar, text=f"{label}:").pack(side="left", padx=(8 if entries else 0, 4))
+        entries[key] = tb.Entry(bar, width=width)
+        entries[key].pack(side="left")
+        if key == "user":
+            tb.Label(bar, text="Table:").pack(side="left", padx=(8,4))
+            table_box = tb.Combobox(bar, values=("",) + COUNT_TABLES, width=12, state="readonly")
+            table_box.set(table or "")
+            table_box.pack(side="left")
+    if record_id is not None:
+        entries["record"].insert(0, str(record_id))
+    search_btn = tb.Button(bar, text="Search", bootstyle="info", width=8)
+    search_btn.pack(side="left", padx=8)
+    tb.Label(container, text="Times are UTC; dates as YYYY-MM-DD[ HH:MM].", foreground="#6c757d").pack(anchor="w", padx=6)
+
+    columns = ("time", "user", "source", "table", "record", "op", "changes")
+    body = tb.Frame(container)
+    body.pack(fill="both", expand=True, padx=6, pady=6)
+    tree = tb.Treeview(body, columns=columns, show="headings", height=18)
+    for col, heading, width in zip(columns, ("Time", "User", "Feature", "Table", "Record", "Op", "Changes (before → after)"),
+                                   (170, 100, 130, 80, 70, 40, 560)):
+        tree.heading(col, text=heading)
+        tree.column(col, width=width, stretch=(col == "changes"))
+    scrollbar = tb.Scrollbar(body, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side="right", fill="y")
+    tree.pack(side="left", fill="both", expand=True)
+    more_btn = tb.Button(container, text="Load older", bootstyle="outline", state="disabled")
+    more_btn.pack(pady=(0,6))
+
+    state = {"filters": None, "cursor": None}
+    ops = {"I": "add", "U": "edit", "D": "del", "A": "archive", "R": "restore"}
+
+    def render(result, append):
+        rows, state["cursor"] = result
+        if not append:
+            tree.delete(*tree.get_children())
+        for r in rows:
+            changes = "; ".join(f"{c}: {'' if b is None else b} → {'' if a is None else a}" for c, (b, a) in audit_changes(r).items())
+            tree.insert("", "end", values=(str(r[1])[:19], r[2], r[3] or "", r[4], "" if r[5] is None else r[5],
+                                           ops.get(r[6], r[6]), changes))
+        more_btn.configure(state="normal" if state["cursor"] else "disabled")
+
+    def fetch(append=False):
+        f, cursor = state["filters"], state["cursor"] if append else None
+        run_query(lambda conn: query_audit(conn, f["user"], f["table"], f["record"], f["since"], f["until"], cursor),
+                  on_done=lambda result: render(result, append), owner=win, busy=[search_btn, more_btn], tag="audit_view")
+
+    def search(event=None):
+        text = {k: e.get().strip() for k, e in entries.items()}
+        if text["record"] and (not text["record"].isdigit() or not table_box.get()):
+            messagebox.showerror("Input Error", "Record ID needs a table and must be a number", parent=win)
+            return
+        try:
+            since, until = audit_bound(text["since"]), audit_bound(text["until"], end=True)
+        except ValueError:
+            messagebox.showerror("Input Error", "Dates must be YYYY-MM-DD or YYYY-MM-DD HH:MM", parent=win)
+            return
+        state["filters"] = {"user": text["user"] or None, "table": table_box.get() or None,
+                            "record": int(text["record"]) if text["record"] else None, "since": since, "until": until}
+        fetch()
+
+    search_btn.configure(command=search)
+    more_btn.configure(command=lambda: fetch(append=True))
+    for e in entries.values():
+        e.bind("<Return>", search)
+    search()
+
+# ------------- Global search -------------
+def global_search(text):
+    text = text.strip()
+    if not text:
+        return
+    win = tb.Toplevel(root)
+    win.title(f"Search: {text}")
+    win.geometry("1000x560")
+    frame, card, container = card_frame(win, width=980)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    tb.Label(container, text=f"Results for “{text}”", font=("Segoe UI", 14, "bold")).pack(anchor="w", pady=(4,8))
+
+    cols = ("src", "id", "title", "snippet", "score")
+    tree = tb.Treeview(container, columns=cols, show="headings", height=SEARCH_PAGE_SIZE)
+    for col, heading, width in zip(cols, ("Type", "ID", "Title", "Match", "Score"), (90, 60, 200, 520, 70)):
+        tree.heading(col, text=heading)
+        tree.column(col, width=width, stretch=(col == "snippet"))
+    tree.pack(fill="both", expand=True, padx=6, pady=6)
+
+    nav = tb.Frame(container)
+    nav.pack(fill="x", padx=6, pady=(0,6))
+    prev_btn = tb.Button(nav, text="◀ Prev", bootstyle="outline", width=10)
+    prev_btn.pack(side="left")
+    next_btn = tb.Button(nav, text="Next ▶", bootstyle="outline", width=10)
+    next_btn.pack(side="left", padx=6)
+    status = tb.Label(nav, text="Searching…", foreground="#6c757d")
+    status.pack(side="right")
+    tb.Label(nav, text="Double-click a result to open it", foreground="#6c757d").pack(side="left", padx=12)
+
+    state = {"offset": 0, "total": 0}
+
+    def show(result):
+        total, rows = result
+        state["total"] = total
+        tree.delete(*tree.get_children())
+        for src, rid, title, snippet, score in rows:
+            tree.insert("", "end", values=(src, rid, title or "", (snippet or "").replace("\n", " "), f"{score:.2f}"))
+        page = state["offset"] // SEARCH_PAGE_SIZE + 1
+        pages = max(1, (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE)
+        status.configure(text=f"Page {page} of {pages} · {total} matches")
+        prev_btn.configure(state="normal" if state["offset"] > 0 else "disabled")
+        next_btn.configure(state="normal" if state["offset"] + SEARCH_PAGE_SIZE < total else "disabled")
+
+    def load(offset):
+        state["offset"] = max(0, offset)
+        status.configure(text="Searching…")
+        run_query(lambda conn: search_records(conn, text, offset=state["offset"]),
+                  on_done=show, owner=win, busy=[prev_btn, next_btn], tag="global_search", replica="read")
+
+    def open_hit(event=None):
+        sel = tree.selection()
+        if not sel:
+            return
+        src, rid = tree.item(sel[0], "values")[:2]
+        if src == "cases":
+            show_dossier(rid)
+        else:
+            update_record(src, get_fields_for_table(src), record_id=rid)
+
+    tree.bind("<Double-1>", open_hit)
+    tree.bind("<Return>", open_hit)
+    prev_btn.configure(command=lambda: load(state["offset"] - SEARCH_PAGE_SIZE))
+    next_btn.configure(command=lambda: load(state["offset"] + SEARCH_PAGE_SIZE))
+    load(0)
+
+# ------------- Bulk import -------------
+def import_records(table_name):
+    path = filedialog.askopenfilename(
+        title=f"Import {table_name.capitalize()}",
+        filetypes=[("CSV / JSON Lines", "*.csv *.jsonl *.json *.ndjson *.gz"), ("All files", "*.*")])
+    if not path:
+        return
+    win = tb.Toplevel(root)
+    win.title(f"Import {table_name.capitalize()}")
+    win.geometry("520x200")
+    frame, card, container = card_frame(win, width=500)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    tb.Label(container, text=f"Importing {os.path.basename(path)}", font=("Segoe UI", 12, "bold")).pack(anchor="w", pady=(4,8))
+    status = tb.Label(container, text="Starting…", foreground="#6c757d")
+    status.pack(anchor="w")
+
+    latest = {}
+    stop = threading.Event()
+    # closing the window stops the import after the current batch
+    win.bind("<Destroy>", lambda e: stop.set() if e.widget is win else None, add="+")
+
+    def poll():
+        # progress is written by the worker thread; only the Tk thread touches the label
+        if stop.is_set():
+            return
+        if latest:
+            status.configure(text=format_import_stats(latest))
+        win.after(250, poll)
+
+    def done(stats):
+        stop.set()
+        msg = format_import_stats(stats)
+        if stats["reject_file"]:
+            msg += f"\nRejected rows written to {stats['reject_file']}"
+        messagebox.showinfo("Import finished", msg)
+        win.destroy()
+
+    def failed(e):
+        stop.set()
+        messagebox.showerror("Import failed", str(e))
+        win.destroy()
+
+    run_query(lambda conn: bulk_import(table_name, path, conn, progress=latest.update, stop=stop),
+              on_done=done, on_error=failed, tag="bulk_import")
+    poll()
+
+# ------------- Dashboard / Management Panel -------------
 def create_navbar(parent, username=None):
     nav = tb.Frame(parent)
     nav.pack(fill="x", side="top")
@@ -374,6 +1291,11 @@ def create_navbar(parent, username=None):
     right = tb.Frame(nav)
     right.pack(side="right", padx=12)
 
+    search_entry = tb.Entry(right, width=28)
+    search_entry.pack(side="left", padx=6)
+    search_entry.bind("<Return>", lambda e: global_search(search_entry.get()))
+    tb.Button(right, text="🔎 Search", bootstyle="outline", command=lambda: global_search(search_entry.get())).pack(side="left", padx=(0,6))
+
     def show_profile():
         # Profile popup: username, change password, save as official account
         prof = tb.Toplevel(root)
@@ -399,12 +1321,70 @@ def create_navbar(parent, username=None):
         tb.Button(inner, text="Save as Official Account", bootstyle="info", command=save_official_action).pack(fill="x", pady=(0,4))
         tb.Button(inner, text="Close", bootstyle="secondary", command=prof.destroy).pack(fill="x", pady=(6,0))
 
+    replica = get_replica()
+    if replica is not None:
+        def sync_now(btn):
+            run_query(replica.sync, busy=[btn], tag="replica.sync",
+                      on_done=lambda st: messagebox.showinfo("Sync", format_sync_stats(st).capitalize() + "."),
+                      on_error=lambda e: (replica.set_online(False, e),
+                                          messagebox.showwarning("Sync", f"Server unreachable; working offline.\n{e}")))
+        sync_btn = tb.Button(right, text="⟳ Sync", bootstyle="outline", width=10, command=lambda: sync_now(sync_btn))
+        sync_btn.pack(side="left", padx=6)
+    tb.Button(right, text="📈 Stats", bootstyle="outline", width=10, command=show_query_stats).pack(side="left", padx=6)
+    if AUDIT_CONFIG.get("enabled", True):
+        tb.Button(right, text="🕵 Audit", bootstyle="outline", width=10, command=show_audit).pack(side="left", padx=6)
     tb.Button(right, text="👤 Profile", bootstyle="outline", width=10, command=show_profile).pack(side="left", padx=6)
     tb.Button(right, text="Logout", bootstyle="outline", width=10, command=logout).pack(side="left", padx=6)
 
+def show_query_stats():
+    win = tb.Toplevel(root)
+    win.title("Query Statistics")
+    win.geometry("1200x640")
+    frame, card, container = card_frame(win, width=1180)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    tb.Label(container, text="Query Statistics", font=("Segoe UI", 14, "bold")).pack(anchor="w", pady=(4,8))
+
+    stmt_cols = ("feature", "calls", "avg", "p95", "max", "rows", "slow", "statement")
+    stmts = tb.Treeview(container, columns=stmt_cols, show="headings", height=14)
+    for col, heading, width in zip(stmt_cols, ("Feature", "Calls", "Avg ms", "p95 ms", "Max ms", "Rows", "Slow", "Statement"),
+                                   (170, 60, 70, 70, 70, 80, 50, 560)):
+        stmts.heading(col, text=heading)
+        stmts.column(col, width=width, stretch=(col == "statement"))
+    stmts.pack(fill="both", expand=True, padx=6, pady=6)
+
+    acq_cols = ("feature", "calls", "avg", "p95", "max")
+    acqs = tb.Treeview(container, columns=acq_cols, show="headings", height=5)
+    for col, heading in zip(acq_cols, ("Connection acquire", "Calls", "Avg ms", "p95 ms", "Max ms")):
+        acqs.heading(col, text=heading)
+        acqs.column(col, width=170 if col == "feature" else 80, stretch=(col == "feature"))
+    acqs.pack(fill="x", padx=6, pady=6)
+    pool_label = tb.Label(container, text="", foreground="#6c757d")
+    pool_label.pack(anchor="w", padx=6)
+
+    def refresh():
+        snap = query_stats.snapshot()
+        stmts.delete(*stmts.get_children())
+        for e in snap["statements"]:
+            stmts.insert("", "end", values=(e["feature"], e["calls"], f"{e['avg_ms']:.1f}", f"{e['p95_ms']:.1f}",
+                                            f"{e['max_ms']:.1f}", e["rows"], e["slow"], e["statement"]))
+        acqs.delete(*acqs.get_children())
+        for e in snap["acquires"]:
+            acqs.insert("", "end", values=(e["feature"], e["calls"], f"{e['avg_ms']:.1f}", f"{e['p95_ms']:.1f}", f"{e['max_ms']:.1f}"))
+        pool = pool_stats()
+        pool_label.configure(text=f"Pool: {pool['in_use']} in use, {pool['idle']} idle of {pool['size']} · "
+                                  f"hits {pool['hits']} · misses {pool['misses']} · waits {pool['waits']} · "
+                                  f"timeouts {pool['timeouts']} · recycled {pool['recycled']}")
+
+    btns = tb.Frame(container)
+    btns.pack(fill="x", padx=6, pady=(6,0))
+    tb.Button(btns, text="Refresh", bootstyle="info", command=refresh).pack(side="left")
+    tb.Button(btns, text="Reset", bootstyle="secondary", command=lambda: (query_stats.reset(), refresh())).pack(side="left", padx=6)
+    refresh()
+
 def logout():
     global current_user
     current_user = None
+    set_audit_user(None)
     for w in root.winfo_children():
         w.destroy()
     frame = tb.Frame(root, padding=24)
@@ -412,7 +1392,8 @@ def logout():
     login_screen(frame)
 
 def refresh_dashboard(container, username):
-    # simple refresh by re-rendering the main page
+    # simple refresh by re-rendering the main page, with freshly counted tiles
+    invalidate_caches()
     for w in root.winfo_children():
         w.destroy()
     main_page(username)
@@ -420,6 +1401,7 @@ def refresh_dashboard(container, username):
 def main_page(username=None):
     global current_user
     current_user = username
+    set_audit_user(username)  # record changes from here on are audited as this user
     for w in root.winfo_children():
         w.destroy()
     create_navbar(root, username=username)
@@ -430,24 +1412,33 @@ def main_page(username=None):
     tb.Label(content, text="Dashboard", font=("Segoe UI", 18, "bold")).pack(anchor="w")
     tb.Label(content, text=f"Welcome {username or ''} — Overview and quick actions", foreground="#6c757d").pack(anchor="w", pady=(0,8))
 
-    counts = get_counts()
     tiles = tb.Frame(content)
     tiles.pack(fill="x", pady=10)
+    count_labels = {}
 
-    def make_tile(parent, title, count, color, target_table=None):
+    def make_tile(parent, title, color, target_table=None):
         tile = tk.Frame(parent, bg="white", highlightbackground="#e6e9ee", highlightthickness=1)
         inner = tb.Frame(tile, padding=10)
         inner.pack(fill="both", expand=True)
         tb.Label(inner, text=title, font=("Segoe UI", 11, "bold")).pack(anchor="w")
-        tb.Label(inner, text=str(count), font=("Segoe UI", 20, "bold"), foreground=color).pack(anchor="w", pady=(6,0))
+        # placeholder until the counts query comes back from the worker
+        count_labels[target_table] = tb.Label(inner, text="…", font=("Segoe UI", 20, "bold"), foreground=color)
+        count_labels[target_table].pack(anchor="w", pady=(6,0))
         if target_table:
             tb.Button(inner, text="Manage →", bootstyle="outline", command=lambda: view_records(target_table, get_fields_for_table(target_table))).pack(anchor="e", pady=(8,0))
         return tile
 
-    t1 = make_tile(tiles, "Criminals", counts.get("criminals",0), "#d9534f", "criminals")
-    t2 = make_tile(tiles, "Officers", counts.get("officers",0), "#28a745", "officers")
-    t3 = make_tile(tiles, "Cases Filed", counts.get("cases",0), "#f0ad4e", "cases")
-    t4 = make_tile(tiles, "Evidence Items", counts.get("evidence",0), "#17a2b8", "evidence")
+    t1 = make_tile(tiles, "Criminals", "#d9534f", "criminals")
+    t2 = make_tile(tiles, "Officers", "#28a745", "officers")
+    t3 = make_tile(tiles, "Cases Filed", "#f0ad4e", "cases")
+    t4 = make_tile(tiles, "Evidence Items", "#17a2b8", "evidence")
+
+    def show_counts(counts):
+        estimated = approximate_tables()
+        for table, label in count_labels.items():
+            prefix = "~" if table in estimated else ""
+            label.configure(text=f"{prefix}{counts.get(table, 0)}")
+    run_query(get_counts, on_done=show_counts, owner=tiles, replica="read")
 
     t1.grid(row=0, column=0, padx=8, sticky="nsew")
     t2.grid(row=0, column=1, padx=8, sticky="nsew")
@@ -456,27 +1447,41 @@ def main_page(username=None):
     tiles.columnconfigure(0, weight=1); tiles.columnconfigure(1, weight=1)
     tiles.columnconfigure(2, weight=1); tiles.columnconfigure(3, weight=1)
 
+    # report charts, drawn from the summary tables
+    charts = tb.Frame(content)
+    charts.pack(fill="x", pady=(0,6))
+    chart_canvases = []
+    for col, (key, title, color, vertical) in enumerate(REPORT_CHARTS):
+        tile = tk.Frame(charts, bg="white", highlightbackground="#e6e9ee", highlightthickness=1)
+        tile.grid(row=0, column=col, padx=8, sticky="nsew")
+        charts.columnconfigure(col, weight=1)
+        inner = tb.Frame(tile, padding=10)
+        inner.pack(fill="both", expand=True)
+        tb.Label(inner, text=title, font=("Segoe UI", 11, "bold")).pack(anchor="w")
+        canvas = tk.Canvas(inner, height=150, bg="white", highlightthickness=0)
+        canvas.pack(fill="both", expand=True, pady=(6,0))
+        canvas.items = None
+        canvas.bind("<Configure>", lambda e, c=canvas, color=color, vertical=vertical:
+                    draw_bar_chart(c, c.items, color, vertical) if c.items is not None else None)
+        chart_canvases.append((canvas, key, color, vertical))
+
+    def show_charts(reports):
+        for canvas, key, color, vertical in chart_canvases:
+            items = reports[key]
+            canvas.items = [(m[2:], n) for m, n in items] if key == "months" else items  # "24-05"
+            draw_bar_chart(canvas, canvas.items, color, vertical)
+    run_query(load_reports, on_done=show_charts, owner=charts, replica="read")
+
     # quick actions
     action_row = tb.Frame(content)
     action_row.pack(fill="x", pady=(12,6))
     tb.Button(action_row, text="Open Management Panel", bootstyle="primary", command=lambda: show_management_panel(content)).pack(side="left")
     tb.Button(action_row, text="Refresh", bootstyle="info", command=lambda: refresh_dashboard(content, username)).pack(side="left", padx=8)
+    tb.Button(action_row, text="📊 Reports", bootstyle="outline", command=show_reports).pack(side="left")
 
     # management panel visible by default
     show_management_panel(content)
 
-def get_fields_for_table(table_name):
-    # mapping of display field names for tableview and CRUD forms
-    if table_name == "criminals":
-        return ["Name","Age","Gender","Crime","Crime Date","Status"]
-    if table_name == "officers":
-        return ["Name","Officer Rank","Department"]
-    if table_name == "cases":
-        return ["Case Name","Case Date","Description","Officer ID"]
-    if table_name == "evidence":
-        return ["Case ID","Evidence Type","Description"]
-    return []
-
 def show_management_panel(parent):
     existing = getattr(parent, "_management_panel", None)
     if existing:
@@ -504,6 +1509,13 @@ def show_management_panel(parent):
         tb.Button(inner, text=f"✏ Update {title}", bootstyle="warning", width=26, command=lambda:update_record(table, fields)).pack(pady=6)
         tb.Button(inner, text=f"🗑 Delete {title}", bootstyle="danger", width=26, command=lambda:delete_record(table)).pack(pady=6)
         tb.Button(inner, text=f"📋 View {title}", bootstyle="info", width=26, command=lambda:view_records(table, fields)).pack(pady=6)
+        tb.Button(inner, text=f"⬆ Import {title}", bootstyle="secondary", width=26, command=lambda:import_records(table)).pack(pady=6)
+        if table == "cases":
+            tb.Button(inner, text="📁 Case Dossier", bootstyle="primary", width=26, command=ask_dossier).pack(pady=6)
+        if table == "evidence":
+            tb.Button(inner, text="📎 Attachments", bootstyle="primary", width=26, command=ask_attachments).pack(pady=6)
+        if table == "criminals":
+            tb.Button(inner, text="👥 Duplicates", bootstyle="primary", width=26, command=show_duplicates).pack(pady=6)
         return frame
 
     cards.grid_columnconfigure(0, weight=1)
@@ -540,18 +1552,17 @@ def login_screen(root_frame):
         if not uname or not pwd:
             messagebox.showwarning("Input Error", "Enter username and password")
             return
-        conn = get_connection()
-        if conn is None: return
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE username=%s AND password=%s", (uname, pwd))
-        if cur.fetchone():
-            cur.close(); conn.close()
-            main_page(username=uname)
-        else:
-            messagebox.showerror("Login Failed", "Invalid username or password")
-            cur.close(); conn.close()
+        def work(conn):
+            return conn.storage.check_login(conn, uname, pwd)
+        def done(ok):
+            if ok:
+                main_page(username=uname)
+            else:
+                messagebox.showerror("Login Failed", "Invalid username or password")
+        run_query(work, on_done=done, busy=[login_btn], tag="do_login")
 
-    tb.Button(btnrow, text="Login", bootstyle="success", width=14, command=do_login).pack(side="left", padx=(0,6))
+    login_btn = tb.Button(btnrow, text="Login", bootstyle="success", width=14, command=do_login)
+    login_btn.pack(side="left", padx=(0,6))
     tb.Button(btnrow, text="Signup", bootstyle="info", width=14, command=lambda: signup_user(username_entry.get().strip(), password_entry.get().strip())).pack(side="left")
 
     tb.Label(inner, text="Tip: Sign up if you don't have an account yet.", font=("Segoe UI", 9), foreground="#6c757d").pack(pady=(12,0))
@@ -560,6 +1571,54 @@ def login_screen(root_frame):
 def setup_styles():
     tb.Style(theme="litera")
 
+def schedule_stats_dump():
+    # periodic snapshot for `python -m crimetrack stats` while the app runs
+    every = INSTRUMENT_CONFIG.get("dump_every", 0)
+    if not every or not INSTRUMENT_CONFIG.get("dump_file"):
+        return
+    def tick():
+        try:
+            dump_query_stats()
+        except OSError as e:
+            log.warning("could not write query stats: %s", e)
+        root.after(int(every * 1000), tick)
+    root.after(int(every * 1000), tick)
+
+def schedule_replica_sync():
+    # first sync takes the snapshot; after that only deltas are pulled
+    replica = get_replica()
+    if replica is None:
+        return
+    try:
+        replica.prepare()
+    except DB_ERRORS as e:
+        messagebox.showerror("Replica Error", f"Could not open the local replica: {e}")
+        return
+    every = int(REPLICA_CONFIG.get("sync_every", 30) * 1000)
+    def failed(e):
+        replica.set_online(False, e)
+        root.after(every, tick)
+    def tick():
+        run_query(replica.sync, on_done=lambda _: root.after(every, tick), on_error=failed, tag="replica.sync")
+    tick()
+
+def schedule_archive():
+    # moves old closed records to the archive tables in the background, a bounded run at a time
+    every = int(ARCHIVE_CONFIG.get("run_every", 0) * 1000)
+    if not every:
+        return
+    def done(stats):
+        if any(stats.values()):
+            log.info("archived %(criminals)d criminals, %(cases)d cases (%(evidence)d evidence, "
+                     "%(attachments)d attachments)", stats)
+        root.after(every, tick)
+    def failed(e):
+        log.warning("archive run failed: %s", e)
+        root.after(every, tick)
+    def tick():
+        run_query(archive_records, on_done=done, on_error=failed, tag="archive")
+    root.after(min(every, 60000), tick)
+
 def main():
     global root
     root = tb.Window(themename="litera")
@@ -567,11 +1626,26 @@ def main():
     root.geometry("1400x900")
     root.minsize(1200,700)
     setup_styles()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
     init_db()
+    schedule_stats_dump()
+    schedule_replica_sync()
+    schedule_archive()
     main_container = tb.Frame(root, padding=12)
     main_container.pack(fill="both", expand=True)
     login_screen(main_container)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        if _executor is not None:
+            _executor.shutdown()
+        if INSTRUMENT_CONFIG.get("dump_file"):
+            try:
+                dump_query_stats()
+            except OSError:
+                pass
+        close_replica()
+        close_pool()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,287 @@
+# benchmark.py
+# Populates the CrimeTrack schema with synthetic data and times the queries the app issues.
+#
+#   python benchmark.py --backend sqlite --scale 10000 --out bench.json
+#   python benchmark.py --backend mysql --database crimetrack_bench --scale 1000000 --compare bench.json
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import crimetrack
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ishaan", "Rohan", "Priya", "Ananya", "Diya", "Kavya", "Meera",
+               "John", "Maria", "Ahmed", "Chen", "Olga", "Lucas", "Fatima", "Carlos", "Yuki", "Emma"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Nair", "Gupta", "Khan", "Singh", "Patel", "Das",
+              "Smith", "Garcia", "Ali", "Wang", "Ivanova", "Silva", "Hassan", "Lopez", "Tanaka", "Brown"]
+CRIMES = ["theft", "burglary", "robbery", "assault", "fraud", "forgery", "arson", "vandalism", "smuggling",
+          "cybercrime", "extortion", "kidnapping", "homicide", "drug trafficking", "money laundering"]
+STATUSES = ["Wanted"] * 2 + ["Arrested"] * 3 + ["Convicted"] * 3 + ["Released"] * 2 + ["Closed"]
+RANKS = ["Constable", "Head Constable", "Sub-Inspector", "Inspector", "Deputy Superintendent", "Superintendent"]
+DEPARTMENTS = ["Homicide", "Narcotics", "Cyber Cell", "Economic Offences", "Traffic", "Special Branch", "Crime Branch"]
+EVIDENCE_TYPES = ["Fingerprint", "DNA sample", "CCTV footage", "Weapon", "Document", "Phone records",
+                  "Witness statement", "Photograph", "Bank statement", "Vehicle"]
+WORDS = ["suspect", "seen", "near", "market", "vehicle", "recovered", "stolen", "witness", "statement", "knife",
+         "cash", "phone", "account", "transfer", "night", "warehouse", "border", "station", "report", "camera"]
+
+BATCH = 5000
+
+# ------------- Synthetic data -------------
+def plan_sizes(args):
+    scale = args.scale
+    return {
+        "users": args.users,
+        "officers": args.officers or max(10, scale // 100),
+        "criminals": args.criminals or scale,
+        "cases": args.cases or max(1, scale // 2),
+        "evidence": args.evidence or scale * 3 // 2,
+    }
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def _day(rng, start=date(2000, 1, 1), span=9500):
+    return start + timedelta(days=rng.randrange(span))
+
+def generate(table, count, sizes, rng):
+    # rows in insertion order; foreign keys only point at ids that already exist
+    for i in range(1, count + 1):
+        if table == "users":
+            yield (f"user{i}", f"pass{i}")
+        elif table == "officers":
+            yield (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", rng.choice(RANKS), rng.choice(DEPARTMENTS))
+        elif table == "criminals":
+            yield (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", rng.randint(16, 80), rng.choice(("Male", "Female")),
+                   rng.choice(CRIMES), _day(rng), rng.choice(STATUSES))
+        elif table == "cases":
+            crime = rng.choice(CRIMES)
+            yield (f"Case {i}: {crime}", _day(rng), f"{crime} {_sentence(rng, 12)}", rng.randint(1, sizes["officers"]))
+        elif table == "evidence":
+            yield (rng.randint(1, sizes["cases"]), rng.choice(EVIDENCE_TYPES), _sentence(rng, 10))
+
+INSERT_COLUMNS = {
+    "users": ["username", "password"],
+    "officers": ["name", "officer_rank", "department"],
+    "criminals": ["name", "age", "gender", "crime", "crime_date", "status"],
+    "cases": ["case_name", "case_date", "description", "officer_id"],
+    "evidence": ["case_id", "evidence_type", "description"],
+}
+
+def populate(conn, sizes, seed, log=print):
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    try:
+        with crimetrack.query_tag("benchmark.populate"):  # bulk loads, not app queries
+            for table in ("users", "officers", "criminals", "cases", "evidence"):
+                cols = INSERT_COLUMNS[table]
+                sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
+                start = time.perf_counter()
+                batch = []
+                for row in generate(table, sizes[table], sizes, rng):
+                    batch.append(row)
+                    if len(batch) >= BATCH:
+                        cur.executemany(sql, batch)
+                        conn.commit()
+                        batch = []
+                if batch:
+                    cur.executemany(sql, batch)
+                    conn.commit()
+                elapsed = time.perf_counter() - start
+                log(f"  {table:<10} {sizes[table]:>10} rows in {elapsed:6.1f}s")
+    finally:
+        cur.close()
+
+def reset_schema(conn, backend):
+    # both backends get the schema from the app's own migrations
+    if backend == "mysql":
+        cur = conn.cursor()
+        try:
+            cur.execute("SET FOREIGN_KEY_CHECKS=0")
+            for table in ("evidence", "cases", "criminals", "officers", "users", "schema_version"):
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
+            cur.execute("SET FOREIGN_KEY_CHECKS=1")
+            conn.commit()
+        finally:
+            cur.close()
+    crimetrack.migrate(conn)
+
+# ------------- Timed queries -------------
+def _fetch(conn, sql, params=()):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        return len(cur.fetchall())
+    finally:
+        cur.close()
+
+def query_suite(conn, backend, sizes, rng, full_select_max):
+    # name -> callable returning the number of rows touched; mirrors the SQL the app sends
+    suite = {}
+    crim_fields = crimetrack.get_fields_for_table("criminals")
+    crim_cols = ", ".join(crimetrack.TABLES["criminals"].columns)
+
+    if sizes["criminals"] <= full_select_max:
+        # the pre-pagination view_records: whole table in one fetchall
+        suite["view_records.full_select[criminals]"] = lambda: _fetch(conn, f"SELECT id, {crim_cols} FROM criminals")
+
+    def page(search="", sort="id", desc=False, after=None):
+        pager = crimetrack.RecordPager("criminals", crim_fields)
+        pager.set_search(search)
+        pager.set_sort(sort, desc)
+        sql, params = pager._page_query(after, conn.storage)
+        return lambda: _fetch(conn, sql, params)
+
+    def _count(search=""):
+        pager = crimetrack.RecordPager("criminals", crim_fields)
+        pager.set_search(search)
+        return lambda: pager.count(conn) and 1
+
+    suite["view_records.first_page"] = page()
+    suite["view_records.first_page[sort crime_date desc]"] = page(sort="crime_date", desc=True)
+    suite["view_records.first_page[search]"] = page(search="Sharma")
+    # keyset paging: a page deep in the table costs the same as the first one
+    middle = sizes["criminals"] // 2
+    suite["view_records.page[middle of table]"] = page(after=(middle, middle))
+    suite["view_records.count"] = _count()
+    suite["view_records.count[search]"] = _count("Sharma")
+
+    suite["get_counts"] = lambda: len(conn.storage.count_records(conn, crimetrack.COUNT_TABLES))
+    # dashboard charts read the summary tables only; the data load marked every key, so recount once first
+    crimetrack.refresh_reports(conn)
+    suite["dashboard.reports"] = lambda: len(crimetrack.load_reports(conn)["months"])
+
+    storage = conn.storage
+
+    def lookup():
+        rid = rng.randint(1, sizes["criminals"])
+        return 1 if storage.get_record(conn, "criminals", rid) else 0
+    suite["update_record.load_data"] = lookup
+
+    def delete_case():
+        # cascades to the case's evidence; rolled back so every run sees the same data
+        cid = rng.randint(1, sizes["cases"])
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM cases WHERE id=%s", (cid,))
+            return cur.rowcount
+        finally:
+            cur.close()
+            conn.rollback()
+    suite["delete_record.cascade[cases->evidence]"] = delete_case
+
+    def login():
+        uid = rng.randint(1, max(1, sizes["users"]))
+        return 1 if storage.check_login(conn, f"user{uid}", f"pass{uid}") else 0
+    suite["do_login"] = login
+
+    suite["global_search"] = lambda: len(crimetrack.search_records(conn, "knife warehouse")[1])
+    return suite
+
+def time_suite(suite, repeat, log=print):
+    results = {}
+    for name, fn in suite.items():
+        fn()  # warm-up
+        timings, rows = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = fn()
+            timings.append((time.perf_counter() - start) * 1000.0)
+        timings.sort()
+        results[name] = {
+            "runs": repeat,
+            "rows": rows,
+            "min_ms": timings[0],
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "max_ms": timings[-1],
+        }
+        log(f"  {name:<48} median {results[name]['median_ms']:9.2f} ms   p95 {results[name]['p95_ms']:9.2f} ms")
+    return results
+
+def compare(current, baseline_path, log=print):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    log(f"\n{'query':<48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, res in current.items():
+        if name in baseline:
+            before = baseline[name]["median_ms"]
+            ratio = res["median_ms"] / before if before else float("inf")
+            log(f"{name:<48} {before:>9.2f}  {res['median_ms']:>9.2f}  {ratio:>6.2f}x")
+
+# ------------- Entry point -------------
+def connect(args):
+    crimetrack.DB_CONFIG["backend"] = args.backend
+    if args.backend == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            if args.sqlite_path != ":memory:" and os.path.exists(args.sqlite_path + suffix):
+                os.remove(args.sqlite_path + suffix)
+        crimetrack.DB_CONFIG["sqlite_path"] = args.sqlite_path
+        return crimetrack.get_pool().acquire()
+    # never touch the application database: benchmarks get their own schema
+    server = {k: v for k, v in crimetrack.DB_CONFIG.items() if k not in crimetrack.NON_DRIVER_KEYS and k != "database"}
+    raw = crimetrack.mysql.connector.connect(**server)
+    cur = raw.cursor()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    cur.close()
+    raw.close()
+    crimetrack.DB_CONFIG["database"] = args.database
+    return crimetrack.get_pool().acquire()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CrimeTrack benchmark: synthetic data + timed app queries")
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite",
+                        help="sqlite uses the app's embedded backend; mysql uses crimetrack.DB_CONFIG credentials")
+    parser.add_argument("--sqlite-path", default=":memory:")
+    parser.add_argument("--database", default="crimetrack_bench", help="MySQL schema to (re)create for the run")
+    parser.add_argument("--scale", type=int, default=10000, help="criminal rows; other tables are derived from it")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--officers", type=int)
+    parser.add_argument("--criminals", type=int)
+    parser.add_argument("--cases", type=int)
+    parser.add_argument("--evidence", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--full-select-max", type=int, default=1000000,
+                        help="skip the unpaginated full-table select above this many criminals")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args(argv)
+
+    sizes = plan_sizes(args)
+    conn = connect(args)
+    print(f"Populating {args.backend} ({', '.join(f'{k}={v}' for k, v in sizes.items())}), seed {args.seed}")
+    reset_schema(conn, args.backend)
+    populate(conn, sizes, args.seed)
+    print(f"Timing queries ({args.repeat} runs each)")
+    rng = random.Random(args.seed + 1)
+    results = time_suite(query_suite(conn, args.backend, sizes, rng, args.full_select_max), args.repeat)
+    conn.close()
+    crimetrack.close_pool()
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "sizes": sizes,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4013 @@
+# crimetrack.py
+# headless core of CrimeTrack: storage backends, connection pool, migrations, replica, reports,
+# import/export and the command line. It never imports Tkinter; app.py builds the desktop app on it,
+# and `python -m crimetrack <command>` runs it from cron jobs and containers.
+import argparse
+import atexit
+import csv
+import getpass
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import mmap
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import mysql.connector
+from datetime import date, datetime, timedelta, timezone
+
+# ------------- CONFIG -------------
+DB_CONFIG = {
+    "backend": "mysql",      # "mysql" (central server) or "sqlite" (local file, runs offline)
+    "sqlite_path": "crimetrack.db",
+    "host": "localhost",
+    "user": "root",
+    "password": "your_password_here",
+    "database": "criminal_db",
+    # connection pool (read by ConnectionPool, not passed to mysql.connector)
+    "pool_size": 5,          # max open connections
+    "pool_timeout": 10,      # seconds to wait for a free connection
+    "pool_recycle": 1800,    # reconnect connections older than this (seconds)
+    "pool_ping_after": 30,   # ping connections idle longer than this before reuse
+}
+POOL_KEYS = ("pool_size", "pool_timeout", "pool_recycle", "pool_ping_after")
+NON_DRIVER_KEYS = POOL_KEYS + ("backend", "sqlite_path")
+PAGE_SIZE = 12  # rows per page in the records view
+EVIDENCE_PAGE = 25  # evidence rows per page in the case dossier
+DOSSIER_CACHE = 20  # recently viewed dossiers kept in memory
+DOSSIER_TTL = 60    # seconds a cached dossier is served before it is re-read
+IMPORT_BATCH = 1000  # rows per executemany/commit in bulk imports
+EXPORT_CHUNK = 5000  # rows per fetchmany when exporting
+INSTRUMENT_CONFIG = {
+    "slow_query_ms": 250,               # statements slower than this are logged
+    "explain_slow": True,               # also log EXPLAIN output for slow SELECTs
+    "dump_file": "query_stats.json",    # written periodically by the app; read by `python -m crimetrack stats`
+    "dump_every": 60,                   # seconds between dumps (0 disables)
+}
+STATS_CONFIG = {
+    "ttl": 30,                          # seconds dashboard counts are served from cache
+    "approximate": False,               # use INFORMATION_SCHEMA row estimates for big tables
+    "approximate_threshold": 1000000,   # estimated rows above which the estimate is shown
+}
+REPLICA_CONFIG = {
+    "enabled": False,                   # serve reads from a local copy kept in sync with the server
+    "sqlite_path": "crimetrack_replica.db",
+    "sync_every": 30,                   # seconds between background syncs
+    "batch": 5000,                      # change_log entries / snapshot rows per round trip
+}
+REPORT_CONFIG = {
+    "months": 12,                       # months shown in the crime trend
+    "top": 8,                           # rows in the ranked reports
+    "refresh_batch": 500,               # changed summary keys recomputed per transaction
+}
+AUDIT_CONFIG = {
+    "enabled": True,                    # keep before/after images of every record write in audit_log
+    "batch": 500,                       # entries per INSERT from the background writer
+    "flush_ms": 250,                    # longest a committed change waits before it is written
+    "max_queue": 10000,                 # committed transactions waiting; writers block beyond this
+    "spool_file": "audit_spool.jsonl",  # entries kept here while the database is unreachable
+    "retry_every": 30,                  # seconds before the writer tries the database again after a failure
+    "page": 100,                        # entries per page in the audit view
+}
+ATTACHMENT_CONFIG = {
+    "root": "attachments",              # directory of the content-addressed file store
+    "chunk": 1 << 20,                   # bytes per read/write when streaming files in and out
+    "max_size": 4 << 30,                # largest attachment accepted (bytes)
+    "thumb_size": 160,                  # longest side of a thumbnail (pixels)
+    "thumb_cache": 200,                 # thumbnails kept in memory
+    "preview_bytes": 4096,              # leading bytes of a text file shown as its preview
+    "gc_grace": 3600,                   # seconds an unreferenced file is kept (uploads still being recorded)
+}
+MATCH_CONFIG = {
+    "check_on_add": True,               # look for the same person before a new criminal is saved
+    "threshold": 0.85,                  # score (0-1) from which two records are reported as one person
+    "age_band": 10,                     # years per blocking age band (widened to 2 * age_tolerance + 1)
+    "age_tolerance": 5,                 # ages this far apart still meet in a block
+    "candidates": 500,                  # most rows scored per lookup
+    "window": 50,                       # batch job: neighbours compared within an oversized block
+    "task_rows": 5000,                  # batch job: block entries per worker task
+    "workers": None,                    # batch job processes (default: os.cpu_count())
+}
+ARCHIVE_CONFIG = {
+    "age_days": 5 * 365,                # criminals (by crime date) and cases (by case date) older than this are archived
+    "keep_statuses": ["Wanted", "Arrested", "Under Investigation", "On Trial"],  # criminals never archived
+    "chunk": 500,                       # records moved per transaction
+    "pause_ms": 50,                     # rest between chunks so the job yields to interactive writes
+    "max_rows": 20000,                  # records moved per table in one run of the background job
+    "run_every": 3600,                  # seconds between background runs in the app (0 disables)
+}
+
+# ------------- Table metadata -------------
+# display field names for tableview and CRUD forms; columns are derived from them
+TABLE_FIELDS = {
+    "criminals": ["Name","Age","Gender","Crime","Crime Date","Status"],
+    "officers": ["Name","Officer Rank","Department"],
+    "cases": ["Case Name","Case Date","Description","Officer ID"],
+    "evidence": ["Case ID","Evidence Type","Description"],
+}
+
+class TableMeta:
+    # everything the CRUD layer derives from a table's fields, built once at import
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = list(fields)
+        self.columns = [f.lower().replace(" ","_") for f in fields]
+        self.column_of = dict(zip(self.fields, self.columns))
+        self.date_positions = [i for i, f in enumerate(fields) if "Date" in f]
+        cols = ", ".join(self.columns)
+        marks = ", ".join(["%s"] * len(self.columns))
+        self.select_sql = f"SELECT {cols} FROM {name} WHERE id=%s"
+        self.select_version_sql = f"SELECT {cols}, version FROM {name} WHERE id=%s"
+        self.insert_sql = f"INSERT INTO {name} ({cols}) VALUES ({marks})"
+        self.insert_with_id_sql = f"INSERT INTO {name} (id, {cols}) VALUES (%s, {marks})"
+        self.delete_sql = f"DELETE FROM {name} WHERE id=%s"
+        self._update_sql = {}
+        self.update_sql = self.update_columns_sql(self.columns)
+
+    def update_columns_sql(self, columns, versioned=False):
+        # UPDATE of just these columns that bumps the row version; versioned: only while the row is
+        # still at the version given last. One string per column set, so prepared() can reuse it.
+        key = (tuple(columns), versioned)
+        sql = self._update_sql.get(key)
+        if sql is None:
+            sets = "".join(f"{c}=%s, " for c in columns)
+            sql = self._update_sql[key] = (f"UPDATE {self.name} SET {sets}version=version+1 WHERE id=%s"
+                                           + (" AND version=%s" if versioned else ""))
+        return sql
+
+    def convert_dates(self, vals):
+        # date fields to date objects, in place; raises ValueError naming the bad field
+        for i in self.date_positions:
+            vals[i] = self.convert_date(self.fields[i], vals[i])
+        return vals
+
+    def convert_date(self, field, value):
+        # value as a date object if field is a date field, else unchanged; raises ValueError naming it
+        if self.fields.index(field) not in self.date_positions:
+            return value
+        try:
+            return datetime.strptime(str(value), "%Y-%m-%d").date()
+        except Exception:
+            raise ValueError(field)
+
+TABLES = {name: TableMeta(name, fields) for name, fields in TABLE_FIELDS.items()}
+
+# ------------- Query instrumentation -------------
+log = logging.getLogger("crimetrack")
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_tag_local = threading.local()
+
+@contextmanager
+def query_tag(name):
+    # labels every statement run on this thread with the calling feature
+    previous = getattr(_tag_local, "tag", None)
+    _tag_local.tag = name
+    try:
+        yield
+    finally:
+        _tag_local.tag = previous
+
+def current_tag():
+    return getattr(_tag_local, "tag", None) or "untagged"
+
+def _fingerprint(sql):
+    # collapse whitespace and inlined numbers so "LIMIT 13" and "LIMIT 21" share an entry
+    sql = re.sub(r"\s+", " ", sql).strip()
+    sql = re.sub(r"\b\d+\b", "?", sql)
+    return sql[:160]
+
+def _new_entry():
+    return {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "slow": 0,
+            "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+
+def _observe(entry, ms):
+    entry["calls"] += 1
+    entry["total_ms"] += ms
+    entry["max_ms"] = max(entry["max_ms"], ms)
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if ms <= bound:
+            entry["buckets"][i] += 1
+            break
+    else:
+        entry["buckets"][-1] += 1
+
+def percentile_ms(entry, pct):
+    # upper bound of the histogram bucket holding the pct-th percentile
+    target = entry["calls"] * pct / 100.0
+    seen = 0
+    for i, n in enumerate(entry["buckets"]):
+        seen += n
+        if n and seen >= target:
+            return min(LATENCY_BUCKETS_MS[i], entry["max_ms"]) if i < len(LATENCY_BUCKETS_MS) else entry["max_ms"]
+    return 0.0
+
+class QueryStats:
+    # per (feature, statement) latency histograms and row counts, plus connection-acquire times
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = {}
+        self.acquires = {}
+        self._explain = queue.Queue(maxsize=20)
+        self._explained = {}
+        self._explainer = None
+
+    def record(self, tag, sql, seconds, rows, params=None, pool=None, bulk=False):
+        # bulk (executemany) batches are timed but never reported as slow: their time grows with the batch
+        ms = seconds * 1000.0
+        key = (tag, _fingerprint(sql))
+        slow = not bulk and ms >= INSTRUMENT_CONFIG.get("slow_query_ms", float("inf"))
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = _new_entry()
+            _observe(entry, ms)
+            if rows and rows > 0:
+                entry["rows"] += rows
+            if slow:
+                entry["slow"] += 1
+        if slow:
+            self._slow(tag, sql, params, ms, pool)
+        return key
+
+    def add_rows(self, key, rows):
+        if key is None or not rows:
+            return
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is not None:
+                entry["rows"] += rows
+
+    def record_acquire(self, tag, seconds):
+        with self._lock:
+            entry = self.acquires.get(tag)
+            if entry is None:
+                entry = self.acquires[tag] = _new_entry()
+            _observe(entry, seconds * 1000.0)
+
+    def _slow(self, tag, sql, params, ms, pool=None):
+        # parameters are never logged (they include passwords); they are only replayed into EXPLAIN
+        log.warning("slow query (%.0f ms) [%s]: %s", ms, tag, _fingerprint(sql))
+        if not INSTRUMENT_CONFIG.get("explain_slow") or not sql.lstrip().upper().startswith("SELECT"):
+            return
+        fp = _fingerprint(sql)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(fp, -3600) < 600:
+                return  # explain each statement shape at most every 10 minutes
+            self._explained[fp] = now
+            if self._explainer is None:
+                self._explainer = threading.Thread(target=self._explain_loop, daemon=True)
+                self._explainer.start()
+        try:
+            self._explain.put_nowait((tag, sql, params, pool))
+        except queue.Full:
+            pass
+
+    def _explain_loop(self):
+        # EXPLAIN runs on its own pooled connection (from the pool the statement ran on):
+        # the slow statement's cursor may still be streaming
+        while True:
+            tag, sql, params, pool = self._explain.get()
+            conn = None
+            try:
+                with query_tag("explain"):
+                    conn = (pool or get_pool()).acquire()
+                    cur = conn.cursor()
+                    cur.execute(conn.storage.explain_prefix + sql, params or ())
+                    names = [d[0] for d in cur.description]
+                    plan = [dict(zip(names, row)) for row in cur.fetchall()]
+                    cur.close()
+                log.warning("EXPLAIN for slow query [%s]: %s", tag, json.dumps(plan, default=str))
+            except Exception as e:
+                log.warning("EXPLAIN failed for slow query [%s]: %s", tag, e)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def snapshot(self):
+        def summarise(entry):
+            out = {k: v for k, v in entry.items() if k != "buckets"}
+            out["avg_ms"] = entry["total_ms"] / entry["calls"] if entry["calls"] else 0.0
+            out["p50_ms"] = percentile_ms(entry, 50)
+            out["p95_ms"] = percentile_ms(entry, 95)
+            out["p99_ms"] = percentile_ms(entry, 99)
+            out["histogram"] = dict(zip([f"<={b}ms" for b in LATENCY_BUCKETS_MS] + ["slower"], entry["buckets"]))
+            return out
+        with self._lock:
+            statements = [dict(feature=tag, statement=sql, **summarise(e)) for (tag, sql), e in self.statements.items()]
+            acquires = [dict(feature=tag, **summarise(e)) for tag, e in self.acquires.items()]
+        statements.sort(key=lambda e: e["total_ms"], reverse=True)
+        acquires.sort(key=lambda e: e["total_ms"], reverse=True)
+        return {"statements": statements, "acquires": acquires}
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.acquires.clear()
+
+query_stats = QueryStats()
+
+class InstrumentedCursor:
+    # wraps a driver cursor: times execute/executemany and counts fetched rows; a failed
+    # statement is reported to conn so a dead connection is not handed out again
+    def __init__(self, cursor, pool=None, conn=None):
+        self._cursor = cursor
+        self._pool = pool
+        self._conn = conn
+        self._key = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _run(self, method, sql, params, args, kwargs, bulk=False):
+        start = time.perf_counter()
+        try:
+            return method(sql, params, *args, **kwargs)
+        except Exception as e:
+            if self._conn is not None:
+                self._conn.failed(e)
+            raise
+        finally:
+            # rows of a result set are counted as they are fetched; rowcount covers DML
+            returns_rows = sql.lstrip(" (\n").upper().startswith(("SELECT", "EXPLAIN", "SHOW"))
+            rows = 0 if returns_rows else getattr(self._cursor, "rowcount", -1)
+            self._key = query_stats.record(current_tag(), sql, time.perf_counter() - start, rows, params, self._pool,
+                                           bulk)
+
+    def execute(self, sql, params=(), *args, **kwargs):
+        return self._run(self._cursor.execute, sql, params, args, kwargs)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        return self._run(self._cursor.executemany, sql, seq_params, args, kwargs, bulk=True)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            query_stats.add_rows(self._key, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        query_stats.add_rows(self._key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        query_stats.add_rows(self._key, len(rows))
+        return rows
+
+def format_query_stats(snapshot, pool=None):
+    lines = [f"{'feature':<24} {'calls':>7} {'avg ms':>8} {'p95 ms':>8} {'max ms':>8} {'rows':>9} {'slow':>5}  statement"]
+    for e in snapshot["statements"]:
+        lines.append(f"{e['feature']:<24} {e['calls']:>7} {e['avg_ms']:>8.1f} {e['p95_ms']:>8.1f} "
+                     f"{e['max_ms']:>8.1f} {e['rows']:>9} {e['slow']:>5}  {e['statement'][:90]}")
+    lines.append("")
+    lines.append(f"{'connection acquire':<24} {'calls':>7} {'avg ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for e in snapshot["acquires"]:
+        lines.append(f"{e['feature']:<24} {e['calls']:>7} {e['avg_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['max_ms']:>8.1f}")
+    if pool:
+        lines.append("")
+        lines.append("pool: " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in pool.items()))
+    return "\n".join(lines)
+
+def dump_query_stats(path=None):
+    path = path or INSTRUMENT_CONFIG.get("dump_file")
+    if not path:
+        return
+    data = query_stats.snapshot()
+    data["pool"] = pool_stats() if _pool is not None else {}
+    data["written_at"] = datetime.now().isoformat(timespec="seconds")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, default=str)
+    os.replace(tmp, path)
+
+# ------------- Storage backends -------------
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+
+# dates go to SQLite as ISO text, the same format MySQL returns in the UI
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=" "))
+
+@lru_cache(maxsize=1024)
+def _qmark(sql):
+    return sql.replace("%s", "?")
+
+class SQLiteCursor:
+    # accepts the app's %s placeholders and the driver-specific cursor() options
+    def __init__(self, cur):
+        self._cur = cur
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def execute(self, sql, params=()):
+        return self._cur.execute(_qmark(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_params):
+        return self._cur.executemany(_qmark(sql), seq_params)
+
+class SQLiteConnection:
+    # sqlite3 connection with the small part of the mysql.connector API the app uses
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self.connection_id = id(self)
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self._db.cursor())
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def ping(self, reconnect=False):
+        self._db.execute("SELECT 1")
+
+    def interrupt(self):
+        # safe to call from another thread; aborts the running statement
+        self._db.interrupt()
+
+    def close(self):
+        self._db.close()
+
+class Storage:
+    # CRUD statements shared by every backend; subclasses supply the driver and dialect
+    name = None
+    pk_type = None       # column definition for an auto-increment integer primary key
+    like_escape = ""     # appended to LIKE so "\" escapes % and _
+    explain_prefix = "EXPLAIN "
+    insert_ignore = None  # INSERT of {rows} into {table} that skips rows whose key already exists
+    month_sql = None      # 'YYYY-MM' of a date expression ({})
+    abort_sql = None      # trigger statement that fails the write with message {}
+    row_lock = ""         # appended to the SELECT of an audit before image to lock the rows until commit
+    audited = True        # record writes queue before/after images for the audit log (see AuditWriter)
+    identity_keys = True  # criminals writes keep their blocking keys current (see find_identity_matches)
+    reuses_ids = False    # the next id can be MAX(id) + 1 even if a higher one was issued and deleted
+    connection_errors = ()  # driver errors after which a connection is dropped instead of reused
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        raise NotImplementedError
+
+    def ping(self, raw):
+        raw.ping(reconnect=False)
+
+    def cancel(self, task):
+        raise NotImplementedError
+
+    @contextmanager
+    def migration_lock(self, cur):
+        yield
+
+    def schema_version(self, cur):
+        # None when the schema_version table does not exist yet
+        try:
+            cur.execute("SELECT MAX(version) FROM schema_version")
+            return cur.fetchone()[0] or 0
+        except DB_ERRORS:
+            return None
+
+    def ensure_index(self, cur, table, index, columns, fulltext=False):
+        raise NotImplementedError
+
+    def ensure_trigger(self, cur, name, table, event, statement, timing="AFTER"):
+        raise NotImplementedError
+
+    def ensure_column(self, cur, table, column, definition):
+        raise NotImplementedError
+
+    def ensure_change_log(self, cur, tables):
+        # every insert/update/delete on tables appends (table, id, op) to change_log;
+        # replicas pull the ids changed after the last seq they saw
+        cur.execute(f'''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq {self.pk_type},
+                table_name VARCHAR(30) NOT NULL,
+                record_id INT NOT NULL,
+                op CHAR(1) NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.ensure_index(cur, "change_log", "idx_change_log_record", ["table_name", "record_id", "seq"])
+        for table in tables:
+            for event, op, row in (("INSERT", "I", "NEW"), ("UPDATE", "U", "NEW"), ("DELETE", "D", "OLD")):
+                self.ensure_trigger(cur, f"{table}_log_{event.lower()}", table, event,
+                                    f"INSERT INTO change_log (table_name, record_id, op) VALUES ('{table}', {row}.id, '{op}')")
+
+    def ensure_audit_log(self, cur):
+        cur.execute(f"CREATE TABLE IF NOT EXISTS audit_log (id {self.pk_type}, {AUDIT_COLUMNS})")
+        self._audit_rules(cur)
+
+    def _audit_rules(self, cur):
+        # append-only: UPDATE and DELETE fail, so history can only grow
+        for event in ("UPDATE", "DELETE"):
+            self.ensure_trigger(cur, f"audit_log_no_{event.lower()}", "audit_log", event,
+                                self.abort_sql.format("audit_log is append-only"), timing="BEFORE")
+        # the filters of query_audit; each index ends in changed_at for the newest-first order
+        self.ensure_index(cur, "audit_log", "idx_audit_record", ["table_name", "record_id", "changed_at"])
+        self.ensure_index(cur, "audit_log", "idx_audit_table", ["table_name", "changed_at"])
+        self.ensure_index(cur, "audit_log", "idx_audit_user", ["user_name", "changed_at"])
+        self.ensure_index(cur, "audit_log", "idx_audit_time", ["changed_at"])
+
+    def ensure_audit_partitions(self, cur, months):
+        pass  # only MySQL partitions audit_log
+
+    def ensure_identity_keys(self, cur):
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS criminal_match_keys (
+                match_key VARCHAR(16) NOT NULL,
+                criminal_id INT NOT NULL,
+                PRIMARY KEY (match_key, criminal_id),
+                FOREIGN KEY (criminal_id) REFERENCES criminals(id) ON DELETE CASCADE
+            )
+        ''')
+        self.ensure_index(cur, "criminal_match_keys", "idx_match_keys_criminal", ["criminal_id"])
+        # pairs found by find_duplicates() or when a record was added, smaller id first
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS criminal_matches (
+                criminal_id INT NOT NULL,
+                match_id INT NOT NULL,
+                score FLOAT NOT NULL,
+                found_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (criminal_id, match_id),
+                FOREIGN KEY (criminal_id) REFERENCES criminals(id) ON DELETE CASCADE,
+                FOREIGN KEY (match_id) REFERENCES criminals(id) ON DELETE CASCADE
+            )
+        ''')
+        self.ensure_index(cur, "criminal_matches", "idx_criminal_matches_match", ["match_id"])
+        backfill_identity_keys(cur, self)
+
+    def index_identities(self, conn, rows):
+        # refreshes the blocking keys of (id, name, age, gender) criminals rows
+        if not self.identity_keys or not rows:
+            return
+        cur = conn.cursor()
+        try:
+            write_identity_keys(cur, self, rows)
+        finally:
+            cur.close()
+
+    def reindex_identities(self, conn, where, params=()):
+        # index_identities for the criminals matching where, read back from the table
+        if not self.identity_keys:
+            return
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT id, name, age, gender FROM criminals WHERE {where}", tuple(params))
+            write_identity_keys(cur, self, cur.fetchall())
+        finally:
+            cur.close()
+
+    def estimated_counts(self, conn, tables):
+        return None  # no cheap estimate: callers fall back to exact counts
+
+    def search(self, conn, text, limit, offset):
+        raise NotImplementedError
+
+    # -- records --
+    def columns(self, table):
+        return TABLES[table].columns
+
+    # single-row statements are the hot path: their SQL comes prebuilt from TABLES and runs on
+    # conn.prepared(), so each pooled connection parses it once
+    def insert_record(self, conn, table, values, with_id=False):
+        meta = TABLES[table]
+        cur = conn.prepared(meta.insert_with_id_sql if with_id else meta.insert_sql)
+        cur.execute(tuple(values))
+        if conn.auditing:
+            conn.audit(table, values[0] if with_id else cur.lastrowid, "I", None, values[1:] if with_id else values)
+        if table == "criminals":
+            self.index_identities(conn, [tuple(values[:4]) if with_id else (cur.lastrowid, *values[:3])])
+        return cur.lastrowid
+
+    def insert_many(self, conn, table, rows, with_id=False):
+        cols = (["id"] if with_id else []) + self.columns(table)
+        keyed = table == "criminals" and self.identity_keys
+        if conn.auditing and not with_id:
+            # executemany reports no ids, and concurrent inserts can interleave theirs (MySQL), so
+            # an audited import goes row by row to log each record under its id
+            cur = conn.prepared(TABLES[table].insert_sql)
+            ids = []
+            for row in rows:
+                cur.execute(tuple(row))
+                ids.append(cur.lastrowid)
+            if keyed:
+                self.index_identities(conn, [(i, *row[:3]) for i, row in zip(ids, rows)])
+            for i, row in zip(ids, rows):
+                conn.audit(table, i, "I", None, row)
+            return
+        cur = conn.cursor()
+        try:
+            if keyed and not with_id:
+                # executemany reports no ids; the new rows are the ones above the current highest
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM criminals")
+                high = cur.fetchone()[0]
+            cur.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s']*len(cols))})", rows)
+        finally:
+            cur.close()
+        if keyed:
+            if with_id:
+                self.index_identities(conn, [tuple(r[:4]) for r in rows])
+            else:
+                self.reindex_identities(conn, "id > %s", (high,))
+        if conn.auditing:
+            for row in rows:
+                conn.audit(table, row[0], "I", None, row[1:])
+
+    def _audit_before(self, conn, table, ids):
+        # audit entries for deleting ids from table: the rows themselves plus what their foreign
+        # keys cascade to, read (and locked, on MySQL) before the delete; None when not audited
+        if not conn.auditing:
+            return None
+        entries = []
+        cur = conn.cursor()
+        try:
+            marks = ", ".join(["%s"] * len(ids))
+            for child, column, op in [(table, "id", "D")] + AUDIT_CASCADES.get(table, []):
+                cols = self.columns(child)
+                cur.execute(f"SELECT id, {', '.join(cols)} FROM {child} WHERE {column} IN ({marks}){self.row_lock}", tuple(ids))
+                for row in cur.fetchall():
+                    after = [None if c == column else v for c, v in zip(cols, row[1:])] if op == "U" else None
+                    entries.append((child, row[0], op, row[1:], after))
+        finally:
+            cur.close()
+        return entries
+
+    def get_records(self, conn, table, ids, with_version=False):
+        # (id, *columns) for the ids that exist, plus the row version last when with_version
+        if not ids:
+            return []
+        cols = self.columns(table) + (["version"] if with_version else [])
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT id, {', '.join(cols)} FROM {table} WHERE id IN ({', '.join(['%s']*len(ids))})",
+                        tuple(ids))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def get_record(self, conn, table, record_id, lock=False):
+        # lock: hold the row until commit (MySQL) so an audit before image stays exact
+        meta = TABLES[table]
+        cur = conn.prepared(meta.select_sql + self.row_lock if lock else meta.select_sql)
+        rows = cur.execute((record_id,)).fetchall()
+        return rows[0] if rows else None
+
+    def get_versioned(self, conn, table, record_id):
+        # (columns, version) of a record, or None; pass the version back to update_columns
+        rows = conn.prepared(TABLES[table].select_version_sql).execute((record_id,)).fetchall()
+        return (tuple(rows[0][:-1]), rows[0][-1]) if rows else None
+
+    def update_record(self, conn, table, record_id, values, version=None):
+        # every column; see update_columns
+        return self.update_columns(conn, table, record_id, dict(zip(self.columns(table), values)), version)
+
+    def update_columns(self, conn, table, record_id, changes, version=None):
+        # writes only the {column: value} given and bumps the row version. With version (as read by
+        # get_versioned) the write is conditional on nobody having changed the row since: if someone
+        # has, nothing is written and RecordConflict carries the current row. Returns the rowcount.
+        meta = TABLES[table]
+        cols = [c for c in meta.columns if c in changes]
+        if len(cols) != len(changes):
+            raise ValueError(f"Unknown {table} column: {', '.join(sorted(set(changes) - set(cols)))}")
+        if not cols:
+            return 0
+        before = self.get_record(conn, table, record_id, lock=True) if conn.auditing else None
+        cur = conn.prepared(meta.update_columns_sql(cols, version is not None))
+        cur.execute((*[changes[c] for c in cols], record_id) + (() if version is None else (version,)))
+        if not cur.rowcount:
+            current = self.get_versioned(conn, table, record_id) if version is not None else None
+            if current is not None:
+                raise RecordConflict(table, record_id, version, *current)
+            return 0
+        after = [changes.get(c, v) for c, v in zip(meta.columns, before)] if before is not None else None
+        if before is not None:
+            conn.audit(table, record_id, "U", before, after)
+        if table == "criminals" and not {"name", "age", "gender"}.isdisjoint(cols) and \
+                (before is None or tuple(before[:3]) != tuple(after[:3])):
+            self.reindex_identities(conn, "id = %s", (record_id,))
+        return cur.rowcount
+
+    def delete_record(self, conn, table, record_id):
+        entries = self._audit_before(conn, table, [record_id])
+        cur = conn.prepared(TABLES[table].delete_sql)
+        cur.execute((record_id,))
+        if cur.rowcount and entries:
+            for entry in entries:
+                conn.audit(*entry)
+        return cur.rowcount
+
+    def update_field(self, conn, table, column, value, ids):
+        # one column set to one value on every id
+        if column not in self.columns(table):
+            raise ValueError(f"Unknown column: {column}")
+        index = self.columns(table).index(column)
+        before = None
+        cur = conn.cursor()
+        try:
+            marks = ", ".join(["%s"] * len(ids))
+            if conn.auditing:
+                cur.execute(f"SELECT id, {', '.join(self.columns(table))} FROM {table} WHERE id IN ({marks}){self.row_lock}",
+                            tuple(ids))
+                before = cur.fetchall()
+            cur.execute(f"UPDATE {table} SET {column}=%s, version=version+1 WHERE id IN ({marks})", (value, *ids))
+            for row in before or ():
+                conn.audit(table, row[0], "U", row[1:], row[1:index + 1] + (value,) + row[index + 2:])
+            if table == "criminals" and column in ("name", "age", "gender"):
+                self.reindex_identities(conn, f"id IN ({marks})", ids)
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def delete_records(self, conn, table, ids):
+        entries = self._audit_before(conn, table, ids)
+        cur = conn.cursor()
+        try:
+            cur.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s']*len(ids))})", tuple(ids))
+            for entry in entries or ():
+                conn.audit(*entry)
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def case_dossier(self, conn, case_id, after=None, limit=EVIDENCE_PAGE):
+        # the case, its officer and one page of its evidence (keyset on evidence id) in one JOIN.
+        # The evidence range is in the ON clause so the case row comes back even when no evidence
+        # is left; idx_evidence_case serves case_id = ? AND id > ? ORDER BY id (it ends in the id).
+        after_sql = " AND e.id > %s" if after is not None else ""
+        count_sql = "(SELECT COUNT(*) FROM evidence WHERE case_id = c.id)" if after is None else "NULL"
+        cur = conn.cursor()
+        try:
+            cur.execute(f"""
+                SELECT c.id, c.case_name, c.case_date, c.description,
+                       o.id, o.name, o.officer_rank, o.department, {count_sql},
+                       e.id, e.evidence_type, e.description
+                FROM cases c
+                LEFT JOIN officers o ON o.id = c.officer_id
+                LEFT JOIN evidence e ON e.case_id = c.id{after_sql}
+                WHERE c.id = %s
+                ORDER BY e.id
+                LIMIT %s
+            """, ((after,) if after is not None else ()) + (case_id, limit + 1))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        if not rows:
+            return None
+        first = rows[0]
+        evidence = [r[9:] for r in rows if r[9] is not None]
+        return {
+            "case": first[0:4],
+            "officer": first[4:8] if first[4] is not None else None,
+            "evidence_count": first[8],
+            "evidence": evidence[:limit],
+            "has_next": len(evidence) > limit,
+        }
+
+    def count_records(self, conn, tables):
+        # all counts in one round trip
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {t})" for t in tables))
+            return {t: (n or 0) for t, n in zip(tables, cur.fetchone())}
+        finally:
+            cur.close()
+
+    # -- users --
+    def check_login(self, conn, username, password):
+        cur = conn.prepared("SELECT id FROM users WHERE username=%s AND password=%s")
+        return bool(cur.execute((username, password)).fetchall())
+
+    def create_user(self, conn, username, password):
+        cur = conn.cursor()
+        try:
+            cur.execute("INSERT INTO users (username, password) VALUES (%s,%s)", (username, password))
+        finally:
+            cur.close()
+
+    def set_password(self, conn, username, password):
+        cur = conn.cursor()
+        try:
+            cur.execute("UPDATE users SET password=%s WHERE username=%s", (password, username))
+        finally:
+            cur.close()
+
+class MySQLStorage(Storage):
+    name = "mysql"
+    pk_type = "INT AUTO_INCREMENT PRIMARY KEY"
+    insert_ignore = "INSERT IGNORE INTO {table} {rows}"
+    month_sql = "DATE_FORMAT({}, '%Y-%m')"
+    abort_sql = "SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = '{}'"
+    row_lock = " FOR UPDATE"
+    reuses_ids = True  # before 8.0, InnoDB resets AUTO_INCREMENT to MAX(id) + 1 on restart
+    connection_errors = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+    _audit_partitions = None  # names of the audit_log partitions, read once
+
+    def connect(self):
+        return mysql.connector.connect(**{k: v for k, v in self.config.items() if k not in NON_DRIVER_KEYS})
+
+    def cancel(self, task):
+        # KILL QUERY from a second connection; the task lock keeps its connection from
+        # being handed to another query while the KILL is in flight
+        conn = None
+        try:
+            with query_tag("kill_query"):
+                conn = get_pool().acquire()
+                with task._lock:
+                    if task.conn is not None:
+                        cur = conn.cursor()
+                        cur.execute(f"KILL QUERY {int(task.conn.connection_id)}")
+                        cur.close()
+        except Exception:
+            pass  # the statement finishes normally and its result is dropped
+        finally:
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def migration_lock(self, cur):
+        # serialise concurrent app starts against the same database
+        cur.execute("SELECT GET_LOCK('crimetrack_migrate', 60)")
+        cur.fetchone()
+        try:
+            yield
+        finally:
+            cur.execute("SELECT RELEASE_LOCK('crimetrack_migrate')")
+            cur.fetchone()
+
+    def _index_exists(self, cur, table, index, columns, fulltext):
+        # true if the index name exists, or an index of the same kind already leads with these columns
+        cur.execute("""
+            SELECT index_name, MAX(index_type), GROUP_CONCAT(column_name ORDER BY seq_in_index)
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE table_schema=DATABASE() AND table_name=%s
+            GROUP BY index_name
+        """, (table,))
+        wanted = ",".join(columns).lower()
+        for name, index_type, cols in cur.fetchall():
+            if name.lower() == index.lower():
+                return True
+            cols = (cols or "").lower()
+            if (index_type == "FULLTEXT") == fulltext and (cols == wanted or cols.startswith(wanted + ",")):
+                return True
+        return False
+
+    def ensure_index(self, cur, table, index, columns, fulltext=False):
+        if not self._index_exists(cur, table, index, columns, fulltext):
+            kind = "FULLTEXT INDEX" if fulltext else "INDEX"
+            cur.execute(f"CREATE {kind} {index} ON {table}({', '.join(columns)})")
+
+    def ensure_trigger(self, cur, name, table, event, statement, timing="AFTER"):
+        cur.execute("SELECT COUNT(*) FROM INFORMATION_SCHEMA.TRIGGERS WHERE trigger_schema=DATABASE() AND trigger_name=%s",
+                    (name,))
+        if not cur.fetchone()[0]:
+            cur.execute(f"CREATE TRIGGER {name} {timing} {event} ON {table} FOR EACH ROW {statement}")
+
+    def ensure_column(self, cur, table, column, definition):
+        cur.execute("SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE table_schema=DATABASE() AND table_name=%s "
+                    "AND column_name=%s", (table, column))
+        if not cur.fetchone()[0]:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def ensure_audit_log(self, cur):
+        # one RANGE partition per month: time-range queries read only their months, and old months
+        # can be dropped whole. The partition key has to be part of the primary key.
+        month = datetime.now(timezone.utc).strftime("%Y-%m")
+        cur.execute(f"CREATE TABLE IF NOT EXISTS audit_log (id BIGINT NOT NULL AUTO_INCREMENT, {AUDIT_COLUMNS}, "
+                    f"PRIMARY KEY (id, changed_at)) PARTITION BY RANGE (TO_DAYS(changed_at)) ("
+                    f"PARTITION p_start VALUES LESS THAN (TO_DAYS('{month}-01')), "
+                    f"PARTITION p_future VALUES LESS THAN MAXVALUE)")
+        self.ensure_audit_partitions(cur, [month, _next_month(month)[:7]])
+        self._audit_rules(cur)
+
+    def ensure_audit_partitions(self, cur, months):
+        # splits a partition per 'YYYY-MM' off the catch-all p_future before rows for it arrive
+        # (months below the newest partition already have one); the writer calls this per batch
+        if self._audit_partitions is None:
+            cur.execute("SELECT partition_name FROM INFORMATION_SCHEMA.PARTITIONS "
+                        "WHERE table_schema=DATABASE() AND table_name='audit_log'")
+            self._audit_partitions = {r[0].lower() for r in cur.fetchall() if r[0]}
+        newest = max((p for p in self._audit_partitions if p[1:].isdigit()), default="p000000")
+        for month in sorted(months):
+            name = "p" + month.replace("-", "")
+            if name <= newest:
+                continue
+            try:
+                cur.execute(f"ALTER TABLE audit_log REORGANIZE PARTITION p_future INTO ("
+                            f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{_next_month(month)}')), "
+                            f"PARTITION p_future VALUES LESS THAN MAXVALUE)")
+            except mysql.connector.Error:
+                self._audit_partitions = None  # another process split it first
+                return self.ensure_audit_partitions(cur, months)
+            self._audit_partitions.add(name)
+            newest = name
+
+    def estimated_counts(self, conn, tables):
+        placeholders = ", ".join(["%s"] * len(tables))
+        cur = conn.cursor()
+        try:
+            cur.execute(f"""
+                SELECT table_name, table_rows
+                FROM INFORMATION_SCHEMA.TABLES
+                WHERE table_schema=DATABASE() AND table_name IN ({placeholders})
+            """, tuple(tables))
+            return {name: (rows or 0) for name, rows in cur.fetchall()}
+        finally:
+            cur.close()
+
+    def search(self, conn, text, limit, offset):
+        match = "MATCH({col}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+        parts, params, counts = [], [], []
+        for table, title, col in SEARCH_SOURCES:
+            m = match.format(col=col)
+            # each branch only sorts the rows the requested page can reach
+            parts.append(f"(SELECT '{table}' AS src, id, {title} AS title, LEFT({col}, 200) AS snippet, {m} AS score "
+                         f"FROM {table} WHERE {m} ORDER BY score DESC, id LIMIT %s)")
+            params += [text, text, offset + limit]
+            counts.append(f"(SELECT COUNT(*) FROM {table} WHERE {m})")
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT " + " + ".join(counts), [text] * len(counts))
+            total = cur.fetchone()[0] or 0
+            cur.execute(" UNION ALL ".join(parts) + " ORDER BY score DESC, src, id LIMIT %s OFFSET %s",
+                        params + [limit, offset])
+            return total, cur.fetchall()
+        finally:
+            cur.close()
+
+class SQLiteStorage(Storage):
+    # local single-file database for offline/field use; WAL lets readers run during writes
+    name = "sqlite"
+    pk_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    like_escape = " ESCAPE '\\'"
+    explain_prefix = "EXPLAIN QUERY PLAN "
+    # not INSERT OR IGNORE: inside triggers run by ON DELETE SET NULL, SQLite overrides it with ABORT
+    insert_ignore = "INSERT INTO {table} {rows} ON CONFLICT DO NOTHING"
+    month_sql = "strftime('%Y-%m', {})"
+    abort_sql = "SELECT RAISE(ABORT, '{}')"
+
+    def connect(self):
+        return SQLiteConnection(self.config.get("sqlite_path", "crimetrack.db"))
+
+    def cancel(self, task):
+        with task._lock:
+            if task.conn is not None:
+                task.conn.interrupt()
+
+    def ensure_index(self, cur, table, index, columns, fulltext=False):
+        if not fulltext:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table}({', '.join(columns)})")
+            return
+        # FTS5 table over the column, kept in sync by triggers (external content)
+        fts = f"{table}_fts"
+        cols = ", ".join(columns)
+        new_vals = ", ".join(f"new.{c}" for c in columns)
+        old_vals = ", ".join(f"old.{c}" for c in columns)
+        cur.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id')")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+                    f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END")
+        cur.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    def ensure_trigger(self, cur, name, table, event, statement, timing="AFTER"):
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {timing} {event} ON {table} BEGIN {statement}; END")
+
+    def ensure_column(self, cur, table, column, definition):
+        cur.execute(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in cur.fetchall()}:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def search(self, conn, text, limit, offset):
+        # any of the words, ranked by bm25 (lower is better, so negated to match MySQL's order)
+        words = re.findall(r"\w+", text)
+        if not words:
+            return 0, []
+        query = " OR ".join(f'"{w}"' for w in words)
+        parts, counts = [], []
+        for table, title, col in SEARCH_SOURCES:
+            fts = f"{table}_fts"
+            parts.append(f"SELECT '{table}' AS src, t.id AS id, t.{title} AS title, substr(t.{col}, 1, 200) AS snippet, "
+                         f"-bm25({fts}) AS score FROM {fts} JOIN {table} t ON t.id = {fts}.rowid WHERE {fts} MATCH %s")
+            counts.append(f"(SELECT COUNT(*) FROM {fts} WHERE {fts} MATCH %s)")
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT " + " + ".join(counts), [query] * len(counts))
+            total = cur.fetchone()[0] or 0
+            cur.execute("SELECT * FROM (" + " UNION ALL ".join(parts) + ") ORDER BY score DESC, src, id LIMIT %s OFFSET %s",
+                        [query] * len(parts) + [limit, offset])
+            return total, cur.fetchall()
+        finally:
+            cur.close()
+
+STORAGE_BACKENDS = {"mysql": MySQLStorage, "sqlite": SQLiteStorage}
+_storage = None
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        backend = DB_CONFIG.get("backend", "mysql")
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        _storage = STORAGE_BACKENDS[backend](DB_CONFIG)
+    return _storage
+
+# ------------- Connection Pool -------------
+class PreparedStatement:
+    # a fixed statement bound to a cursor that lives as long as its driver connection;
+    # MySQL prepares it server-side on first execute and reuses the plan after that
+    def __init__(self, sql, cursor):
+        self.sql = sql
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, params=()):
+        self._cursor.execute(self.sql, params)
+        return self
+
+class PooledConnection:
+    # thin proxy around a driver connection; close() hands it back to the pool
+    def __init__(self, pool, raw, created, statements):
+        self.pool = pool
+        self.storage = pool.storage  # the backend this connection speaks
+        self._raw = raw
+        self._created = created
+        self._statements = statements  # sql -> (sql, driver cursor), kept with raw in the pool
+        self._broken = False
+        self._audit = []  # audit entries of the open transaction; handed to the writer on commit
+
+    @property
+    def auditing(self):
+        return self.storage.audited and AUDIT_CONFIG.get("enabled", True)
+
+    def audit(self, table, record_id, op, before, after):
+        # before/after are column values in TABLES order (None for an insert / a delete)
+        self._audit.append((datetime.now(timezone.utc).replace(tzinfo=None), current_audit_user(), current_tag(),
+                            table, record_id, op, None if before is None else tuple(before),
+                            None if after is None else tuple(after)))
+
+    def commit(self):
+        if self._raw is None:
+            raise mysql.connector.errors.InterfaceError("Connection already returned to pool")
+        try:
+            self._raw.commit()
+        except Exception as e:
+            self.failed(e)
+            raise
+        if self._audit:
+            entries, self._audit = self._audit, []
+            get_audit_writer().submit(entries)
+
+    def rollback(self):
+        self._audit = []
+        if self._raw is None:
+            raise mysql.connector.errors.InterfaceError("Connection already returned to pool")
+        try:
+            self._raw.rollback()
+        except Exception as e:
+            self.failed(e)
+            raise
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise mysql.connector.errors.InterfaceError("Connection already returned to pool")
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._raw is None:
+            raise mysql.connector.errors.InterfaceError("Connection already returned to pool")
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs), self.pool, self)
+
+    def prepared(self, sql):
+        # cursor for a hot statement, created once per driver connection and never closed by callers
+        if self._raw is None:
+            raise mysql.connector.errors.InterfaceError("Connection already returned to pool")
+        entry = self._statements.get(sql)
+        if entry is None:
+            # the driver re-prepares unless it sees the very same string object, so keep the first one
+            entry = self._statements[sql] = (sql, self._raw.cursor(prepared=True))
+            self.pool._count("prepared")
+        return PreparedStatement(entry[0], InstrumentedCursor(entry[1], self.pool, self))
+
+    def discard(self):
+        # mark as unusable so close() drops it instead of recycling it
+        self._broken = True
+
+    def failed(self, error):
+        # a lost or unusable connection (MySQL gone away, reset, timed out) is not put back in the pool
+        if isinstance(error, self.storage.connection_errors):
+            self.discard()
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._audit = []  # released connections roll back
+        self.pool.release(raw, self._created, self._statements, broken=self._broken)
+
+class ConnectionPool:
+    # bounded, thread-safe pool; at most pool_size connections are open at once
+    def __init__(self, config, storage):
+        self.storage = storage
+        self.size = max(1, int(config.get("pool_size", 5)))
+        self.timeout = config.get("pool_timeout", 10)
+        self.recycle = config.get("pool_recycle", 1800)
+        self.ping_after = config.get("pool_ping_after", 30)
+        self._idle = deque()  # (raw, created, last_used, statements), most recently used on the right
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.counters = {"hits": 0, "misses": 0, "waits": 0, "timeouts": 0,
+                         "recycled": 0, "prepared": 0, "wait_seconds": 0.0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def _healthy(self, raw, created, last_used):
+        now = time.monotonic()
+        if now - created > self.recycle:
+            return False
+        if now - last_used > self.ping_after:
+            try:
+                self.storage.ping(raw)
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, raw):
+        self._count("recycled")
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        start = time.perf_counter()
+        conn = self._acquire()
+        query_stats.record_acquire(current_tag(), time.perf_counter() - start)
+        return conn
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            self._count("waits")
+            start = time.monotonic()
+            ok = self._slots.acquire(timeout=self.timeout)
+            self._count("wait_seconds", time.monotonic() - start)
+            if not ok:
+                self._count("timeouts")
+                raise mysql.connector.errors.PoolError(
+                    f"No free database connection after {self.timeout}s (pool_size={self.size})")
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    break
+                raw, created, last_used, statements = entry
+                if self._healthy(raw, created, last_used):
+                    self._count("hits")
+                    return self._checkout(raw, created, statements)
+                self._discard(raw)
+            raw = self.storage.connect()
+            self._count("misses")
+            return self._checkout(raw, time.monotonic(), {})
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkout(self, raw, created, statements):
+        with self._lock:
+            self._in_use += 1
+        return PooledConnection(self, raw, created, statements)
+
+    def release(self, raw, created, statements, broken=False):
+        try:
+            if not broken:
+                try:
+                    # drop uncommitted work; fails on a dead or desynced connection
+                    raw.rollback()
+                except Exception:
+                    broken = True
+            if broken or time.monotonic() - created > self.recycle:
+                self._discard(raw)
+            else:
+                with self._lock:
+                    self._idle.append((raw, created, time.monotonic(), statements))
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw, *_ in idle:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            snap = dict(self.counters)
+            snap.update(size=self.size, idle=len(self._idle), in_use=self._in_use)
+        return snap
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, get_storage())
+    return _pool
+
+def pool_stats():
+    return get_pool().stats()
+
+def close_pool():
+    close_audit()  # flush queued audit entries first
+    if _pool is not None:
+        _pool.close_all()
+
+# ------------- Schema migrations -------------
+def _m001_base_schema(cur, storage):
+    # the original init_db schema; IF NOT EXISTS keeps it safe on databases created before migrations.
+    # Only the auto-increment key differs between backends.
+    pk = storage.pk_type
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS users (
+            id {pk},
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password VARCHAR(50) NOT NULL
+        )
+    ''')
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS criminals (
+            id {pk},
+            name VARCHAR(100) NOT NULL,
+            age INT,
+            gender VARCHAR(10),
+            crime VARCHAR(255),
+            crime_date DATE,
+            status VARCHAR(50)
+        )
+    ''')
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS officers (
+            id {pk},
+            name VARCHAR(100) NOT NULL,
+            officer_rank VARCHAR(50),
+            department VARCHAR(100)
+        )
+    ''')
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS cases (
+            id {pk},
+            case_name VARCHAR(100) NOT NULL,
+            case_date DATE,
+            description TEXT,
+            officer_id INT,
+            FOREIGN KEY (officer_id) REFERENCES officers(id) ON DELETE SET NULL
+        )
+    ''')
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS evidence (
+            id {pk},
+            case_id INT,
+            evidence_type VARCHAR(100),
+            description TEXT,
+            FOREIGN KEY (case_id) REFERENCES cases(id) ON DELETE CASCADE
+        )
+    ''')
+    storage.ensure_index(cur, "criminals", "idx_criminal_name", ["name"])
+
+def _m002_fulltext_indexes(cur, storage):
+    # global search (search_records)
+    storage.ensure_index(cur, "criminals", "ft_criminals_crime", ["crime"], fulltext=True)
+    storage.ensure_index(cur, "cases", "ft_cases_description", ["description"], fulltext=True)
+    storage.ensure_index(cur, "evidence", "ft_evidence_description", ["description"], fulltext=True)
+
+def _m003_query_indexes(cur, storage):
+    # case load per officer and date ranges, evidence lookups per case (delete cascade),
+    # status/date filters on criminals
+    storage.ensure_index(cur, "cases", "idx_cases_officer_date", ["officer_id", "case_date"])
+    storage.ensure_index(cur, "cases", "idx_cases_date", ["case_date"])
+    storage.ensure_index(cur, "evidence", "idx_evidence_case", ["case_id"])
+    storage.ensure_index(cur, "criminals", "idx_criminals_status_date", ["status", "crime_date"])
+    storage.ensure_index(cur, "criminals", "idx_criminals_crime_date", ["crime_date"])
+
+def _m004_change_log(cur, storage):
+    # triggers record every change to the synced tables (see ReplicaStorage.pull)
+    storage.ensure_change_log(cur, SYNC_TABLES)
+
+def _m005_reports(cur, storage):
+    # summary tables for the dashboard charts, kept current by triggers (see refresh_reports)
+    storage.ensure_index(cur, "evidence", "idx_evidence_type", ["evidence_type"])
+    ensure_reports(cur, storage)
+    rebuild_reports(cur, storage, archive=False)
+
+def _m006_audit_log(cur, storage):
+    # before/after images of record writes, written by AuditWriter
+    storage.ensure_audit_log(cur)
+
+def _m007_attachments(cur, storage):
+    # metadata of files attached to evidence; the files themselves live in AttachmentStore
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS attachments (
+            id {storage.pk_type},
+            evidence_id INT NOT NULL,
+            sha256 CHAR(64) NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            content_type VARCHAR(100),
+            size BIGINT NOT NULL,
+            uploaded_by VARCHAR(50),
+            uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (evidence_id) REFERENCES evidence(id) ON DELETE CASCADE
+        )
+    ''')
+    storage.ensure_index(cur, "attachments", "idx_attachments_evidence", ["evidence_id"])
+    storage.ensure_index(cur, "attachments", "idx_attachments_sha", ["sha256"])
+
+def _m008_identity_keys(cur, storage):
+    # blocking keys for fuzzy identity matching, filled in for the existing criminals
+    storage.ensure_identity_keys(cur)
+
+def _m009_record_versions(cur, storage):
+    # row versions for optimistic concurrency (Storage.update_columns); replicas copy them
+    for table in SYNC_TABLES:
+        storage.ensure_column(cur, table, "version", "INT NOT NULL DEFAULT 1")
+
+def _m010_archive(cur, storage):
+    # cold tier for old closed records (see archive_records); the reports count both tiers
+    ensure_archive(cur, storage)
+
+# (version, description, function); append new migrations, never edit shipped ones
+MIGRATIONS = [
+    (1, "base schema", _m001_base_schema),
+    (2, "full-text search indexes", _m002_fulltext_indexes),
+    (3, "indexes for case, evidence and criminal queries", _m003_query_indexes),
+    (4, "change log for replicas", _m004_change_log),
+    (5, "report summary tables", _m005_reports),
+    (6, "append-only audit log", _m006_audit_log),
+    (7, "evidence attachments", _m007_attachments),
+    (8, "identity matching keys", _m008_identity_keys),
+    (9, "record versions", _m009_record_versions),
+    (10, "archive tables", _m010_archive),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn, storage=None):
+    # applies pending migrations; returns the versions applied (empty when already current)
+    storage = storage or conn.storage
+    cur = conn.cursor()
+    try:
+        if storage.schema_version(cur) == SCHEMA_VERSION:
+            return []  # fast path: a single query at startup
+        with storage.migration_lock(cur):
+            version = storage.schema_version(cur)
+            if version is None:
+                cur.execute('''
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INT PRIMARY KEY,
+                        description VARCHAR(200),
+                        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                version = 0
+            applied = []
+            for v, description, step in MIGRATIONS:
+                if v <= version:
+                    continue
+                step(cur, storage)
+                cur.execute("INSERT INTO schema_version (version, description) VALUES (%s,%s)", (v, description))
+                conn.commit()
+                applied.append(v)
+            return applied
+    finally:
+        cur.close()
+
+# ------------- Local replica -------------
+SYNC_TABLES = ("officers", "criminals", "cases", "evidence")  # parents before children
+SYNC_ID_CHUNK = 500  # ids per IN (...) when fetching changed rows from the server
+
+class ReplicaStorage(SQLiteStorage):
+    # local SQLite copy of SYNC_TABLES for remote stations. Reads are served from it and
+    # sync() moves only deltas: it pushes the writes queued while the server was unreachable,
+    # then pulls the rows named in the server's change_log since the last sync.
+    # Record writes made through this storage are applied locally and queued in replica_outbox.
+    name = "replica"
+    audited = False  # the server audits these writes when push() replays them
+    identity_keys = False  # and keys them for identity matching
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.pool = ConnectionPool(config, self)
+        self.ready = False   # true once the first snapshot is in
+        self.online = True
+        self.last_sync = None
+        self._sync_lock = threading.Lock()
+
+    def prepare(self):
+        conn = self.pool.acquire()
+        try:
+            with query_tag("replica.prepare"):
+                migrate(conn, self)
+                self.ready = self._position(conn) is not None
+        finally:
+            conn.close()
+
+    def set_online(self, online, error=None):
+        if online != self.online:
+            if online:
+                log.warning("server reachable again; queued writes go out with the next sync")
+            else:
+                log.warning("server unreachable, serving the local replica and queueing writes: %s", error)
+        self.online = online
+
+    def ensure_audit_log(self, cur):
+        pass  # the server keeps the audit log
+
+    def ensure_identity_keys(self, cur):
+        pass  # identity lookups and the dedup job run on the server
+
+    def ensure_change_log(self, cur, tables):
+        # the replica keeps its own bookkeeping instead of a change log: the server change_log
+        # position it has applied, writes queued while offline, and queued writes the server rejected
+        cur.execute("CREATE TABLE IF NOT EXISTS replica_state (name VARCHAR(30) PRIMARY KEY, value INT)")
+        cur.execute(f'''
+            CREATE TABLE IF NOT EXISTS replica_outbox (
+                seq {self.pk_type},
+                table_name VARCHAR(30) NOT NULL,
+                record_id INT NOT NULL,
+                op CHAR(1) NOT NULL,
+                payload TEXT,
+                base_seq INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cur.execute(f'''
+            CREATE TABLE IF NOT EXISTS replica_conflicts (
+                id {self.pk_type},
+                table_name VARCHAR(30) NOT NULL,
+                record_id INT NOT NULL,
+                op CHAR(1) NOT NULL,
+                payload TEXT,
+                server_seq INT,
+                detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _position(self, conn):
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT value FROM replica_state WHERE name='last_seq'")
+            row = cur.fetchone()
+            return row[0] if row else None
+        finally:
+            cur.close()
+
+    def _set_position(self, conn, seq):
+        cur = conn.cursor()
+        try:
+            cur.execute("INSERT INTO replica_state (name, value) VALUES ('last_seq', %s) "
+                        "ON CONFLICT(name) DO UPDATE SET value=excluded.value", (seq,))
+        finally:
+            cur.close()
+
+    # -- offline writes: applied locally and queued for push() --
+    def _queue(self, conn, table, record_id, op, values=None):
+        payload = json.dumps(list(values), default=str) if values is not None else None
+        cur = conn.cursor()
+        try:
+            cur.execute("INSERT INTO replica_outbox (table_name, record_id, op, payload, base_seq) VALUES (%s,%s,%s,%s,%s)",
+                        (table, record_id, op, payload, self._position(conn)))
+            return cur.lastrowid
+        finally:
+            cur.close()
+
+    def insert_record(self, conn, table, values, with_id=False):
+        # the row gets a temporary negative id until push() learns the one the server assigns
+        seq = self._queue(conn, table, 0, "I", values)
+        cur = conn.cursor()
+        try:
+            cur.execute("UPDATE replica_outbox SET record_id=%s WHERE seq=%s", (-seq, seq))
+        finally:
+            cur.close()
+        super().insert_record(conn, table, [-seq] + list(values), with_id=True)
+        return -seq
+
+    def update_columns(self, conn, table, record_id, changes, version=None):
+        changed = super().update_columns(conn, table, record_id, changes, version)
+        if changed:
+            self._queue(conn, table, record_id, "U", self.get_record(conn, table, record_id))
+        return changed
+
+    def delete_record(self, conn, table, record_id):
+        changed = super().delete_record(conn, table, record_id)
+        if changed:
+            self._queue(conn, table, record_id, "D")
+        return changed
+
+    def update_field(self, conn, table, column, value, ids):
+        # queued row by row: the outbox replays whole-record writes
+        index = self.columns(table).index(column)
+        changed = 0
+        for record_id in ids:
+            row = self.get_record(conn, table, record_id)
+            if row is not None:
+                values = list(row)
+                values[index] = value
+                changed += self.update_record(conn, table, record_id, values)
+        return changed
+
+    def delete_records(self, conn, table, ids):
+        return sum(self.delete_record(conn, table, record_id) for record_id in ids)
+
+    # -- sync --
+    def upsert_records(self, conn, table, rows):
+        # rows of (id, *columns, version) as the server has them
+        if not rows:
+            return
+        cols = ["id"] + self.columns(table) + ["version"]
+        sets = ", ".join(f"{c}=excluded.{c}" for c in cols[1:])
+        cur = conn.cursor()
+        try:
+            cur.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s']*len(cols))}) "
+                            f"ON CONFLICT(id) DO UPDATE SET {sets}", rows)
+        finally:
+            cur.close()
+
+    def _remove(self, conn, table, ids):
+        # deletes without queueing; local foreign keys cascade like the server's
+        if not ids:
+            return
+        cur = conn.cursor()
+        try:
+            cur.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s']*len(ids))})", tuple(ids))
+        finally:
+            cur.close()
+
+    def _last_change(self, server, table, record_id):
+        cur = server.cursor()
+        try:
+            cur.execute("SELECT MAX(seq) FROM change_log WHERE table_name=%s AND record_id=%s", (table, record_id))
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def push(self, server, conn):
+        # replays queued writes in order. An update or delete whose row changed on the server
+        # after the replica last saw it is not applied: the server copy wins and the queued
+        # write is kept in replica_conflicts for someone to review.
+        stats = {"pushed": 0, "conflicts": 0}
+        storage = server.storage
+        own = {}    # (table, id) -> change_log seq of the write we just replayed
+        remap = {}  # (table, temporary id) -> server id for rows inserted offline
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT seq, table_name, record_id, op, payload, base_seq FROM replica_outbox ORDER BY seq")
+            queued = cur.fetchall()
+            for seq, table, record_id, op, payload, base_seq in queued:
+                record_id = remap.get((table, record_id), record_id)
+                if op != "I":
+                    latest = self._last_change(server, table, record_id)
+                    if latest is not None and latest > max(base_seq or 0, own.get((table, record_id), 0)):
+                        cur.execute("INSERT INTO replica_conflicts (table_name, record_id, op, payload, server_seq) "
+                                    "VALUES (%s,%s,%s,%s,%s)", (table, record_id, op, payload, latest))
+                        cur.execute("DELETE FROM replica_outbox WHERE seq=%s", (seq,))
+                        conn.commit()
+                        stats["conflicts"] += 1
+                        continue
+                values = json.loads(payload) if payload else None
+                if op == "I":
+                    new_id = storage.insert_record(server, table, values)
+                elif op == "U":
+                    storage.update_record(server, table, record_id, values)
+                else:
+                    storage.delete_record(server, table, record_id)
+                server.commit()
+                if op == "I":
+                    # the next pull brings the row back under its server id
+                    self._remove(conn, table, [record_id])
+                    cur.execute("UPDATE replica_outbox SET record_id=%s WHERE table_name=%s AND record_id=%s",
+                                (new_id, table, record_id))
+                    remap[(table, record_id)] = new_id
+                    record_id = new_id
+                cur.execute("DELETE FROM replica_outbox WHERE seq=%s", (seq,))
+                conn.commit()
+                own[(table, record_id)] = self._last_change(server, table, record_id) or 0
+                stats["pushed"] += 1
+        finally:
+            cur.close()
+        return stats
+
+    def _snapshot(self, server, conn, batch):
+        # first sync: copy every table in id order
+        total = 0
+        scur = server.cursor()
+        cur = conn.cursor()
+        try:
+            for table in reversed(SYNC_TABLES):
+                cur.execute(f"DELETE FROM {table}")
+            for table in SYNC_TABLES:
+                cols = ", ".join(["id"] + self.columns(table) + ["version"])
+                last_id = 0
+                while True:
+                    scur.execute(f"SELECT {cols} FROM {table} WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch))
+                    rows = scur.fetchall()
+                    if not rows:
+                        break
+                    self.upsert_records(conn, table, rows)
+                    total += len(rows)
+                    last_id = rows[-1][0]
+        finally:
+            scur.close()
+            cur.close()
+        return total
+
+    def pull(self, server, conn):
+        # applies everything up to the server's current change_log position in one local
+        # transaction; foreign keys are checked at commit, so the order inside it does not matter.
+        # Only the current server row of each changed id is fetched; a missing row is a delete.
+        batch = self.config.get("batch", 5000)
+        stats = {"snapshot": 0, "changed": 0}
+        scur = server.cursor()
+        cur = conn.cursor()
+        try:
+            cur.execute("PRAGMA defer_foreign_keys = ON")
+            cur.execute("SELECT DISTINCT table_name, record_id FROM replica_outbox")
+            pending = set(cur.fetchall())  # rows with queued writes keep their local version
+            scur.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+            high = scur.fetchone()[0]
+            position = self._position(conn)
+            if position is None:
+                stats["snapshot"] = self._snapshot(server, conn, batch)
+                position = high
+                scur.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+                high = scur.fetchone()[0]  # changes made while copying are replayed below
+            while position < high:
+                scur.execute("SELECT seq, table_name, record_id FROM change_log WHERE seq > %s AND seq <= %s "
+                             "ORDER BY seq LIMIT %s", (position, high, batch))
+                rows = scur.fetchall()
+                if not rows:
+                    break
+                changed = {}
+                for _, table, record_id in rows:
+                    if table in SYNC_TABLES and (table, record_id) not in pending:
+                        changed.setdefault(table, set()).add(record_id)
+                for table in SYNC_TABLES:
+                    ids = sorted(changed.get(table, ()))
+                    for i in range(0, len(ids), SYNC_ID_CHUNK):
+                        chunk = ids[i:i + SYNC_ID_CHUNK]
+                        found = server.storage.get_records(server, table, chunk, with_version=True)
+                        self.upsert_records(conn, table, found)
+                        self._remove(conn, table, sorted(set(chunk) - {r[0] for r in found}))
+                    stats["changed"] += len(ids)
+                position = rows[-1][0]
+            self._set_position(conn, position)
+            conn.commit()
+        finally:
+            scur.close()
+            cur.close()
+        self.ready = True
+        return stats
+
+    def sync(self, server, push=True):
+        # server is a connection to the central database; one sync runs at a time
+        with self._sync_lock:
+            conn = self.pool.acquire()
+            try:
+                stats = self.push(server, conn) if push else {"pushed": 0, "conflicts": 0}
+                stats.update(self.pull(server, conn))
+            finally:
+                conn.close()
+        self.set_online(True)
+        self.last_sync = (datetime.now(), stats)
+        if stats["pushed"] or stats["snapshot"] or stats["changed"]:
+            invalidate_caches()
+        return stats
+
+_replica = None
+_replica_lock = threading.Lock()
+
+def get_replica():
+    # None unless REPLICA_CONFIG["enabled"]
+    global _replica
+    if _replica is None and REPLICA_CONFIG.get("enabled"):
+        with _replica_lock:
+            if _replica is None:
+                _replica = ReplicaStorage(REPLICA_CONFIG)
+    return _replica
+
+def refresh_replica(conn):
+    # after a write on the server, pull it so reads from the replica see it straight away
+    replica = get_replica()
+    if replica is None or not replica.ready or conn.storage is replica:
+        return
+    try:
+        with query_tag("replica.refresh"):
+            replica.sync(conn, push=False)
+    except DB_ERRORS as e:
+        log.warning("replica refresh failed, the next sync catches up: %s", e)
+
+def close_replica():
+    if _replica is not None:
+        _replica.pool.close_all()
+
+def format_sync_stats(stats):
+    text = f"pulled {stats['changed']} changed rows"
+    if stats["snapshot"]:
+        text = f"copied {stats['snapshot']} rows, " + text
+    text = f"pushed {stats['pushed']} queued writes, " + text
+    if stats["conflicts"]:
+        text += f"; {stats['conflicts']} queued writes conflicted with server changes (kept in replica_conflicts)"
+    return text
+
+# ------------- CRUD -------------
+class RecordConflict(Exception):
+    # a versioned update found the record changed since it was read; current is the row as it is now
+    def __init__(self, table, record_id, version, current, current_version):
+        super().__init__(f"{table} record {record_id} was changed by someone else since it was loaded "
+                         f"(version {version}, now {current_version})")
+        self.table = table
+        self.record_id = record_id
+        self.version = version
+        self.current = current
+        self.current_version = current_version
+
+def _same_value(a, b):
+    # form entries are strings and empty for NULL; stored values are typed
+    return ("" if a is None else str(a)) == ("" if b is None else str(b))
+
+def record_diff(table, yours, theirs, base=None):
+    # field-level view of a conflict: (column, base, yours, theirs) for each column the two sides
+    # disagree on, or that someone else changed from base (the row as you loaded it). yours and
+    # base map column -> value; yours may hold only the columns being written.
+    rows = []
+    for column, now in zip(TABLES[table].columns, theirs):
+        was = None if base is None else base.get(column)
+        mine = yours.get(column, now if base is None else was)
+        if not _same_value(mine, now) or (base is not None and not _same_value(was, now)):
+            rows.append((column, was, mine, now))
+    return rows
+
+def changed_columns(table, values, base):
+    # {column: value} of the values (a whole row) that differ from base, the row as loaded
+    return {c: v for c, v, b in zip(TABLES[table].columns, values, base) if not _same_value(v, b)}
+
+def record_values(table, record, current=None):
+    # validated values for a write from {column or field name: value}, with the add dialog's rules.
+    # current (the stored row) fills the columns a partial update leaves out. Raises ValueError.
+    meta = TABLES[table]
+    row = {str(k).strip().lower().replace(" ", "_"): v for k, v in record.items()}
+    unknown = set(row) - set(meta.columns) - ({"id"} if current is None else set())
+    if unknown:
+        raise ValueError(f"Unknown {table} column: {', '.join(sorted(unknown))} (columns: {', '.join(meta.columns)})")
+    if current is not None:
+        row = {**dict(zip(meta.columns, current)), **row}
+    return _import_values(meta, row)
+
+# ------------- Paged record source -------------
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class RecordPager:
+    # lazy data source for view_records: one page per query, keyset pagination on
+    # (sort column, id), search and sorting done by the server. With include_archive the
+    # archive table is paged too and every row ends in an extra 0/1 "archived" flag.
+    def __init__(self, table_name, fields, pagesize=PAGE_SIZE):
+        self.table = table_name
+        self.columns = ["id"] + TABLES[table_name].columns
+        self.pagesize = pagesize
+        self.search = ""
+        self.include_archive = False
+        self.sort_col = "id"
+        self.descending = False
+        self.total = None
+        self.rows = []
+        self.has_next = False
+        self._generation = 0
+        self._starts = [None]   # cursor for the first row of each visited page
+        self._prefetched = {}   # (generation, cursor) -> rows
+        self._prefetching = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def page_index(self):
+        return len(self._starts) - 1
+
+    @property
+    def page_count(self):
+        if not self.total:
+            return 1
+        return (self.total + self.pagesize - 1) // self.pagesize
+
+    def set_search(self, text):
+        self.search = text.strip()
+        self._reset()
+
+    def set_sort(self, column, descending=False):
+        self.sort_col = column if column in self.columns else "id"
+        self.descending = descending
+        self._reset(keep_total=True)
+
+    def set_include_archive(self, include):
+        self.include_archive = bool(include) and self.table in ARCHIVED_TABLES
+        self._reset()
+
+    def _reset(self, keep_total=False):
+        with self._lock:
+            self._generation += 1
+            self._prefetched.clear()
+        self._starts = [None]
+        if not keep_total:
+            self.total = None
+
+    def _where(self, storage):
+        if not self.search:
+            return [], []
+        like = f"%{_like_escape(self.search)}%"
+        escape = storage.like_escape
+        parts = [f"{c} LIKE %s{escape}" for c in self.columns[1:]]
+        params = [like] * len(parts)
+        if self.search.isdigit():
+            parts.append("id = %s")
+            params.append(int(self.search))
+        return ["(" + " OR ".join(parts) + ")"], params
+
+    def _after(self, cursor):
+        # condition for rows strictly after cursor in the current sort order;
+        # NULLs sort first ascending and last descending (MySQL default)
+        if cursor is None:
+            return [], []
+        val, last_id = cursor
+        op = "<" if self.descending else ">"
+        if self.sort_col == "id":
+            return [f"id {op} %s"], [last_id]
+        c = self.sort_col
+        if val is None:
+            if self.descending:
+                return [f"({c} IS NULL AND id < %s)"], [last_id]
+            return [f"(({c} IS NULL AND id > %s) OR {c} IS NOT NULL)"], [last_id]
+        cond = f"{c} {op} %s OR ({c} = %s AND id {op} %s)"
+        if self.descending:
+            cond += f" OR {c} IS NULL"
+        return [f"({cond})"], [val, val, last_id]
+
+    def _page_query(self, cursor, storage):
+        where, params = self._where(storage)
+        after, after_params = self._after(cursor)
+        clauses = where + after
+        direction = "DESC" if self.descending else "ASC"
+        order = f"id {direction}" if self.sort_col == "id" else f"{self.sort_col} {direction}, id {direction}"
+        limit = self.pagesize + 1
+        if not self.include_archive:
+            sql = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += f" ORDER BY {order} LIMIT {limit}"
+            return sql, params + after_params
+        # each tier pages on its own indexes; the page is the first rows of the two merged
+        cond = " WHERE " + " AND ".join(clauses) if clauses else ""
+        parts = [f"SELECT * FROM (SELECT {', '.join(self.columns)}, {flag} AS archived FROM {table}{cond} "
+                 f"ORDER BY {order} LIMIT {limit}) AS tier{flag}"
+                 for flag, table in ((0, self.table), (1, f"{self.table}_archive"))]
+        return " UNION ALL ".join(parts) + f" ORDER BY {order} LIMIT {limit}", (params + after_params) * 2
+
+    def _fetch_page(self, conn, cursor):
+        sql, params = self._page_query(cursor, conn.storage)
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def matching_ids(self, conn, after=None, limit=PAGE_SIZE):
+        # ids of rows matching the current search, in id order, after a given id.
+        # Batch operations only touch the hot table, so the archive is left out here.
+        where, params = self._where(conn.storage)
+        if after is not None:
+            where.append("id > %s")
+            params.append(after)
+        sql = f"SELECT id FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        cur = conn.cursor()
+        try:
+            cur.execute(sql + f" ORDER BY id LIMIT {int(limit)}", params)
+            return [r[0] for r in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def _cursor_after(self, rows):
+        last = rows[self.pagesize - 1]
+        return (last[self.columns.index(self.sort_col)], last[0])
+
+    def page_after(self, conn, cursor=None):
+        # one page after a cursor, leaving the view's page state alone (CLI, API);
+        # returns (rows, cursor of the next page or None)
+        rows = self._fetch_page(conn, cursor)
+        if len(rows) > self.pagesize:
+            return rows[:self.pagesize], self._cursor_after(rows)
+        return rows, None
+
+    def count(self, conn):
+        where, params = self._where(conn.storage)
+        sql = f"SELECT COUNT(*) FROM {self.table}"
+        if where:
+            sql += " WHERE " + where[0]
+        if self.include_archive:
+            archived = f"SELECT COUNT(*) FROM {self.table}_archive" + (" WHERE " + where[0] if where else "")
+            sql, params = f"SELECT ({sql}) + ({archived})", params * 2
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            self.total = cur.fetchone()[0]
+        finally:
+            cur.close()
+        return self.total
+
+    def load(self, conn):
+        # (re)load the current page, using a prefetched result when one is ready
+        cursor = self._starts[-1]
+        self._pool = conn.pool  # prefetch from the same place (server or local replica)
+        with self._lock:
+            rows = self._prefetched.pop((self._generation, cursor), None)
+        if rows is None:
+            rows = self._fetch_page(conn, cursor)
+        if self.total is None:
+            self.count(conn)
+        self.has_next = len(rows) > self.pagesize
+        self.rows = rows[:self.pagesize]
+        if self.has_next:
+            self._prefetch(self._cursor_after(rows))
+        return self.rows
+
+    def next_page(self, conn):
+        if not self.has_next:
+            return self.rows
+        self._starts.append(self._cursor_after(self.rows))
+        return self.load(conn)
+
+    def prev_page(self, conn):
+        if len(self._starts) > 1:
+            self._starts.pop()
+        return self.load(conn)
+
+    def first_page(self, conn):
+        self._starts = [None]
+        return self.load(conn)
+
+    def _prefetch(self, cursor):
+        # fetch the following page on a background thread so "Next" is instant
+        key = (self._generation, cursor)
+        with self._lock:
+            if key in self._prefetched or self._prefetching == key:
+                return
+            self._prefetching = key
+
+        def work():
+            conn = None
+            try:
+                with query_tag("view_records.prefetch"):
+                    conn = (self._pool or get_pool()).acquire()
+                    rows = self._fetch_page(conn, cursor)
+                with self._lock:
+                    if key[0] == self._generation:
+                        self._prefetched[key] = rows
+            except Exception:
+                pass  # the page is fetched on demand instead
+            finally:
+                if conn is not None:
+                    conn.close()
+                with self._lock:
+                    if self._prefetching == key:
+                        self._prefetching = None
+
+        threading.Thread(target=work, daemon=True).start()
+
+# ------------- Batch operations -------------
+BATCH_CHUNK = 1000  # rows per statement and commit in batch updates/deletes
+
+def parse_ids(text):
+    # "3, 7 10-12" -> [3, 7, 10, 11, 12]; raises ValueError on anything else
+    ids = []
+    for part in re.split(r"[\s,]+", text.strip()):
+        if not part:
+            continue
+        m = re.fullmatch(r"(\d+)(?:-(\d+))?", part)
+        if not m:
+            raise ValueError(part)
+        lo, hi = int(m.group(1)), int(m.group(2) or m.group(1))
+        if hi < lo or hi - lo >= BATCH_CHUNK * 100:
+            raise ValueError(part)
+        ids.extend(range(lo, hi + 1))
+    return sorted(set(ids))
+
+def _batch_chunks(conn, ids, pager, chunk):
+    # the target rows as lists of at most chunk ids: the given ids, or every row matching pager's search
+    if ids is not None:
+        ids = sorted(set(ids))
+        for i in range(0, len(ids), chunk):
+            yield ids[i:i + chunk]
+        return
+    last = None
+    while True:
+        part = pager.matching_ids(conn, after=last, limit=chunk)
+        if not part:
+            return
+        yield part
+        last = part[-1]
+
+def batch_preview(conn, table, ids=None, pager=None):
+    # how many rows a batch operation would touch
+    if ids is None:
+        return pager.count(conn)
+    total = 0
+    cur = conn.cursor()
+    try:
+        for part in _batch_chunks(conn, ids, None, BATCH_CHUNK):
+            cur.execute(f"SELECT COUNT(*) FROM {table} WHERE id IN ({', '.join(['%s']*len(part))})", part)
+            total += cur.fetchone()[0]
+    finally:
+        cur.close()
+    return total
+
+def run_batch(conn, table, op, ids=None, pager=None, column=None, value=None, chunk=BATCH_CHUNK, progress=None):
+    # op is "delete" or "update" (column=value) on ids or on the rows matching pager's search.
+    # A set that fits in one chunk is a single transaction; bigger sets commit per chunk
+    # so no statement holds its row locks for long.
+    storage = conn.storage
+    changed = 0
+    for part in _batch_chunks(conn, ids, pager, chunk):
+        if op == "delete":
+            changed += storage.delete_records(conn, table, part)
+        else:
+            changed += storage.update_field(conn, table, column, value, part)
+        conn.commit()
+        if progress:
+            progress(changed)
+    invalidate_caches()
+    return changed
+
+# ------------- Archive -------------
+# Old closed records move from the record tables (the hot tier) to <table>_archive tables with
+# the same columns, so the default views, counts and searches only read active records.
+# archive_records() moves them in short chunked transactions while the app is in use;
+# restore_records() brings them back. Ids are kept, so audit history still applies.
+ARCHIVED_TABLES = ("criminals", "cases", "evidence")  # record tables that have an archive (evidence moves with its case)
+
+def ensure_archive(cur, storage):
+    # no foreign keys: an archived row outlives the hot rows it pointed at
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS criminals_archive (
+            id INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            age INT,
+            gender VARCHAR(10),
+            crime VARCHAR(255),
+            crime_date DATE,
+            status VARCHAR(50),
+            version INT NOT NULL DEFAULT 1,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS cases_archive (
+            id INT PRIMARY KEY,
+            case_name VARCHAR(100) NOT NULL,
+            case_date DATE,
+            description TEXT,
+            officer_id INT,
+            version INT NOT NULL DEFAULT 1,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS evidence_archive (
+            id INT PRIMARY KEY,
+            case_id INT,
+            evidence_type VARCHAR(100),
+            description TEXT,
+            version INT NOT NULL DEFAULT 1,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS attachments_archive (
+            id INT PRIMARY KEY,
+            evidence_id INT NOT NULL,
+            sha256 CHAR(64) NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            content_type VARCHAR(100),
+            size BIGINT NOT NULL,
+            uploaded_by VARCHAR(50),
+            uploaded_at DATETIME,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # the same lookups as on the hot tier: report refreshes, a case's evidence, gc_attachments
+    storage.ensure_index(cur, "criminals_archive", "idx_criminals_archive_name", ["name"])
+    storage.ensure_index(cur, "criminals_archive", "idx_criminals_archive_crime_date", ["crime_date"])
+    storage.ensure_index(cur, "cases_archive", "idx_cases_archive_officer_date", ["officer_id", "case_date"])
+    storage.ensure_index(cur, "cases_archive", "idx_cases_archive_date", ["case_date"])
+    storage.ensure_index(cur, "evidence_archive", "idx_evidence_archive_case", ["case_id"])
+    storage.ensure_index(cur, "evidence_archive", "idx_evidence_archive_type", ["evidence_type"])
+    storage.ensure_index(cur, "attachments_archive", "idx_attachments_archive_evidence", ["evidence_id"])
+    storage.ensure_index(cur, "attachments_archive", "idx_attachments_archive_sha", ["sha256"])
+    # what ON DELETE SET NULL does for the hot cases
+    storage.ensure_trigger(cur, "officers_archive_unassign", "officers", "DELETE",
+                           "UPDATE cases_archive SET officer_id = NULL WHERE officer_id = OLD.id")
+
+def _archive_columns(table):
+    if table == "attachments":
+        return ATTACHMENT_FIELDS
+    return ["id"] + TABLES[table].columns + ["version"]
+
+def _archive_condition(table, cutoff):
+    # closed and dated before cutoff; records without a date or a status stay hot
+    if table == "cases":
+        return "case_date < %s", [cutoff]
+    keep = [s.lower() for s in ARCHIVE_CONFIG.get("keep_statuses", ())]
+    sql = "crime_date < %s AND COALESCE(status, '') <> ''"
+    if keep:
+        sql += f" AND LOWER(status) NOT IN ({', '.join(['%s'] * len(keep))})"
+    return sql, [cutoff] + keep
+
+def _move_records(conn, cur, table, ids, restore=False):
+    # moves criminals or cases (a case with its evidence and their attachments) between the tiers
+    # in the caller's transaction. Parents are copied first and children deleted first, so the
+    # foreign keys between them never fire; the delete triggers keep change_log and reports current.
+    # Each moved record is audited as archived ("A", its row before) or restored ("R", its row after).
+    source = "_archive" if restore else ""
+    marks = ", ".join(["%s"] * len(ids))
+    steps = [(table, f"id IN ({marks})")]
+    if table == "cases":
+        steps += [("evidence", f"case_id IN ({marks})"),
+                  ("attachments", f"evidence_id IN (SELECT id FROM evidence{source} WHERE case_id IN ({marks}))")]
+    for name, where in steps:
+        cols = ", ".join(_archive_columns(name))
+        src, dst = (name + "_archive", name) if restore else (name, name + "_archive")
+        cur.execute(f"INSERT INTO {dst} ({cols}) SELECT {cols} FROM {src} WHERE {where}", ids)
+    moved = {}
+    for name, where in reversed(steps):
+        if conn.auditing and name in TABLES:
+            cur.execute(f"SELECT id, {', '.join(TABLES[name].columns)} FROM {name}{source} WHERE {where}", ids)
+            for row in cur.fetchall():
+                conn.audit(name, row[0], "R" if restore else "A", None if restore else row[1:],
+                           row[1:] if restore else None)
+        cur.execute(f"DELETE FROM {name}{source} WHERE {where}", ids)
+        moved[name] = cur.rowcount
+    return moved
+
+def archive_records(conn, days=None, tables=("criminals", "cases"), chunk=None, max_rows=None,
+                    dry_run=False, progress=None):
+    # moves criminals whose status is not in keep_statuses and cases dated more than days ago
+    # (ARCHIVE_CONFIG) to the archive, one chunk per transaction with a pause in between, at most
+    # max_rows records per table (0 for all). Returns {table: rows moved}; with dry_run, how many
+    # criminals and cases qualify. progress(stats) is called after every chunk.
+    days = ARCHIVE_CONFIG.get("age_days", 5 * 365) if days is None else days
+    chunk = chunk or ARCHIVE_CONFIG.get("chunk", 500)
+    max_rows = ARCHIVE_CONFIG.get("max_rows", 0) if max_rows is None else max_rows
+    pause = ARCHIVE_CONFIG.get("pause_ms", 0) / 1000
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    stats = {t: 0 for t in ("criminals", "cases", "evidence", "attachments")}
+    cur = conn.cursor()
+    try:
+        for table in tables:
+            cond, cond_params = _archive_condition(table, cutoff)
+            # where the backend can hand out MAX(id) + 1 again (MySQL), the newest row stays hot
+            # so the id of an archived record is never reused; SQLite's AUTOINCREMENT never reuses ids
+            cur.execute(f"SELECT MAX(id) FROM {table}")
+            top = cur.fetchone()[0]
+            if top is None:
+                continue
+            if not conn.storage.reuses_ids:
+                top += 1
+            if dry_run:
+                cur.execute(f"SELECT COUNT(*) FROM {table} WHERE id < %s AND {cond}", [top] + cond_params)
+                stats[table] = cur.fetchone()[0]
+                continue
+            last = 0
+            while not max_rows or stats[table] < max_rows:
+                size = min(chunk, max_rows - stats[table]) if max_rows else chunk
+                cur.execute(f"SELECT id FROM {table} WHERE id > %s AND id < %s AND {cond} ORDER BY id LIMIT %s",
+                            [last, top] + cond_params + [size])
+                ids = [r[0] for r in cur.fetchall()]
+                if not ids:
+                    break
+                last = ids[-1]
+                # checked again under a lock: a record edited since the scan may no longer qualify
+                cur.execute(f"SELECT id FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))}) AND {cond}"
+                            f"{conn.storage.row_lock}", ids + cond_params)
+                ids = [r[0] for r in cur.fetchall()]
+                if ids:
+                    for name, n in _move_records(conn, cur, table, ids).items():
+                        stats[name] += n
+                conn.commit()
+                if progress:
+                    progress(dict(stats))
+                if pause:
+                    time.sleep(pause)
+    finally:
+        cur.close()
+    if not dry_run and any(stats.values()):
+        invalidate_caches()
+    return stats
+
+def restore_records(conn, table, ids):
+    # moves archived criminals or cases (with their evidence and attachments) back to the hot
+    # tables; returns {table: rows moved}
+    if table not in ("criminals", "cases"):
+        raise ValueError(f"Only criminals and cases are archived, not {table}")
+    stats = {t: 0 for t in ("criminals", "cases", "evidence", "attachments")}
+    cur = conn.cursor()
+    try:
+        for part in _batch_chunks(conn, ids, None, BATCH_CHUNK):
+            for name, n in _move_records(conn, cur, table, part, restore=True).items():
+                stats[name] += n
+            if table == "criminals":
+                conn.storage.reindex_identities(conn, f"id IN ({', '.join(['%s'] * len(part))})", part)
+            conn.commit()
+    finally:
+        cur.close()
+    invalidate_caches()
+    return stats
+
+# ------------- Identity matching -------------
+# Finds the same person entered twice under different spellings. Every criminal has blocking keys
+# in criminal_match_keys: a phonetic code of each name token plus gender and age band. A lookup
+# reads only the rows that share a key with the new record, through the key's primary index,
+# instead of scanning the table. Those candidates are scored on name similarity (Jaro-Winkler),
+# gender and age. New records are checked when they are added; find_duplicates() scores every
+# block in worker processes.
+_PHONETIC = {c: d for d, letters in (("1", "bfpv"), ("2", "cgjkqsxz"), ("3", "dt"), ("4", "l"), ("5", "mn"), ("6", "r"))
+             for c in letters}
+
+def name_tokens(name):
+    # lower-case ASCII words of a name with accents folded: "José O'Neil-Rao" -> ["jose", "oneil", "rao"]
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode().lower()
+    return [t.replace("'", "") for t in re.findall(r"[a-z']+", text) if t.strip("'")]
+
+def phonetic_code(token):
+    # Soundex that also codes the first letter, so C/K or S/Z spellings of it block together,
+    # with a leading 0 for names that start with a vowel; at most 4 characters
+    out, last = (["0"] if token[0] in "aeiouy" else []), None
+    for ch in token:
+        code = _PHONETIC.get(ch)
+        if code is None:
+            if ch not in "hw":
+                last = None  # a vowel separates repeated codes, h and w do not
+            continue
+        if code != last:
+            out.append(code)
+        last = code
+    return "".join(out)[:4] or "0"
+
+def _gender_code(gender):
+    g = str(gender or "").strip()[:1].upper()
+    return g if g.isalpha() else "?"
+
+def _age(age):
+    try:
+        return int(age)
+    except (TypeError, ValueError):
+        return None
+
+def identity_keys(name, age, gender, probe=False):
+    # blocking keys "<phonetic>|<gender>|<age band>" for each name token of 2+ letters. A known age
+    # is filed under the bands of age - tolerance and age + tolerance, so two ages within the
+    # tolerance always share a band. probe: the keys a lookup for a new record reads, which also
+    # reach records of unknown age or gender (and every band and gender when the probe lacks them)
+    tolerance = MATCH_CONFIG.get("age_tolerance", 5)
+    width = max(MATCH_CONFIG.get("age_band", 10), 2 * tolerance + 1)
+    age = _age(age)
+    bands = {"x"} if age is None else {str(max(0, age - tolerance) // width), str((age + tolerance) // width)}
+    gender = _gender_code(gender)
+    genders = {gender}
+    if probe:
+        bands |= {str(b) for b in range(120 // width + 1)} if age is None else {"x"}
+        genders |= {"M", "F", "O", "?"} if gender == "?" else {"?"}
+    codes = {phonetic_code(t) for t in name_tokens(name) if len(t) > 1}
+    return sorted(f"{c}|{g}|{b}" for c in codes for g in genders for b in bands)
+
+@lru_cache(maxsize=65536)  # blocks share tokens, so the same pairs come up again and again
+def jaro_winkler(a, b):
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    taken = [False] * len(b)
+    matched = []
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not taken[j] and b[j] == ch:
+                taken[j] = True
+                matched.append(ch)
+                break
+    m = len(matched)
+    if not m:
+        return 0.0
+    transpositions = sum(x != y for x, y in zip(matched, (c for c, t in zip(b, taken) if t))) / 2
+    jaro = (m / len(a) + m / len(b) + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+def name_similarity(a, b):
+    # token lists, compared token by token so swapped first and last names still match: each token
+    # of the shorter name takes its best unused match in the other, a best under 0.8 counting as
+    # none (a shared surname alone does not make John Smith and Jane Smith similar). A missing
+    # middle name costs a tenth.
+    if not a or not b:
+        return 0.0
+    short, longer = (a, b) if len(a) <= len(b) else (b, a)
+    free, score = list(longer), 0.0
+    for t in short:
+        best, u = max((jaro_winkler(t, u), u) for u in free)
+        if best >= 0.8:
+            score += best
+            free.remove(u)
+    return score / len(short) * (0.9 if len(a) != len(b) else 1.0)
+
+def _identity_entry(row):
+    # (id, name tokens, age, gender code) from (id, name, age, gender)
+    return row[0], name_tokens(row[1]), _age(row[2]), _gender_code(row[3])
+
+def identity_score(a, b, tolerance, threshold=0.0):
+    # 0..1 for two entries: name similarity weighs 0.7, age 0.2 and gender 0.1, over the fields both
+    # sides have (a lookup by name alone scores on the name). Equal names whose ages are further
+    # apart than the tolerance score 0.8. Pairs that cannot reach threshold even with equal names
+    # score 0 without comparing the names.
+    total, rest = 0.7, 0.0
+    if "?" not in (a[3], b[3]):
+        total, rest = total + 0.1, rest + 0.1 * (a[3] == b[3])
+    if a[2] is not None and b[2] is not None:
+        total, rest = total + 0.2, rest + 0.2 * max(0.0, 1 - abs(a[2] - b[2]) / (tolerance + 1))
+    if (0.7 + rest) / total < threshold:
+        return 0.0
+    return (0.7 * name_similarity(a[1], b[1]) + rest) / total
+
+def write_identity_keys(cur, storage, rows):
+    # replaces the blocking keys of (id, name, age, gender) rows; returns how many rows got any
+    if not rows:
+        return 0
+    ids = [r[0] for r in rows]
+    cur.execute(f"DELETE FROM criminal_match_keys WHERE criminal_id IN ({', '.join(['%s'] * len(ids))})", ids)
+    keys = [(key, r[0]) for r in rows for key in identity_keys(r[1], r[2], r[3])]
+    if keys:
+        cur.executemany(storage.insert_ignore.format(table="criminal_match_keys (match_key, criminal_id)",
+                                                     rows="VALUES (%s, %s)"), keys)
+    return len({criminal_id for _, criminal_id in keys})
+
+def backfill_identity_keys(cur, storage, chunk=EXPORT_CHUNK):
+    # keys for criminals that have none (written before migration 8, or by other tools); returns how
+    # many got keys. Names with no usable token never do, so they are looked at again on every run.
+    total, last = 0, 0
+    while True:
+        cur.execute("SELECT id, name, age, gender FROM criminals c WHERE id > %s AND NOT EXISTS "
+                    "(SELECT 1 FROM criminal_match_keys k WHERE k.criminal_id = c.id) ORDER BY id LIMIT %s",
+                    (last, chunk))
+        rows = cur.fetchall()
+        if not rows:
+            return total
+        total += write_identity_keys(cur, storage, rows)
+        last = rows[-1][0]
+
+def find_identity_matches(conn, name, age, gender, exclude=None, threshold=None):
+    # existing criminals that look like the same person, best first: [(score, (id, *columns))]
+    keys = identity_keys(name, age, gender, probe=True)
+    if not keys or not conn.storage.identity_keys:
+        return []
+    threshold = MATCH_CONFIG.get("threshold", 0.85) if threshold is None else threshold
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT id, {', '.join(TABLES['criminals'].columns)} FROM criminals WHERE id IN "
+                    f"(SELECT criminal_id FROM criminal_match_keys WHERE match_key IN ({', '.join(['%s'] * len(keys))})) "
+                    f"LIMIT %s", (*keys, MATCH_CONFIG.get("candidates", 500)))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    probe = _identity_entry((None, name, age, gender))
+    tolerance = MATCH_CONFIG.get("age_tolerance", 5)
+    scored = [(round(identity_score(probe, _identity_entry(r[:4]), tolerance, threshold), 4), r)
+              for r in rows if r[0] != exclude]
+    return sorted([m for m in scored if m[0] >= threshold], key=lambda m: -m[0])
+
+def record_identity_matches(conn, criminal_id, matches):
+    # keeps the pairs for review (list_identity_matches); the caller commits
+    if not matches or not conn.storage.identity_keys:
+        return
+    cur = conn.cursor()
+    try:
+        cur.executemany(conn.storage.insert_ignore.format(table="criminal_matches (criminal_id, match_id, score)",
+                                                          rows="VALUES (%s, %s, %s)"),
+                        [(min(criminal_id, r[0]), max(criminal_id, r[0]), score) for score, r in matches])
+    finally:
+        cur.close()
+
+def _score_blocks(blocks, threshold, tolerance, window):
+    # runs in a worker process: (id, id, score) pairs over threshold within each block. A block
+    # longer than window is compared by sorted neighbourhood (each entry against the next window
+    # entries in name order), so a common surname does not go quadratic. Two records sharing
+    # several keys are scored once per task.
+    found, seen = [], set()
+    for block in blocks:
+        if len(block) > window:
+            block = sorted(block, key=lambda e: " ".join(sorted(e[1])))
+        for i, a in enumerate(block):
+            for b in block[i + 1:i + 1 + window]:
+                pair = (a[0], b[0]) if a[0] < b[0] else (b[0], a[0])
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                score = identity_score(a, b, tolerance, threshold)
+                if score >= threshold:
+                    found.append(pair + (round(score, 4),))
+    return found
+
+def _identity_blocks(conn, size=EXPORT_CHUNK):
+    # entries sharing a blocking key, streamed in key order off the primary key; singletons skipped
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT k.match_key, c.id, c.name, c.age, c.gender FROM criminal_match_keys k "
+                    "JOIN criminals c ON c.id = k.criminal_id ORDER BY k.match_key")
+        key, block = None, []
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            for row in rows:
+                if row[0] != key:
+                    if len(block) > 1:
+                        yield block
+                    key, block = row[0], []
+                block.append(_identity_entry(row[1:]))
+        if len(block) > 1:
+            yield block
+    finally:
+        cur.close()
+
+def find_duplicates(conn, workers=None, threshold=None, progress=None):
+    # batch dedup: keys any criminals missing them, scores every block and replaces criminal_matches
+    # with the pairs found. The parent streams blocks off the database while worker processes score
+    # them; at most two tasks per worker are in flight. Returns stats.
+    threshold = MATCH_CONFIG.get("threshold", 0.85) if threshold is None else threshold
+    tolerance = MATCH_CONFIG.get("age_tolerance", 5)
+    window = MATCH_CONFIG.get("window", 50)
+    task_rows = MATCH_CONFIG.get("task_rows", 5000)
+    workers = workers or MATCH_CONFIG.get("workers") or os.cpu_count() or 1
+    start = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        indexed = backfill_identity_keys(cur, conn.storage)
+    finally:
+        cur.close()
+    conn.commit()
+    stats = {"indexed": indexed, "blocks": 0, "entries": 0, "pairs": 0, "workers": workers, "seconds": 0.0}
+    pairs = {}
+
+    def tasks():
+        task, n = [], 0
+        for block in _identity_blocks(conn):
+            stats["blocks"] += 1
+            stats["entries"] += len(block)
+            task.append(block)
+            n += len(block)
+            if n >= task_rows:
+                yield task
+                task, n = [], 0
+        if task:
+            yield task
+
+    def collect(found):
+        for a, b, score in found:
+            if score > pairs.get((a, b), 0):
+                pairs[(a, b)] = score
+        stats["pairs"] = len(pairs)
+        if progress:
+            progress(stats)
+
+    if workers <= 1:
+        for task in tasks():
+            collect(_score_blocks(task, threshold, tolerance, window))
+    else:
+        # spawn: safe from threaded processes (the app, the API) on every platform
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending = deque()
+            for task in tasks():
+                pending.append(pool.submit(_score_blocks, task, threshold, tolerance, window))
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+    rows = [(a, b, score) for (a, b), score in pairs.items()]
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM criminal_matches")
+        for i in range(0, len(rows), IMPORT_BATCH):
+            cur.executemany("INSERT INTO criminal_matches (criminal_id, match_id, score) VALUES (%s, %s, %s)",
+                            rows[i:i + IMPORT_BATCH])
+    finally:
+        cur.close()
+    conn.commit()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+MATCH_FIELDS = ["score", "criminal_id", "name", "age", "gender", "crime", "match_id", "match_name", "match_age",
+                "match_gender", "match_crime"]
+
+def list_identity_matches(conn, limit=500):
+    # stored pairs for review, best first, with both records
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT m.score, a.id, a.name, a.age, a.gender, a.crime, b.id, b.name, b.age, b.gender, b.crime "
+                    "FROM criminal_matches m JOIN criminals a ON a.id = m.criminal_id "
+                    "JOIN criminals b ON b.id = m.match_id ORDER BY m.score DESC, m.criminal_id LIMIT %s", (limit,))
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+def format_match(score, row):
+    return f"#{row[0]} {row[1]} ({row[2] if row[2] is not None else '?'}, {row[3] or '?'}) {score:.0%}"
+
+# ------------- Case dossier -------------
+class DossierCache:
+    # LRU of recently viewed dossiers; each entry keeps the evidence pages fetched so far
+    def __init__(self, size=DOSSIER_CACHE, ttl=DOSSIER_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # case_id -> (loaded_at, {evidence cursor: page})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, case_id, after=None):
+        with self._lock:
+            entry = self._entries.get(case_id)
+            page = None
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                page = entry[1].get(after)
+            if page is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(case_id)
+            self.hits += 1
+            return page
+
+    def put(self, case_id, after, page):
+        with self._lock:
+            entry = self._entries.get(case_id)
+            if entry is None or after is None:
+                # a first page starts the entry afresh; later pages join it
+                entry = self._entries[case_id] = (time.monotonic(), {})
+            entry[1][after] = page
+            self._entries.move_to_end(case_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+dossier_cache = DossierCache()
+
+def load_dossier(conn, case_id, after=None):
+    # one page of a dossier; None if the case does not exist
+    page = dossier_cache.get(case_id, after)
+    if page is None:
+        page = conn.storage.case_dossier(conn, case_id, after)
+        if page is not None:
+            dossier_cache.put(case_id, after, page)
+    return page
+
+# ------------- Evidence attachments -------------
+# Photos, documents and video attached to evidence stay out of the database. The files live in a
+# content-addressed store on the local filesystem (<root>/ab/cd/<sha256>), so a file attached many
+# times is kept once; the attachments table holds only their metadata, which record views never
+# read. Files stream in and out ATTACHMENT_CONFIG["chunk"] bytes at a time, and hashing and
+# previews read them through mmap. A file outlives its last attachment row until gc_attachments().
+ATTACHMENT_FIELDS = ["id", "evidence_id", "filename", "content_type", "size", "sha256", "uploaded_by", "uploaded_at"]
+# leading bytes of common evidence files, for names mimetypes does not know
+MAGIC_TYPES = [(b"\x89PNG\r\n\x1a\n", "image/png"), (b"\xff\xd8\xff", "image/jpeg"), (b"GIF8", "image/gif"),
+               (b"BM", "image/bmp"), (b"%PDF-", "application/pdf"), (b"PK\x03\x04", "application/zip")]
+
+def hash_file(path):
+    # SHA-256 hex digest, read through mmap: no copies into Python buffers, and hashlib
+    # releases the GIL while it digests the mapping
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                digest.update(m)
+    return digest.hexdigest()
+
+def sniff_type(head, filename=""):
+    # content type from the filename, else from the file's leading bytes
+    guessed = mimetypes.guess_type(filename)[0] if filename else None
+    if guessed:
+        return guessed
+    for magic, content_type in MAGIC_TYPES:
+        if head.startswith(magic):
+            return content_type
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    return "application/octet-stream"
+
+class _Upload:
+    # one file streaming into the store: written to a temp file and hashed on the way in,
+    # then moved to its content address by finish(); abort() drops it
+    def __init__(self, store):
+        self.store = store
+        fd, self.temp = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.store.max_size:
+            self.abort()
+            raise ValueError(f"Attachment larger than {self.store.max_size} bytes")
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self):
+        # (sha256, size, stored); stored is False when the content was already in the store
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        return self.store._commit(self.temp, self.digest.hexdigest(), self.size)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.temp)
+        except FileNotFoundError:
+            pass
+
+class AttachmentStore:
+    def __init__(self, config):
+        self.root = config.get("root", "attachments")
+        self.chunk = config.get("chunk", 1 << 20)
+        self.max_size = config.get("max_size", 4 << 30)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256):
+        if not re.fullmatch(r"[0-9a-f]{64}", sha256 or ""):
+            raise ValueError(f"Not a SHA-256 digest: {sha256!r}")
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def upload(self):
+        return _Upload(self)
+
+    def put_stream(self, chunks):
+        # stores an iterable of byte chunks; returns (sha256, size, stored)
+        upload = self.upload()
+        try:
+            for chunk in chunks:
+                upload.write(chunk)
+            return upload.finish()
+        except BaseException:
+            upload.abort()
+            raise
+
+    def put_file(self, source):
+        # stores a local file; returns (sha256, size, stored). The source is hashed in place first
+        # so a duplicate is never copied; a new file is copied by the OS (shutil.copyfile) and
+        # hashed again as stored, in case the source changed in between.
+        size = os.path.getsize(source)
+        if size > self.max_size:
+            raise ValueError(f"Attachment larger than {self.max_size} bytes")
+        sha256 = hash_file(source)
+        if self._touch(sha256):
+            return sha256, size, False
+        fd, temp = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temp)
+            with open(temp, "ab") as f:
+                os.fsync(f.fileno())
+            return self._commit(temp, hash_file(temp), os.path.getsize(temp))
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def _commit(self, temp, sha256, size):
+        if self._touch(sha256):
+            os.remove(temp)  # same content already stored
+            return sha256, size, False
+        dest = self.path(sha256)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(temp, dest)
+        return sha256, size, True
+
+    def _touch(self, sha256):
+        # marks a stored file as just used so gc_attachments() spares it while its row is written
+        try:
+            os.utime(self.path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def read_chunks(self, sha256, start=0, end=None):
+        # bytes [start, end) of a stored file, a chunk at a time
+        with open(self.path(sha256), "rb") as f:
+            if end is None:
+                end = os.fstat(f.fileno()).st_size
+            f.seek(start)
+            left = end - start
+            while left > 0:
+                chunk = f.read(min(self.chunk, left))
+                if not chunk:
+                    break
+                left -= len(chunk)
+                yield chunk
+
+    def copy_to(self, sha256, dest):
+        shutil.copyfile(self.path(sha256), dest)
+
+    def head(self, sha256, limit):
+        # the first limit bytes through mmap; only those pages are read from disk
+        with open(self.path(sha256), "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return m[:limit]
+
+    def stored(self):
+        # (sha256, os.DirEntry) of every stored file
+        for top in os.scandir(self.root):
+            if top.is_dir() and len(top.name) == 2:
+                for mid in os.scandir(top.path):
+                    if mid.is_dir():
+                        for entry in os.scandir(mid.path):
+                            if entry.is_file():
+                                yield entry.name, entry
+
+_attachment_store = None
+
+def get_attachment_store():
+    global _attachment_store
+    if _attachment_store is None:
+        _attachment_store = AttachmentStore(ATTACHMENT_CONFIG)
+    return _attachment_store
+
+def make_thumbnail(path, size):
+    # PNG bytes of an image scaled to fit size x size; None for files Pillow cannot open as an
+    # image (documents, video) or when Pillow is not installed
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            try:
+                with Image.open(m) as img:
+                    img.draft("RGB", (size, size))  # JPEG decodes straight at a reduced scale
+                    img.thumbnail((size, size))
+                    if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+                    out = io.BytesIO()
+                    img.save(out, "PNG")
+                    return out.getvalue()
+            except (OSError, ValueError, Image.DecompressionBombError):
+                return None
+
+class ThumbnailCache:
+    # LRU of thumbnails by (sha256, size), made on first request. Content addressing means an entry
+    # never goes stale; files without a thumbnail are kept as None so they are only tried once.
+    def __init__(self, size=ATTACHMENT_CONFIG["thumb_cache"]):
+        self.size = size
+        self._entries = OrderedDict()  # (sha256, size) -> PNG bytes or None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha256, size=None):
+        key = (sha256, size or ATTACHMENT_CONFIG.get("thumb_size", 160))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        thumb = make_thumbnail(get_attachment_store().path(sha256), key[1])  # decoding runs unlocked
+        with self._lock:
+            self._entries[key] = thumb
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return thumb
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+thumbnail_cache = ThumbnailCache()
+
+def attachment_preview(sha256, limit=None):
+    # leading text of a stored file for the preview pane
+    head = get_attachment_store().head(sha256, limit or ATTACHMENT_CONFIG.get("preview_bytes", 4096))
+    return head.decode("utf-8", errors="replace")
+
+def require_evidence(conn, evidence_id):
+    if conn.storage.get_record(conn, "evidence", evidence_id) is None:
+        raise LookupError(f"No evidence record with id {evidence_id}")
+
+def add_attachment(conn, evidence_id, sha256, size, filename, content_type=None):
+    # records a stored file against an evidence row; returns the attachment id. The caller commits.
+    require_evidence(conn, evidence_id)
+    filename = os.path.basename(str(filename or "").replace("\\", "/")).strip()[:255]
+    if not filename:
+        raise ValueError("Attachment needs a filename")
+    content_type = (content_type or "").split(";")[0].strip()[:100]
+    if content_type in ("", "application/octet-stream", "application/x-www-form-urlencoded"):  # client defaults
+        content_type = sniff_type(get_attachment_store().head(sha256, 16), filename)
+    cur = conn.cursor()
+    try:
+        cur.execute("INSERT INTO attachments (evidence_id, sha256, filename, content_type, size, uploaded_by) "
+                    "VALUES (%s,%s,%s,%s,%s,%s)",
+                    (evidence_id, sha256, filename, content_type, size, current_audit_user()))
+        return cur.lastrowid
+    finally:
+        cur.close()
+
+def attach_file(conn, evidence_id, path, filename=None, content_type=None):
+    # stores a local file and attaches it; returns the attachment id. The caller commits.
+    require_evidence(conn, evidence_id)
+    sha256, size, _ = get_attachment_store().put_file(path)
+    return add_attachment(conn, evidence_id, sha256, size, filename or os.path.basename(path), content_type)
+
+def list_attachments(conn, evidence_id):
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {', '.join(ATTACHMENT_FIELDS)} FROM attachments WHERE evidence_id=%s ORDER BY id",
+                    (evidence_id,))
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+def get_attachment(conn, attachment_id):
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {', '.join(ATTACHMENT_FIELDS)} FROM attachments WHERE id=%s", (attachment_id,))
+        rows = cur.fetchall()
+        return rows[0] if rows else None
+    finally:
+        cur.close()
+
+def delete_attachment(conn, attachment_id):
+    # removes the row only; the file goes in the next gc_attachments() if nothing else refers to it
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM attachments WHERE id=%s", (attachment_id,))
+        return cur.rowcount
+    finally:
+        cur.close()
+
+def gc_attachments(conn, grace=None):
+    # removes stored files no attachment row refers to, and partial uploads left by crashes, once
+    # they are older than grace seconds. Returns {"files", "bytes", "partial"}.
+    store = get_attachment_store()
+    cutoff = time.time() - (ATTACHMENT_CONFIG.get("gc_grace", 3600) if grace is None else grace)
+    stats = {"files": 0, "bytes": 0, "partial": 0}
+    for entry in os.scandir(store.tmp_dir):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            stats["partial"] += 1
+    cur = conn.cursor()
+    try:
+        def sweep(candidates):
+            # archived attachments keep their files
+            marks = ", ".join(["%s"] * len(candidates))
+            cur.execute(f"SELECT sha256 FROM attachments WHERE sha256 IN ({marks}) "
+                        f"UNION SELECT sha256 FROM attachments_archive WHERE sha256 IN ({marks})", list(candidates) * 2)
+            referenced = {row[0] for row in cur.fetchall()}
+            for sha256, entry in candidates.items():
+                if sha256 in referenced:
+                    continue
+                st = os.stat(entry.path)
+                if st.st_mtime < cutoff:  # not re-used by an upload since the scan
+                    os.remove(entry.path)
+                    stats["files"] += 1
+                    stats["bytes"] += st.st_size
+            candidates.clear()
+        candidates = {}
+        for sha256, entry in store.stored():
+            if entry.stat().st_mtime < cutoff:
+                candidates[sha256] = entry
+                if len(candidates) >= 500:
+                    sweep(candidates)
+        if candidates:
+            sweep(candidates)
+    finally:
+        cur.close()
+    return stats
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+# ------------- Reports -------------
+# Dashboard charts read small summary tables instead of scanning the record tables. Triggers
+# on the record tables mark the summary keys a write touches in report_dirty; refresh_reports()
+# recomputes just those keys, each from one index range (a month of criminals, one officer's
+# cases, one evidence type). rebuild_reports() recounts everything (migration 5 and `crimetrack reports --rebuild`).
+def _report_keys(storage, row):
+    # table -> (report, summary key of one of its rows); row is NEW or OLD inside a trigger
+    return {
+        "criminals": ("crime_month", f"COALESCE({storage.month_sql.format(row + '.crime_date')}, '')"),
+        "cases": ("case_load", f"COALESCE({row}.officer_id, 0)"),
+        "evidence": ("evidence_type", f"COALESCE({row}.evidence_type, '')"),
+    }
+
+def ensure_reports(cur, storage):
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS report_dirty (
+            report VARCHAR(20) NOT NULL,
+            key_value VARCHAR(255) NOT NULL,
+            PRIMARY KEY (report, key_value)
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS report_crime_month (
+            month CHAR(7) NOT NULL,
+            crime VARCHAR(255) NOT NULL,
+            n INT NOT NULL,
+            PRIMARY KEY (month, crime)
+        )
+    ''')
+    cur.execute("CREATE TABLE IF NOT EXISTS report_case_load (officer_id INT PRIMARY KEY, n INT NOT NULL)")
+    cur.execute("CREATE TABLE IF NOT EXISTS report_evidence_type (evidence_type VARCHAR(100) PRIMARY KEY, n INT NOT NULL)")
+    storage.ensure_index(cur, "report_case_load", "idx_report_case_load_n", ["n"])
+    storage.ensure_index(cur, "report_evidence_type", "idx_report_evidence_type_n", ["n"])
+    def mark(rows):
+        return storage.insert_ignore.format(table="report_dirty (report, key_value)", rows=rows)
+    old, new = _report_keys(storage, "OLD"), _report_keys(storage, "NEW")
+    for table, (report, key) in new.items():
+        old_key = old[table][1]
+        storage.ensure_trigger(cur, f"{table}_report_insert", table, "INSERT", mark(f"VALUES ('{report}', {key})"))
+        storage.ensure_trigger(cur, f"{table}_report_update", table, "UPDATE",
+                               mark(f"VALUES ('{report}', {old_key}), ('{report}', {key})"))
+        storage.ensure_trigger(cur, f"{table}_report_delete", table, "DELETE", mark(f"VALUES ('{report}', {old_key})"))
+    # MySQL does not fire triggers for foreign key actions, so the parent marks what its
+    # delete cascades to (the evidence of a case) or reassigns (the cases of an officer)
+    storage.ensure_trigger(cur, "cases_report_cascade", "cases", "DELETE",
+                           mark("SELECT 'evidence_type', COALESCE(evidence_type, '') FROM evidence WHERE case_id = OLD.id"),
+                           timing="BEFORE")
+    storage.ensure_trigger(cur, "officers_report_cascade", "officers", "DELETE",
+                           mark("VALUES ('case_load', OLD.id), ('case_load', 0)"), timing="BEFORE")
+
+def _report_source(table, columns, where="", archive=True):
+    # the rows a report counts: the record table and its archive, so archiving changes no totals
+    sql = f"SELECT {columns} FROM {table}{where}"
+    if archive:
+        sql += f" UNION ALL SELECT {columns} FROM {table}_archive{where}"
+    return f"({sql}) AS r"
+
+def rebuild_reports(cur, storage, archive=True):
+    # full recount: one scan of each record table (and archive table; migration 5 runs
+    # before they exist and passes archive=False)
+    month = storage.month_sql.format("crime_date")
+    for table in ("report_dirty", "report_crime_month", "report_case_load", "report_evidence_type"):
+        cur.execute(f"DELETE FROM {table}")
+    cur.execute(f"INSERT INTO report_crime_month (month, crime, n) "
+                f"SELECT COALESCE(month, ''), COALESCE(crime, ''), COUNT(*) "
+                f"FROM {_report_source('criminals', f'{month} AS month, crime', archive=archive)} GROUP BY 1, 2")
+    cur.execute(f"INSERT INTO report_case_load (officer_id, n) SELECT COALESCE(officer_id, 0), COUNT(*) "
+                f"FROM {_report_source('cases', 'officer_id', archive=archive)} GROUP BY 1")
+    cur.execute(f"INSERT INTO report_evidence_type (evidence_type, n) SELECT COALESCE(evidence_type, ''), COUNT(*) "
+                f"FROM {_report_source('evidence', 'evidence_type', archive=archive)} GROUP BY 1")
+
+def _next_month(month):
+    year, m = map(int, month.split("-"))
+    return f"{year + m // 12:04d}-{m % 12 + 1:02d}-01"
+
+def _refresh_crime_month(cur, month):
+    cur.execute("DELETE FROM report_crime_month WHERE month=%s", (month,))
+    if month:
+        where, params = "crime_date >= %s AND crime_date < %s", (f"{month}-01", _next_month(month))
+    else:
+        where, params = "crime_date IS NULL", ()
+    cur.execute(f"INSERT INTO report_crime_month (month, crime, n) SELECT %s, COALESCE(crime, ''), COUNT(*) "
+                f"FROM {_report_source('criminals', 'crime', ' WHERE ' + where)} GROUP BY COALESCE(crime, '')",
+                (month,) + params * 2)
+
+def _refresh_case_load(cur, officer_id):
+    officer_id = int(officer_id)
+    cur.execute("DELETE FROM report_case_load WHERE officer_id=%s", (officer_id,))
+    where, params = ("officer_id = %s", (officer_id,)) if officer_id else ("officer_id IS NULL", ())
+    cur.execute(f"INSERT INTO report_case_load (officer_id, n) SELECT %s, COUNT(*) "
+                f"FROM {_report_source('cases', 'officer_id', ' WHERE ' + where)} GROUP BY officer_id",
+                (officer_id,) + params * 2)
+
+def _refresh_evidence_type(cur, evidence_type):
+    cur.execute("DELETE FROM report_evidence_type WHERE evidence_type=%s", (evidence_type,))
+    where, params = (("evidence_type = %s", (evidence_type,)) if evidence_type
+                     else ("(evidence_type = '' OR evidence_type IS NULL)", ()))
+    cur.execute(f"INSERT INTO report_evidence_type (evidence_type, n) SELECT %s, COUNT(*) "
+                f"FROM {_report_source('evidence', 'evidence_type', ' WHERE ' + where)} "
+                f"GROUP BY COALESCE(evidence_type, '')", (evidence_type,) + params * 2)
+
+REPORT_REFRESH = {
+    "crime_month": _refresh_crime_month,
+    "case_load": _refresh_case_load,
+    "evidence_type": _refresh_evidence_type,
+}
+
+def refresh_reports(conn, batch=None):
+    # recomputes the keys marked since the last refresh; returns how many. A key taken by a
+    # concurrent refresh (its delete finds nothing) is skipped. The recount is an INSERT ... SELECT,
+    # which reads the latest committed rows, and a write racing it marks the key again.
+    batch = batch or REPORT_CONFIG.get("refresh_batch", 500)
+    refreshed = 0
+    cur = conn.cursor()
+    try:
+        while True:
+            cur.execute("SELECT report, key_value FROM report_dirty LIMIT %s", (batch,))
+            keys = cur.fetchall()
+            if not keys:
+                break
+            for report, key in keys:
+                cur.execute("DELETE FROM report_dirty WHERE report=%s AND key_value=%s", (report, key))
+                if cur.rowcount:
+                    REPORT_REFRESH[report](cur, key)
+                    refreshed += 1
+            conn.commit()
+    finally:
+        cur.close()
+    return refreshed
+
+def load_reports(conn):
+    # the reads only touch the summary tables and return at most a screenful of rows each
+    refresh_reports(conn)
+    top = REPORT_CONFIG.get("top", 8)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT month, SUM(n) FROM report_crime_month WHERE month <> '' "
+                    "GROUP BY month ORDER BY month DESC LIMIT %s", (REPORT_CONFIG.get("months", 12),))
+        months = [(m, int(n)) for m, n in reversed(cur.fetchall())]
+        crimes = []
+        if months:
+            cur.execute("SELECT crime, SUM(n) FROM report_crime_month WHERE month >= %s "
+                        "GROUP BY crime ORDER BY 2 DESC, 1 LIMIT %s", (months[0][0], top))
+            crimes = [(c or "(none)", int(n)) for c, n in cur.fetchall()]
+        cur.execute("""
+            SELECT r.officer_id, o.name, o.department, r.n
+            FROM report_case_load r LEFT JOIN officers o ON o.id = r.officer_id
+            ORDER BY r.n DESC, r.officer_id LIMIT %s
+        """, (top,))
+        officers = [(oid, name or (f"#{oid}" if oid else "(unassigned)"), dept or "", n)
+                    for oid, name, dept, n in cur.fetchall()]
+        # rolls up one summary row per officer, not the cases
+        cur.execute("""
+            SELECT COALESCE(o.department, ''), SUM(r.n)
+            FROM report_case_load r LEFT JOIN officers o ON o.id = r.officer_id
+            GROUP BY COALESCE(o.department, '') ORDER BY 2 DESC, 1 LIMIT %s
+        """, (top,))
+        departments = [(d or "(none)", int(n)) for d, n in cur.fetchall()]
+        cur.execute("SELECT evidence_type, n FROM report_evidence_type ORDER BY n DESC, evidence_type LIMIT %s", (top,))
+        evidence = [(t or "(none)", n) for t, n in cur.fetchall()]
+    finally:
+        cur.close()
+    return {"months": months, "crimes": crimes, "officers": officers, "departments": departments, "evidence": evidence}
+
+def format_reports(reports):
+    lines = []
+    for title, key in (("Crimes per month", "months"), ("Top crimes", "crimes"),
+                       ("Case load by department", "departments"), ("Evidence by type", "evidence")):
+        lines.append(title)
+        lines += [f"  {label:<30} {n:>8}" for label, n in reports[key]] or ["  (no data)"]
+    lines.append("Case load by officer")
+    lines += [f"  {name:<30} {dept:<20} {n:>8}" for _, name, dept, n in reports["officers"]] or ["  (no data)"]
+    return "\n".join(lines)
+
+# ------------- Audit log -------------
+# Every record write made through Storage keeps who made it, when, from which feature, and the
+# row before and after. The images are taken on the writing connection inside its transaction
+# (PooledConnection.audit) and handed over only when it commits, so a rolled back write leaves
+# no entry. AuditWriter batch-inserts them from a background thread into audit_log, which is
+# append-only; the committing thread only pays for a queue put.
+AUDIT_COLUMNS = ("changed_at DATETIME(6) NOT NULL, user_name VARCHAR(50) NOT NULL, source VARCHAR(60), "
+                 "table_name VARCHAR(30) NOT NULL, record_id INT, op CHAR(1) NOT NULL, "
+                 "before_image TEXT, after_image TEXT")
+AUDIT_FIELDS = ["id", "changed_at", "user_name", "source", "table_name", "record_id", "op", "before_image", "after_image"]
+AUDIT_INSERT = f"INSERT INTO audit_log ({', '.join(AUDIT_FIELDS[1:])}) VALUES ({', '.join(['%s'] * 8)})"
+# deleting from a parent also changes these rows (child table, foreign key, op); the database
+# applies the foreign key action itself, so the rows are read before the delete
+AUDIT_CASCADES = {"cases": [("evidence", "case_id", "D")], "officers": [("cases", "officer_id", "U")]}
+_audit_local = threading.local()
+_audit_default = None
+
+def set_audit_user(name):
+    # who this process writes as (the desktop app's logged-in user)
+    global _audit_default
+    _audit_default = name
+
+@contextmanager
+def audit_user(name):
+    # attributes writes on this thread to name (the API's per-request users)
+    previous = getattr(_audit_local, "user", None)
+    _audit_local.user = name
+    try:
+        yield
+    finally:
+        _audit_local.user = previous
+
+@lru_cache(maxsize=1)
+def _os_user():
+    try:
+        return getpass.getuser()
+    except Exception:
+        return "unknown"
+
+def current_audit_user():
+    return getattr(_audit_local, "user", None) or _audit_default or _os_user()
+
+class AuditWriter:
+    # one background thread with its own connection, so a busy pool never holds the log back.
+    # While the database is unreachable entries go to a local spool file, which is written
+    # ahead of new entries once it is back.
+    def __init__(self, storage, config):
+        self.pool = ConnectionPool({**storage.config, "pool_size": 1}, storage)
+        self.batch = max(1, int(config.get("batch", 500)))
+        self.flush_seconds = config.get("flush_ms", 250) / 1000.0
+        self.spool_file = config.get("spool_file")
+        self.retry_every = config.get("retry_every", 30)
+        self.counters = {"queued": 0, "written": 0, "batches": 0, "spooled": 0, "failures": 0}
+        self._queue = queue.Queue(max(1, int(config.get("max_queue", 10000))))
+        self._idle = threading.Condition()
+        self._pending = 0       # entries submitted and not yet written or spooled
+        self._retry_at = 0.0
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entries):
+        # one committed transaction; blocks while max_queue are waiting rather than drop history
+        with self._idle:
+            self._pending += len(entries)
+            self.counters["queued"] += len(entries)
+        self._queue.put(entries)
+
+    def flush(self, timeout=None):
+        # waits until everything submitted so far is written or spooled; False on timeout
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout=30):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.pool.close_all()
+
+    def stats(self):
+        with self._idle:
+            return dict(self.counters, pending=self._pending)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            entries = self._queue.get()
+            if entries is None:
+                break
+            entries = list(entries)
+            deadline = time.monotonic() + self.flush_seconds
+            while len(entries) < self.batch:
+                try:
+                    more = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                    break
+                entries += more
+            try:
+                self._write(entries)
+            except Exception:
+                log.exception("audit writer lost %d entries", len(entries))
+            with self._idle:
+                self._pending -= len(entries)
+                self._idle.notify_all()
+
+    def _row(self, entry):
+        changed_at, user, source, table, record_id, op, before, after = entry
+        columns = TABLES[table].columns
+        def image(values):
+            return None if values is None else json.dumps(dict(zip(columns, values)), default=str)
+        return (changed_at, user[:50], source[:60], table, record_id, op, image(before), image(after))
+
+    def _write(self, entries):
+        rows = [self._row(e) for e in entries]
+        if time.monotonic() >= self._retry_at:
+            spooled = self._read_spool()
+            try:
+                self._insert(spooled + rows)
+                if spooled:
+                    os.remove(self.spool_file)
+                return
+            except DB_ERRORS as e:
+                self.counters["failures"] += 1
+                self._retry_at = time.monotonic() + self.retry_every
+                log.warning("audit log unreachable, spooling to %s: %s", self.spool_file, e)
+        self._spool(rows)
+
+    def _insert(self, rows):
+        with query_tag("audit.write"):
+            conn = self.pool.acquire()
+            try:
+                cur = conn.cursor()
+                try:
+                    conn.storage.ensure_audit_partitions(cur, {str(r[0])[:7] for r in rows})
+                    for i in range(0, len(rows), self.batch):
+                        cur.executemany(AUDIT_INSERT, rows[i:i + self.batch])
+                    conn.commit()
+                finally:
+                    cur.close()
+            finally:
+                conn.close()
+        self.counters["written"] += len(rows)
+        self.counters["batches"] += 1
+
+    def _read_spool(self):
+        if not self.spool_file or not os.path.exists(self.spool_file):
+            return []
+        with open(self.spool_file, encoding="utf-8") as f:
+            return [tuple(json.loads(line)) for line in f if line.strip()]
+
+    def _spool(self, rows):
+        if not self.spool_file:
+            log.error("audit log unreachable and no spool_file set: %d entries lost", len(rows))
+            return
+        with open(self.spool_file, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+        self.counters["spooled"] += len(rows)
+
+_audit_writer = None
+_audit_lock = threading.Lock()
+
+def get_audit_writer():
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter(get_storage(), AUDIT_CONFIG)
+                atexit.register(close_audit)
+    return _audit_writer
+
+def flush_audit(timeout=None):
+    return _audit_writer.flush(timeout) if _audit_writer is not None else True
+
+def close_audit():
+    # writes what is queued and stops the writer (close_pool() does this first)
+    global _audit_writer
+    with _audit_lock:
+        writer, _audit_writer = _audit_writer, None
+    if writer is not None:
+        writer.close()
+
+def query_audit(conn, user=None, table=None, record_id=None, since=None, until=None, cursor=None, limit=None):
+    # entries newest first, filtered by user, table (and record) and changed_at in [since, until);
+    # each filter is the leading range of an idx_audit_* index, and on MySQL a time range reads
+    # only its monthly partitions. cursor is the (changed_at, id) the previous page ended on.
+    # Returns (rows of AUDIT_FIELDS, cursor of the next page or None).
+    limit = limit or AUDIT_CONFIG.get("page", 100)
+    where, params = [], []
+    for column, value in (("user_name", user), ("table_name", table), ("record_id", record_id)):
+        if value is not None:
+            where.append(f"{column} = %s")
+            params.append(value)
+    if since is not None:
+        where.append("changed_at >= %s")
+        params.append(since)
+    if until is not None:
+        where.append("changed_at < %s")
+        params.append(until)
+    if cursor is not None:
+        where.append("(changed_at < %s OR (changed_at = %s AND id < %s))")
+        params += [cursor[0], cursor[0], cursor[1]]
+    sql = f"SELECT {', '.join(AUDIT_FIELDS)} FROM audit_log"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    cur = conn.cursor()
+    try:
+        cur.execute(sql + f" ORDER BY changed_at DESC, id DESC LIMIT {int(limit) + 1}", params)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    if len(rows) > limit:
+        return rows[:limit], (rows[limit - 1][1], rows[limit - 1][0])
+    return rows, None
+
+def audit_bound(text, end=False):
+    # 'YYYY-MM-DD[ HH:MM[:SS]]' (UTC) as a query_audit bound; a bare date ending a range includes that day
+    if not text:
+        return None
+    value = datetime.fromisoformat(text)
+    return value + timedelta(days=1) if end and len(text) == 10 else value
+
+def audit_changes(row):
+    # {column: (before, after)} of the columns an entry changed (all of them for inserts and deletes)
+    before = json.loads(row[7]) if row[7] else {}
+    after = json.loads(row[8]) if row[8] else {}
+    return {c: (before.get(c), after.get(c)) for c in list(before) + [c for c in after if c not in before]
+            if before.get(c) != after.get(c)}
+
+# ------------- Global search -------------
+# (table, title column, text column) searched through the full-text indexes created in init_db
+SEARCH_SOURCES = [
+    ("criminals", "name", "crime"),
+    ("cases", "case_name", "description"),
+    ("evidence", "evidence_type", "description"),
+]
+SEARCH_PAGE_SIZE = 20
+
+def search_records(conn, text, limit=SEARCH_PAGE_SIZE, offset=0):
+    # ranked hits across criminals, cases and evidence: returns (total, [(table, id, title, snippet, score)])
+    return conn.storage.search(conn, text, limit, offset)
+
+# ------------- Bulk import -------------
+def iter_import_rows(path):
+    # streams (line_no, record, raw) from CSV or JSON Lines (optionally .gz);
+    # record is None when the line cannot be parsed
+    opener = gzip.open if path.endswith(".gz") else open
+    base = path[:-3] if path.endswith(".gz") else path
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if base.endswith((".jsonl", ".json", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_no, record if isinstance(record, dict) else None, line.rstrip("\n")
+        else:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record, record
+
+def _import_values(meta, record):
+    # same rules as the add dialog: every field filled, dates as YYYY-MM-DD
+    if record is None:
+        raise ValueError("Unreadable row")
+    row = {str(k).strip().lower().replace(" ","_"): v for k, v in record.items() if k is not None}
+    vals = []
+    for f, col in zip(meta.fields, meta.columns):
+        v = row.get(col)
+        v = v.strip() if isinstance(v, str) else v
+        if v is None or v == "":
+            raise ValueError(f"Missing value for {f}")
+        vals.append(v)
+    try:
+        meta.convert_dates(vals)
+    except ValueError as e:
+        raise ValueError(f"Invalid date for {e} (use YYYY-MM-DD)")
+    if row.get("id") not in (None, ""):
+        vals.insert(0, row["id"])  # keep legacy ids so foreign keys line up
+    return vals
+
+def bulk_import(table_name, path, conn, batch_size=IMPORT_BATCH, reject_path=None, progress=None, stop=None):
+    # streams rows into table_name with executemany + one commit per batch;
+    # rows that fail validation or insertion go to reject_path as JSON Lines
+    meta = TABLES.get(table_name)
+    if meta is None:
+        raise ValueError(f"Unknown table: {table_name}")
+    storage = conn.storage
+    ncols = len(meta.columns)
+    reject_path = reject_path or path + ".rejects.jsonl"
+    stats = {"read": 0, "inserted": 0, "rejected": 0, "seconds": 0.0, "rows_per_sec": 0.0, "reject_file": None}
+    rejects = None
+    start = time.monotonic()
+
+    def reject(line_no, raw, error):
+        nonlocal rejects
+        if rejects is None:
+            rejects = open(reject_path, "w", encoding="utf-8")
+            stats["reject_file"] = reject_path
+        rejects.write(json.dumps({"line": line_no, "error": str(error), "row": raw}, default=str) + "\n")
+        stats["rejected"] += 1
+
+    def tick():
+        stats["seconds"] = time.monotonic() - start
+        stats["rows_per_sec"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+
+    def flush(batch):
+        for with_id, group in ((False, [b for b in batch if len(b[2]) == ncols]),
+                               (True, [b for b in batch if len(b[2]) > ncols])):
+            if not group:
+                continue
+            try:
+                storage.insert_many(conn, table_name, [vals for _, _, vals in group], with_id)
+                conn.commit()
+                stats["inserted"] += len(group)
+            except DB_ERRORS:
+                # isolate the offending rows without failing the whole batch
+                conn.rollback()
+                for line_no, raw, vals in group:
+                    try:
+                        storage.insert_record(conn, table_name, vals, with_id)
+                        stats["inserted"] += 1
+                    except DB_ERRORS as e:
+                        reject(line_no, raw, e)
+                conn.commit()
+        tick()
+        if progress:
+            progress(dict(stats))
+
+    batch = []
+    try:
+        for line_no, record, raw in iter_import_rows(path):
+            if stop is not None and stop.is_set():
+                break
+            stats["read"] += 1
+            try:
+                batch.append((line_no, raw, _import_values(meta, record)))
+            except ValueError as e:
+                reject(line_no, raw, e)
+                continue
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        if rejects is not None:
+            rejects.close()
+        invalidate_caches()
+    tick()
+    return stats
+
+def format_import_stats(stats):
+    return (f"{stats['read']} rows read, {stats['inserted']} inserted, {stats['rejected']} rejected "
+            f"in {stats['seconds']:.1f}s ({stats['rows_per_sec']:.0f} rows/s)")
+
+# ------------- Export -------------
+def export_table(table_name, path, conn, fmt=None, compress=None, since_id=None, chunk_size=EXPORT_CHUNK, progress=None):
+    # streams table_name to CSV or JSON Lines through an unbuffered cursor, chunk_size rows
+    # at a time, so memory stays flat; since_id exports only rows added after a watermark
+    meta = TABLES.get(table_name)
+    if meta is None:
+        raise ValueError(f"Unknown table: {table_name}")
+    cols = ["id"] + meta.columns
+    base = path[:-3] if path.endswith(".gz") else path
+    fmt = fmt or ("jsonl" if base.endswith((".jsonl", ".json", ".ndjson")) else "csv")
+    compress = path.endswith(".gz") if compress is None else compress
+    sql = f"SELECT {', '.join(cols)} FROM {table_name}"
+    params = ()
+    if since_id is not None:
+        sql += " WHERE id > %s"
+        params = (since_id,)
+    sql += " ORDER BY id"
+
+    stats = {"rows": 0, "last_id": since_id, "seconds": 0.0}
+    start = time.monotonic()
+    tmp = path + ".part"  # written aside and renamed, so readers never see half a file
+    opener = gzip.open if compress else open
+    cur = conn.cursor(buffered=False)
+    try:
+        cur.execute(sql, params)
+        with opener(tmp, "wt", encoding="utf-8", newline="") as out:
+            writer = None
+            if fmt == "csv":
+                writer = csv.writer(out)
+                writer.writerow(cols)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if writer is not None:
+                    writer.writerows(rows)
+                else:
+                    out.writelines(json.dumps(dict(zip(cols, r)), default=str) + "\n" for r in rows)
+                stats["rows"] += len(rows)
+                stats["last_id"] = rows[-1][0]
+                if progress:
+                    stats["seconds"] = time.monotonic() - start
+                    progress(dict(stats))
+        os.replace(tmp, path)
+    finally:
+        cur.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    stats["seconds"] = time.monotonic() - start
+    return stats
+
+# ------------- Dashboard counts -------------
+COUNT_TABLES = ("criminals", "officers", "cases", "evidence")
+_counts_cache = {"counts": None, "approximate": frozenset(), "at": 0.0}
+_counts_lock = threading.Lock()
+
+def invalidate_caches():
+    # called after writes so the next dashboard render re-reads the counts and
+    # dossiers are fetched again
+    with _counts_lock:
+        _counts_cache["counts"] = None
+    dossier_cache.clear()
+
+def approximate_tables():
+    with _counts_lock:
+        return _counts_cache["approximate"]
+
+def _query_counts(conn):
+    storage = conn.storage
+    estimates = storage.estimated_counts(conn, COUNT_TABLES) if STATS_CONFIG.get("approximate") else None
+    if estimates is None:
+        return storage.count_records(conn, COUNT_TABLES), frozenset()
+    # estimates are one metadata lookup; only tables under the threshold get an exact COUNT
+    threshold = STATS_CONFIG.get("approximate_threshold", 0)
+    big = frozenset(t for t in COUNT_TABLES if estimates.get(t, 0) >= threshold)
+    counts = {t: estimates.get(t, 0) for t in big}
+    small = [t for t in COUNT_TABLES if t not in big]
+    if small:
+        counts.update(storage.count_records(conn, small))
+    return counts, big
+
+def get_counts(conn=None):
+    # pass a connection when running on a query worker; otherwise one is borrowed here
+    with _counts_lock:
+        cached = _counts_cache["counts"]
+        if cached is not None and time.monotonic() - _counts_cache["at"] < STATS_CONFIG.get("ttl", 0):
+            return dict(cached)
+    counts = {k: 0 for k in COUNT_TABLES}
+    own = conn is None
+    try:
+        if own:
+            conn = get_pool().acquire()
+        counts, approximate = _query_counts(conn)
+        with _counts_lock:
+            _counts_cache.update(counts=dict(counts), approximate=approximate, at=time.monotonic())
+    except Exception:
+        pass
+    finally:
+        if own and conn is not None:
+            conn.close()
+    return counts
+
+def get_fields_for_table(table_name):
+    # display field names for tableview and CRUD forms (see TABLE_FIELDS)
+    meta = TABLES.get(table_name)
+    return meta.fields if meta else []
+
+# ------------- Command line -------------
+# every command reads DB_CONFIG; results go to stdout (CSV, or JSON Lines with --json),
+# progress and errors to stderr. Exit status: 0 ok, 1 partial (rejects, conflicts), 2 error.
+def _print_rows(columns, rows, as_json):
+    if as_json:
+        for row in rows:
+            print(json.dumps(dict(zip(columns, row)), default=str))
+    else:
+        out = csv.writer(sys.stdout)
+        out.writerow(columns)
+        out.writerows(rows)
+
+def _record_args(pairs):
+    # ["name=Ravi", "Crime Date=2024-01-02"] -> {"name": "Ravi", "Crime Date": "2024-01-02"}
+    record = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected column=value, got {pair!r}")
+        record[key] = value
+    return record
+
+def _with_connection(work):
+    conn = get_pool().acquire()
+    try:
+        return work(conn)
+    finally:
+        conn.close()
+        close_pool()
+
+def _attachment_command(args):
+    if args.action == "add":
+        def work(conn):
+            ids = [attach_file(conn, args.evidence_id, path, content_type=args.type) for path in args.paths]
+            conn.commit()
+            return ids
+        for attachment_id in _with_connection(work):
+            print(attachment_id)
+        return 0
+    if args.action == "list":
+        rows = _with_connection(lambda conn: list_attachments(conn, args.evidence_id))
+        _print_rows(ATTACHMENT_FIELDS, rows, args.json)
+        return 0
+    if args.action == "get":
+        row = _with_connection(lambda conn: get_attachment(conn, args.id))
+        if row is None:
+            raise LookupError(f"No attachment with id {args.id}")
+        store = get_attachment_store()
+        if args.out == "-":
+            for chunk in store.read_chunks(row[5]):
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            out = args.out or row[2]
+            store.copy_to(row[5], out)
+            print(f"{format_size(row[4])} written to {out}", file=sys.stderr)
+        return 0
+    if args.action == "delete":
+        def work(conn):
+            deleted = sum(delete_attachment(conn, attachment_id) for attachment_id in args.ids)
+            conn.commit()
+            return deleted
+        print(f"{_with_connection(work)} of {len(args.ids)} attachments deleted", file=sys.stderr)
+        return 0
+    stats = _with_connection(lambda conn: gc_attachments(conn, args.grace))
+    print(f"Removed {stats['files']} unreferenced files ({format_size(stats['bytes'])}) "
+          f"and {stats['partial']} partial uploads", file=sys.stderr)
+    return 0
+
+def cli(argv):
+    parser = argparse.ArgumentParser(prog="crimetrack", description="CrimeTrack command line tools")
+    parser.add_argument("--query-stats", action="store_true", help="print per-statement timings when done")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("list", help="print rows of a table, a page at a time from the database")
+    ls.add_argument("table", choices=COUNT_TABLES)
+    ls.add_argument("--search", default="", help="substring match on the table's text columns")
+    ls.add_argument("--sort", default="id", help="column to sort by")
+    ls.add_argument("--desc", action="store_true")
+    ls.add_argument("--limit", type=int, default=50)
+    ls.add_argument("--archive", action="store_true", help="include archived records (adds an archived column)")
+    ls.add_argument("--json", action="store_true", help="JSON Lines instead of CSV")
+    get = sub.add_parser("get", help="print one record")
+    get.add_argument("table", choices=COUNT_TABLES)
+    get.add_argument("id", type=int)
+    get.add_argument("--json", action="store_true")
+    add = sub.add_parser("add", help="insert a record from column=value pairs; prints its id")
+    add.add_argument("table", choices=COUNT_TABLES)
+    add.add_argument("values", nargs="+", metavar="column=value")
+    upd = sub.add_parser("update", help="change columns of a record")
+    upd.add_argument("table", choices=COUNT_TABLES)
+    upd.add_argument("id", type=int)
+    upd.add_argument("values", nargs="+", metavar="column=value")
+    upd.add_argument("--version", type=int, help="only update while the record is at this version (from get)")
+    dele = sub.add_parser("delete", help="delete records by id (evidence of deleted cases goes with them)")
+    dele.add_argument("table", choices=COUNT_TABLES)
+    dele.add_argument("ids", nargs="+", help="ids, ranges like 10-20, or commas")
+    srch = sub.add_parser("search", help="full-text search across criminals, cases and evidence")
+    srch.add_argument("text")
+    srch.add_argument("--limit", type=int, default=SEARCH_PAGE_SIZE)
+    srch.add_argument("--json", action="store_true")
+    cnt = sub.add_parser("counts", help="print the number of rows in each table")
+    cnt.add_argument("--archive", action="store_true", help="also count the archive tables")
+    cnt.add_argument("--json", action="store_true")
+    imp = sub.add_parser("import", help="bulk-load CSV or JSON Lines into a table")
+    imp.add_argument("table", choices=COUNT_TABLES)
+    imp.add_argument("path")
+    imp.add_argument("--batch", type=int, default=IMPORT_BATCH, help="rows per batch/commit")
+    imp.add_argument("--reject", help="where to write rejected rows (default: <path>.rejects.jsonl)")
+    exp = sub.add_parser("export", help="stream a table to CSV or JSON Lines")
+    exp.add_argument("table", choices=COUNT_TABLES)
+    exp.add_argument("path", help="output file; a .gz suffix enables gzip")
+    exp.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+    exp.add_argument("--gzip", action="store_true", default=None, help="gzip the output")
+    exp.add_argument("--since-id", type=int, help="only rows with id greater than this")
+    exp.add_argument("--watermark", help="file holding the last exported id; read before and updated after the run")
+    sub.add_parser("migrate", help="apply pending schema migrations")
+    sub.add_parser("sync", help="bring the local replica (REPLICA_CONFIG) up to date with the server")
+    rp = sub.add_parser("reports", help="print the dashboard reports")
+    rp.add_argument("--rebuild", action="store_true", help="recount the summary tables from scratch first (e.g. nightly from cron)")
+    aud = sub.add_parser("audit", help="print the audit log of record changes, newest first")
+    aud.add_argument("--user", help="only changes made by this user")
+    aud.add_argument("--table", choices=COUNT_TABLES)
+    aud.add_argument("--id", type=int, help="only this record (needs --table)")
+    aud.add_argument("--since", help="YYYY-MM-DD[ HH:MM[:SS]], UTC")
+    aud.add_argument("--until", help="YYYY-MM-DD[ HH:MM[:SS]], UTC, exclusive; a bare date includes that day")
+    aud.add_argument("--limit", type=int, default=AUDIT_CONFIG.get("page", 100))
+    aud.add_argument("--json", action="store_true")
+    att = sub.add_parser("attachment", help="files attached to evidence (ATTACHMENT_CONFIG store)")
+    att_sub = att.add_subparsers(dest="action", required=True)
+    att_add = att_sub.add_parser("add", help="attach local files to an evidence record; prints their ids")
+    att_add.add_argument("evidence_id", type=int)
+    att_add.add_argument("paths", nargs="+")
+    att_add.add_argument("--type", help="content type (default: from the name and contents)")
+    att_ls = att_sub.add_parser("list", help="print the attachments of an evidence record")
+    att_ls.add_argument("evidence_id", type=int)
+    att_ls.add_argument("--json", action="store_true")
+    att_get = att_sub.add_parser("get", help="copy an attachment out of the store")
+    att_get.add_argument("id", type=int)
+    att_get.add_argument("out", nargs="?", help="output file, - for stdout (default: its filename)")
+    att_del = att_sub.add_parser("delete", help="remove attachments (their files go with the next gc)")
+    att_del.add_argument("ids", nargs="+", type=int)
+    att_gc = att_sub.add_parser("gc", help="remove stored files no attachment refers to")
+    att_gc.add_argument("--grace", type=float, help="seconds an unreferenced file is kept (default: ATTACHMENT_CONFIG)")
+    mt = sub.add_parser("match", help="print existing criminals that look like this person")
+    mt.add_argument("name")
+    mt.add_argument("--age", type=int)
+    mt.add_argument("--gender")
+    mt.add_argument("--threshold", type=float, help=f"default {MATCH_CONFIG.get('threshold')}")
+    mt.add_argument("--json", action="store_true")
+    dd = sub.add_parser("dedup", help="score all criminals for duplicates (parallel) and print the pairs found")
+    dd.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    dd.add_argument("--threshold", type=float, help=f"default {MATCH_CONFIG.get('threshold')}")
+    dd.add_argument("--json", action="store_true")
+    arc = sub.add_parser("archive", help="move old closed criminals and cases (with their evidence) to the archive tables")
+    arc.add_argument("--days", type=int, help=f"age in days (default {ARCHIVE_CONFIG.get('age_days')})")
+    arc.add_argument("--chunk", type=int, help="records per transaction")
+    arc.add_argument("--max-rows", type=int, default=0, help="stop after this many records per table (default: all)")
+    arc.add_argument("--dry-run", action="store_true", help="only count the records that would move")
+    rst = sub.add_parser("restore", help="move archived records back to the live tables")
+    rst.add_argument("table", choices=("criminals", "cases"))
+    rst.add_argument("ids", nargs="+", help="ids, ranges like 10-20, or commas")
+    st = sub.add_parser("stats", help="print the query statistics dumped by the running app")
+    st.add_argument("--file", default=INSTRUMENT_CONFIG.get("dump_file"))
+    st.add_argument("--json", action="store_true", help="print the raw JSON dump")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "stats":
+        if not args.file or not os.path.exists(args.file):
+            print(f"No stats dump found at {args.file}; is the app running with INSTRUMENT_CONFIG['dump_file'] set?", file=sys.stderr)
+            return 1
+        with open(args.file, encoding="utf-8") as f:
+            data = json.load(f)
+        if args.json:
+            print(json.dumps(data, indent=1))
+        else:
+            print(f"written at {data.get('written_at')}")
+            print(format_query_stats(data, data.get("pool")))
+        return 0
+
+    with query_tag(args.command):
+        try:
+            return _run_command(args)
+        except DB_ERRORS + (ValueError, LookupError, OSError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        finally:
+            if args.query_stats:
+                print(format_query_stats(query_stats.snapshot(), pool_stats()), file=sys.stderr)
+
+def _run_command(args):
+    if args.command == "list":
+        pager = RecordPager(args.table, TABLES[args.table].fields, pagesize=min(args.limit, 1000))
+        pager.set_search(args.search)
+        pager.set_sort(args.sort, args.desc)
+        pager.set_include_archive(args.archive)
+        def work(conn):
+            rows, cursor = [], None
+            while len(rows) < args.limit:
+                page, cursor = pager.page_after(conn, cursor)
+                rows += page
+                if cursor is None:
+                    break
+            return rows[:args.limit]
+        _print_rows(pager.columns + (["archived"] if pager.include_archive else []), _with_connection(work), args.json)
+        return 0
+
+    if args.command == "get":
+        found = _with_connection(lambda conn: conn.storage.get_versioned(conn, args.table, args.id))
+        if found is None:
+            raise LookupError(f"No {args.table} record with id {args.id}")
+        _print_rows(["id"] + TABLES[args.table].columns + ["version"], [(args.id,) + found[0] + (found[1],)], args.json)
+        return 0
+
+    if args.command in ("add", "update"):
+        meta = TABLES[args.table]
+        changes = _record_args(args.values)
+        def work(conn):
+            current = None
+            if args.command == "update":
+                found = conn.storage.get_versioned(conn, args.table, args.id)
+                if found is None:
+                    raise LookupError(f"No {args.table} record with id {args.id}")
+                current, version = found
+            vals = record_values(args.table, changes, current)
+            matches = []
+            if args.command == "update":
+                # only the columns that change; with --version only while the row is still at it
+                if args.version is not None and args.version != version:
+                    raise RecordConflict(args.table, args.id, args.version, current, version)
+                conn.storage.update_columns(conn, args.table, args.id, changed_columns(args.table, vals, current),
+                                            args.version)
+                record_id = args.id
+            else:
+                with_id = len(vals) > len(meta.columns)
+                record_id = conn.storage.insert_record(conn, args.table, vals, with_id=with_id)
+                record_id = vals[0] if with_id else record_id
+                if args.table == "criminals" and MATCH_CONFIG.get("check_on_add", True):
+                    matches = find_identity_matches(conn, *vals[with_id:with_id + 3], exclude=record_id)
+                    record_identity_matches(conn, record_id, matches)
+            conn.commit()
+            return record_id, matches
+        try:
+            record_id, matches = _with_connection(work)
+        except RecordConflict as e:
+            print(f"error: {e}", file=sys.stderr)
+            yours = {k.strip().lower().replace(" ", "_"): v for k, v in changes.items()}
+            for column, _, mine, now in record_diff(args.table, yours, e.current):
+                print(f"  {column}: yours {mine!r}, current {now!r}", file=sys.stderr)
+            return 1
+        for score, row in matches:
+            print(f"possible duplicate: {format_match(score, row)}", file=sys.stderr)
+        print(record_id)
+        return 0
+
+    if args.command == "delete":
+        ids = parse_ids(" ".join(args.ids))
+        deleted = _with_connection(lambda conn: run_batch(conn, args.table, "delete", ids=ids))
+        print(f"{deleted} of {len(ids)} {args.table} deleted", file=sys.stderr)
+        return 0
+
+    if args.command == "search":
+        total, rows = _with_connection(lambda conn: search_records(conn, args.text, limit=args.limit))
+        _print_rows(["source", "id", "title", "snippet", "score"], rows, args.json)
+        print(f"{total} matches", file=sys.stderr)
+        return 0
+
+    if args.command == "counts":
+        tables = COUNT_TABLES + (tuple(f"{t}_archive" for t in ARCHIVED_TABLES) if args.archive else ())
+        counts = _with_connection(lambda conn: conn.storage.count_records(conn, tables))
+        if args.json:
+            print(json.dumps(counts))
+        else:
+            _print_rows(["table", "rows"], list(counts.items()), False)
+        return 0
+
+    if args.command == "migrate":
+        conn = get_pool().acquire()
+        try:
+            applied = migrate(conn)
+        finally:
+            conn.close()
+            close_pool()
+        print(f"Applied migrations: {', '.join(map(str, applied))}" if applied else f"Schema is current (version {SCHEMA_VERSION})")
+        return 0
+
+    if args.command == "sync":
+        replica = get_replica() or ReplicaStorage(REPLICA_CONFIG)
+        replica.prepare()
+        conn = get_pool().acquire()
+        try:
+            stats = replica.sync(conn)
+        finally:
+            conn.close()
+            replica.pool.close_all()
+            close_pool()
+        print(format_sync_stats(stats).capitalize(), file=sys.stderr)
+        return 1 if stats["conflicts"] else 0
+
+    if args.command == "reports":
+        conn = get_pool().acquire()
+        try:
+            if args.rebuild:
+                cur = conn.cursor()
+                try:
+                    rebuild_reports(cur, conn.storage)
+                finally:
+                    cur.close()
+                conn.commit()
+            reports = load_reports(conn)
+        finally:
+            conn.close()
+            close_pool()
+        print(format_reports(reports))
+        return 0
+
+    if args.command == "audit":
+        if args.id is not None and args.table is None:
+            raise ValueError("--id needs --table")
+        since, until = audit_bound(args.since), audit_bound(args.until, end=True)
+        def work(conn):
+            rows, cursor = [], None
+            while len(rows) < args.limit:
+                page, cursor = query_audit(conn, args.user, args.table, args.id, since, until, cursor,
+                                           limit=min(args.limit - len(rows), 1000))
+                rows += page
+                if cursor is None:
+                    break
+            return rows
+        rows = [r[:7] + (audit_changes(r),) for r in _with_connection(work)]
+        if not args.json:
+            rows = [r[:7] + (json.dumps(r[7], default=str),) for r in rows]
+        _print_rows(AUDIT_FIELDS[:7] + ["changes"], rows, args.json)
+        return 0
+
+    if args.command == "attachment":
+        return _attachment_command(args)
+
+    if args.command == "match":
+        matches = _with_connection(lambda conn: find_identity_matches(conn, args.name, args.age, args.gender,
+                                                                      threshold=args.threshold))
+        _print_rows(["score", "id"] + TABLES["criminals"].columns, [(score,) + tuple(row) for score, row in matches], args.json)
+        return 0
+
+    if args.command == "dedup":
+        def work(conn):
+            stats = find_duplicates(conn, workers=args.workers, threshold=args.threshold,
+                                    progress=lambda st: print(f"\r{st['blocks']} blocks, {st['pairs']} pairs",
+                                                              end="", file=sys.stderr))
+            return stats, list_identity_matches(conn, limit=10 ** 9)
+        stats, rows = _with_connection(work)
+        print(f"\r{stats['pairs']} pairs from {stats['blocks']} blocks ({stats['entries']} entries, "
+              f"{stats['indexed']} newly keyed) in {stats['seconds']:.1f}s on {stats['workers']} workers", file=sys.stderr)
+        _print_rows(MATCH_FIELDS, rows, args.json)
+        return 0
+
+    if args.command == "archive":
+        def show(stats, end=""):
+            print(f"\r{stats['criminals']} criminals, {stats['cases']} cases ({stats['evidence']} evidence, "
+                  f"{stats['attachments']} attachments)", end=end, file=sys.stderr)
+        stats = _with_connection(lambda conn: archive_records(conn, days=args.days, chunk=args.chunk,
+                                                              max_rows=args.max_rows, dry_run=args.dry_run,
+                                                              progress=show))
+        if args.dry_run:
+            print(f"{stats['criminals']} criminals and {stats['cases']} cases would be archived", file=sys.stderr)
+        else:
+            show(stats, end=" archived\n")
+        return 0
+
+    if args.command == "restore":
+        ids = parse_ids(" ".join(args.ids))
+        stats = _with_connection(lambda conn: restore_records(conn, args.table, ids))
+        print(f"{stats[args.table]} of {len(ids)} {args.table} restored"
+              + (f" ({stats['evidence']} evidence, {stats['attachments']} attachments)" if args.table == "cases" else ""),
+              file=sys.stderr)
+        return 0
+
+    if args.command == "import":
+        conn = get_pool().acquire()
+        try:
+            stats = bulk_import(args.table, args.path, conn, batch_size=args.batch, reject_path=args.reject,
+                                progress=lambda st: print("\r" + format_import_stats(st), end="", file=sys.stderr))
+        finally:
+            conn.close()
+            close_pool()
+        print("\r" + format_import_stats(stats), file=sys.stderr)
+        if stats["reject_file"]:
+            print(f"Rejected rows written to {stats['reject_file']}", file=sys.stderr)
+        return 1 if stats["rejected"] else 0
+
+    if args.command == "export":
+        since_id = args.since_id
+        if since_id is None and args.watermark and os.path.exists(args.watermark):
+            with open(args.watermark, encoding="utf-8") as f:
+                since_id = int(f.read().strip() or 0)
+        conn = get_pool().acquire()
+        try:
+            stats = export_table(args.table, args.path, conn, fmt=args.format, compress=args.gzip, since_id=since_id,
+                                 progress=lambda st: print(f"\r{st['rows']} rows", end="", file=sys.stderr))
+        finally:
+            conn.close()
+            close_pool()
+        print(f"\r{stats['rows']} rows exported to {args.path} in {stats['seconds']:.1f}s (last id: {stats['last_id']})", file=sys.stderr)
+        if args.watermark and stats["last_id"] is not None:
+            with open(args.watermark, "w", encoding="utf-8") as f:
+                f.write(str(stats["last_id"]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(cli(sys.argv[1:]))
@@ -0,0 +1,255 @@
+# loadtest.py
+# Concurrent clients against the HTTP API (api.py): keep-alive connections issuing a mix of
+# list/page/get/counts/search requests, conditional re-GETs and optional writes; reports
+# throughput and p50/p95/p99 latency per endpoint.
+#
+#   python loadtest.py --scale 20000 --clients 32 --duration 15       # seeds SQLite, starts api.py
+#   python loadtest.py --url http://127.0.0.1:8080 --user officer --password secret --writes 0.05
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import benchmark
+import crimetrack
+
+TABLES = ("criminals", "officers", "cases", "evidence")
+SEARCH_WORDS = benchmark.CRIMES + benchmark.EVIDENCE_TYPES + benchmark.LAST_NAMES
+# relative weights of the read mix; "revalidate" re-requests a URL with its last ETag
+MIX = {"list": 25, "next": 15, "get": 25, "counts": 10, "search": 10, "revalidate": 15}
+
+# ------------- HTTP client -------------
+class Client:
+    # one keep-alive HTTP/1.1 connection
+    def __init__(self, host, port, auth):
+        self.host, self.port = host, port
+        self.auth = auth
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = b"" if body is None else json.dumps(body).encode()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(data)}"]
+        if self.auth:
+            lines.append(f"Authorization: Basic {self.auth}")
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+        try:
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("server closed the connection")
+            status = int(status_line.split()[1])
+            reply = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                reply[name.strip().lower()] = value.strip()
+            length = int(reply.get("content-length") or 0)
+            payload = json.loads(await self.reader.readexactly(length)) if length else None
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        if reply.get("connection", "").lower() == "close":
+            self.close()
+        return status, reply, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+# ------------- Workload -------------
+class Stats:
+    def __init__(self):
+        self.latency = {}    # endpoint -> [ms]
+        self.statuses = {}   # status -> count
+        self.errors = 0
+
+    def add(self, endpoint, ms, status):
+        self.latency.setdefault(endpoint, []).append(ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+async def client_loop(client, stats, rng, deadline, sizes, writes):
+    cursors = {}   # table -> next token from its last list page
+    etags = {}     # path -> ETag from its last 200
+    ops, weights = list(MIX), list(MIX.values())
+    while time.perf_counter() < deadline:
+        table = rng.choice(TABLES)
+        method, body, headers = "GET", None, None
+        if rng.random() < writes:
+            if rng.random() < 0.5:
+                endpoint, method, path = "create", "POST", "/api/criminals"
+                body = {"name": f"Load {rng.randrange(10**6)}", "age": rng.randint(18, 70), "gender": "Male",
+                        "crime": rng.choice(benchmark.CRIMES), "crime_date": "2024-01-01", "status": "Wanted"}
+            else:
+                endpoint, method = "update", "PATCH"
+                path = f"/api/criminals/{rng.randint(1, sizes['criminals'])}"
+                body = {"status": rng.choice(("Wanted", "Arrested", "Convicted"))}
+        else:
+            endpoint = rng.choices(ops, weights)[0]
+            if endpoint == "next" and table not in cursors:
+                endpoint = "list"
+            if endpoint == "revalidate" and not etags:
+                endpoint = "get"
+            if endpoint == "list":
+                path = f"/api/{table}?limit={crimetrack.PAGE_SIZE}"
+                if rng.random() < 0.3:
+                    path += f"&search={quote(rng.choice(SEARCH_WORDS))}"
+            elif endpoint == "next":
+                path = f"/api/{table}?limit={crimetrack.PAGE_SIZE}&cursor={cursors.pop(table)}"
+            elif endpoint == "get":
+                path = f"/api/{table}/{rng.randint(1, max(1, sizes[table]))}"
+            elif endpoint == "counts":
+                path = "/api/counts"
+            elif endpoint == "search":
+                path = f"/api/search?q={quote(rng.choice(SEARCH_WORDS))}"
+            else:
+                path = rng.choice(list(etags))
+                headers = {"If-None-Match": etags[path]}
+        start = time.perf_counter()
+        try:
+            status, reply, payload = await client.request(method, path, body, headers)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            stats.errors += 1
+            continue
+        stats.add(endpoint, (time.perf_counter() - start) * 1000.0, status)
+        if status == 200 and method == "GET":
+            if "etag" in reply and len(etags) < 200:
+                etags[path] = reply["etag"]
+            if endpoint in ("list", "next") and payload.get("next"):
+                cursors[table] = payload["next"]
+
+async def run_load(host, port, auth, clients, duration, sizes, writes, seed):
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+    conns = [Client(host, port, auth) for _ in range(clients)]
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(client_loop(c, stats, random.Random(seed + i), deadline, sizes, writes)
+                               for i, c in enumerate(conns)))
+    finally:
+        for c in conns:
+            c.close()
+    return stats, time.perf_counter() - start
+
+async def fetch_counts(host, port, auth):
+    client = Client(host, port, auth)
+    try:
+        status, _, payload = await client.request("GET", "/api/counts")
+    finally:
+        client.close()
+    if status != 200:
+        raise SystemExit(f"GET /api/counts returned {status}: {payload}")
+    return payload
+
+# ------------- Local server -------------
+def seed_database(path, sizes, seed):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    crimetrack.DB_CONFIG["backend"] = "sqlite"
+    crimetrack.DB_CONFIG["sqlite_path"] = path
+    conn = crimetrack.get_pool().acquire()
+    try:
+        crimetrack.migrate(conn)
+        benchmark.populate(conn, sizes, seed)
+        crimetrack.refresh_reports(conn)
+    finally:
+        conn.close()
+        crimetrack.close_pool()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(path, port, workers):
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py"),
+           "--backend", "sqlite", "--sqlite-path", path, "--port", str(port)]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    proc = subprocess.Popen(cmd)
+    for _ in range(100):
+        if proc.poll() is not None:
+            raise SystemExit(f"api.py exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("api.py did not start")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CrimeTrack API load test")
+    parser.add_argument("--url", help="existing API server; without it a seeded SQLite server is started locally")
+    parser.add_argument("--user", default="user1")
+    parser.add_argument("--password", default="pass1")
+    parser.add_argument("--sqlite-path", default="loadtest.db")
+    parser.add_argument("--scale", type=int, default=10000, help="criminal rows to seed (local server only)")
+    parser.add_argument("--workers", type=int, help="api.py query threads (local server only)")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--writes", type=float, default=0.0, help="fraction of requests that create or update")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    auth = base64.b64encode(f"{args.user}:{args.password}".encode()).decode() if args.user else None
+    proc = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        sizes = benchmark.plan_sizes(argparse.Namespace(scale=args.scale, users=10, officers=None, criminals=None,
+                                                        cases=None, evidence=None))
+        print(f"Seeding {args.sqlite_path} ({', '.join(f'{k}={v}' for k, v in sizes.items())})")
+        seed_database(args.sqlite_path, sizes, args.seed)
+        host, port = "127.0.0.1", free_port()
+        proc = start_server(args.sqlite_path, port, args.workers)
+    try:
+        sizes = asyncio.run(fetch_counts(host, port, auth))
+        print(f"Load: {args.clients} clients for {args.duration:g}s against http://{host}:{port}, writes {args.writes:.0%}")
+        stats, elapsed = asyncio.run(run_load(host, port, auth, args.clients, args.duration, sizes,
+                                              args.writes, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    total = sum(len(v) for v in stats.latency.values())
+    results = {}
+    print(f"\n{'endpoint':<12} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, values in sorted(stats.latency.items()):
+        values.sort()
+        results[endpoint] = {"requests": len(values), "p50_ms": _percentile(values, 0.50),
+                             "p95_ms": _percentile(values, 0.95), "p99_ms": _percentile(values, 0.99)}
+        r = results[endpoint]
+        print(f"{endpoint:<12} {r['requests']:>9} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+    print(f"\n{total} requests in {elapsed:.1f}s = {total / elapsed:.0f} req/s; "
+          f"statuses {dict(sorted(stats.statuses.items()))}; connection errors {stats.errors}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"clients": args.clients, "duration": args.duration, "writes": args.writes,
+                                "url": args.url or "local sqlite", "scale": args.scale},
+                       "throughput_rps": total / elapsed, "statuses": stats.statuses,
+                       "errors": stats.errors, "results": results}, f, indent=2)
+    return 0 if not stats.errors and not any(s >= 500 for s in stats.statuses) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+# tests/conftest.py
+# shared fixtures: a throwaway SQLite database behind the real pool and storage classes
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import crimetrack  # noqa: E402
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # points crimetrack at a fresh SQLite file; audit entries are not written
+    monkeypatch.setitem(crimetrack.DB_CONFIG, "backend", "sqlite")
+    monkeypatch.setitem(crimetrack.DB_CONFIG, "sqlite_path", str(tmp_path / "crimetrack.db"))
+    monkeypatch.setitem(crimetrack.AUDIT_CONFIG, "enabled", False)
+    monkeypatch.setattr(crimetrack, "_storage", None)
+    monkeypatch.setattr(crimetrack, "_pool", None)
+    yield crimetrack.get_pool()
+    if crimetrack._pool is not None:
+        crimetrack._pool.close_all()
+    crimetrack.invalidate_caches()
+
+@pytest.fixture
+def conn(db):
+    # a migrated connection, rolled back and returned to the pool afterwards
+    conn = db.acquire()
+    crimetrack.migrate(conn)
+    yield conn
+    conn.close()
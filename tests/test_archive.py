@@ -0,0 +1,70 @@
+# tests/test_archive.py
+import pytest
+
+import crimetrack
+
+TABLES = ("criminals", "cases", "evidence", "attachments")
+
+@pytest.fixture
+def records(conn, monkeypatch):
+    # old closed records, an old Wanted criminal and recent ones; each case has two evidence rows
+    monkeypatch.setitem(crimetrack.ARCHIVE_CONFIG, "pause_ms", 0)
+    st = conn.storage
+    for i, (date, status) in enumerate([("2001-01-01", "Released"), ("2002-01-01", "Wanted"),
+                                        ("2003-01-01", "Convicted"), ("2004-01-01", None),
+                                        ("2999-01-01", "Released"), ("2005-01-01", "Deceased")]):
+        st.insert_record(conn, "criminals", (f"Person {i}", 30 + i, "M", "theft", date, status))
+    oid = st.insert_record(conn, "officers", ("Off", "Sgt", "D1"))
+    for i, date in enumerate(["2001-03-01", "2002-03-01", "2999-03-01"]):
+        cid = st.insert_record(conn, "cases", (f"Case {i}", date, "desc", oid))
+        for kind in ("dna", "photo"):
+            st.insert_record(conn, "evidence", (cid, kind, "ev"))
+    cur = conn.cursor()
+    cur.execute("INSERT INTO attachments (evidence_id, sha256, filename, size) VALUES (1, %s, 'a.txt', 3)", ("a" * 64,))
+    conn.commit()
+    cur.close()
+    return conn
+
+def _rows(conn, table):
+    cur = conn.cursor()
+    cols = ", ".join(crimetrack._archive_columns(table))
+    cur.execute(f"SELECT {cols} FROM {table} UNION ALL SELECT {cols} FROM {table}_archive ORDER BY 1")
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+def _ids(conn, table):
+    cur = conn.cursor()
+    cur.execute(f"SELECT id FROM {table} ORDER BY id")
+    ids = [r[0] for r in cur.fetchall()]
+    cur.close()
+    return ids
+
+def test_archive_and_restore_round_trip(records):
+    conn = records
+    before = {t: _rows(conn, t) for t in TABLES}
+    assert crimetrack.archive_records(conn, days=3650, dry_run=True)["criminals"] == 3
+    stats = crimetrack.archive_records(conn, days=3650, chunk=2)
+    assert stats == {"criminals": 3, "cases": 2, "evidence": 4, "attachments": 1}
+    # the live and archive tiers together still hold every row, unchanged
+    assert {t: _rows(conn, t) for t in TABLES} == before
+    # Wanted, undated-status and recent records stay live; SQLite never reuses the top id
+    assert _ids(conn, "criminals") == [2, 4, 5]
+    assert _ids(conn, "criminals_archive") == [1, 3, 6]
+    assert _ids(conn, "cases") == [3] and _ids(conn, "evidence") == [5, 6]
+    pager = crimetrack.RecordPager("criminals", crimetrack.TABLE_FIELDS["criminals"])
+    pager.set_include_archive(True)
+    assert pager.count(conn) == 6
+    assert crimetrack.archive_records(conn, days=3650) == dict.fromkeys(TABLES, 0)
+
+    assert crimetrack.restore_records(conn, "criminals", [1, 3, 6])["criminals"] == 3
+    assert crimetrack.restore_records(conn, "cases", [1, 2]) == {"criminals": 0, "cases": 2, "evidence": 4,
+                                                                 "attachments": 1}
+    assert {t: _rows(conn, t) for t in TABLES} == before
+    assert all(_ids(conn, t + "_archive") == [] for t in TABLES)
+
+def test_newest_row_stays_live_where_ids_are_reused(records, monkeypatch):
+    conn = records
+    monkeypatch.setattr(conn.storage, "reuses_ids", True)
+    crimetrack.archive_records(conn, days=3650)
+    assert _ids(conn, "criminals") == [2, 4, 5, 6]
@@ -0,0 +1,56 @@
+# tests/test_identity.py
+import pytest
+
+import crimetrack
+
+def test_keys_fold_accents_and_skip_short_tokens():
+    assert crimetrack.name_tokens("José O'Neil-Rao") == ["jose", "oneil", "rao"]
+    assert crimetrack.identity_keys("José", 34, "M") == crimetrack.identity_keys("Jose", 34, "M")
+    # one-letter tokens are not keyed; a name made only of them gets no keys
+    assert crimetrack.identity_keys("J Smith", None, None) == crimetrack.identity_keys("Smith", None, None)
+    assert crimetrack.identity_keys("J K", 30, "M") == []
+
+def test_keys_block_spellings_and_near_ages_together():
+    assert crimetrack.phonetic_code("smith") == crimetrack.phonetic_code("smyth")
+    assert crimetrack.phonetic_code("carl") == crimetrack.phonetic_code("karl")
+    assert set(crimetrack.identity_keys("Jon Smyth", 30, "M")) & set(crimetrack.identity_keys("John Smith", 31, "M"))
+    assert crimetrack.identity_keys("Ann", None, "f") == ["05|F|x"]
+
+def test_known_pair_scores():
+    tolerance = crimetrack.MATCH_CONFIG.get("age_tolerance", 5)
+    def score(a, b):
+        return crimetrack.identity_score(crimetrack._identity_entry(a), crimetrack._identity_entry(b), tolerance)
+    assert score((1, "Jon Smyth", 30, "M"), (2, "John Smith", 31, "M")) == pytest.approx(0.906, abs=1e-3)
+    assert score((1, "Smith John", 30, "M"), (2, "John Smith", 30, "M")) == pytest.approx(1.0)
+    # a shared surname alone stays under the threshold
+    assert score((1, "Jane Smith", 30, "M"), (2, "John Smith", 30, "M")) < crimetrack.MATCH_CONFIG["threshold"]
+
+def _insert(conn, rows):
+    cur = conn.cursor()
+    cur.executemany("INSERT INTO criminals (name, age, gender, crime, crime_date, status) "
+                    "VALUES (%s, %s, %s, 'theft', '2020-01-01', 'Wanted')", rows)
+    cur.execute("DELETE FROM criminal_match_keys")  # as if written by another tool
+    conn.commit()
+    cur.close()
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_find_duplicates_counts_only_newly_keyed(conn, workers):
+    _insert(conn, [("Jon Smyth", 30, "M"), ("John Smith", 31, "M"), ("Q", 40, "F")])
+    stats = crimetrack.find_duplicates(conn, workers=workers)
+    assert stats["indexed"] == 2  # "Q" has no usable token
+    assert [row[1:3] for row in crimetrack.list_identity_matches(conn)] == [(1, "Jon Smyth")]
+    # keys already in place are not new, and the unkeyable row stays uncounted
+    assert crimetrack.find_duplicates(conn, workers=workers)["indexed"] == 0
+
+def test_rekeying_unchanged_criminal_keeps_keys(conn):
+    st = conn.storage
+    rid = st.insert_record(conn, "criminals", ("Jon Smyth", 30, "M", "theft", "2020-01-01", "Wanted"))
+    conn.commit()
+    cur = conn.cursor()
+    cur.execute("SELECT match_key FROM criminal_match_keys WHERE criminal_id = %s ORDER BY match_key", (rid,))
+    keys = cur.fetchall()
+    st.reindex_identities(conn, "id = %s", (rid,))
+    cur.execute("SELECT match_key FROM criminal_match_keys WHERE criminal_id = %s ORDER BY match_key", (rid,))
+    assert cur.fetchall() == keys
+    assert crimetrack.backfill_identity_keys(cur, st) == 0
+    cur.close()
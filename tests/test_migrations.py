@@ -0,0 +1,38 @@
+# tests/test_migrations.py
+import pytest
+
+import crimetrack
+
+def test_fresh_database_applies_every_migration_once(db):
+    conn = db.acquire()
+    try:
+        assert crimetrack.migrate(conn) == [v for v, _, _ in crimetrack.MIGRATIONS]
+        assert crimetrack.migrate(conn) == []
+        cur = conn.cursor()
+        cur.execute("SELECT version FROM schema_version ORDER BY version")
+        assert [r[0] for r in cur.fetchall()] == list(range(1, crimetrack.SCHEMA_VERSION + 1))
+        cur.close()
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize("pinned", [1, 5, 9])
+def test_upgrade_from_intermediate_version(db, monkeypatch, pinned):
+    conn = db.acquire()
+    try:
+        # an older release: only the migrations it shipped with
+        with monkeypatch.context() as m:
+            m.setattr(crimetrack, "MIGRATIONS", crimetrack.MIGRATIONS[:pinned])
+            m.setattr(crimetrack, "SCHEMA_VERSION", pinned)
+            assert crimetrack.migrate(conn) == list(range(1, pinned + 1))
+        cur = conn.cursor()
+        cur.execute("INSERT INTO criminals (name, age, gender, crime, crime_date, status) "
+                    "VALUES ('Jon Smyth', 31, 'M', 'theft', '2001-02-03', 'Released')")
+        conn.commit()
+        assert crimetrack.migrate(conn) == list(range(pinned + 1, crimetrack.SCHEMA_VERSION + 1))
+        assert crimetrack.migrate(conn) == []
+        # rows written before the upgrade survive it
+        cur.execute("SELECT name, version FROM criminals")
+        assert cur.fetchall() == [("Jon Smyth", 1)]
+        cur.close()
+    finally:
+        conn.close()
@@ -0,0 +1,41 @@
+# tests/test_versions.py
+import pytest
+
+import crimetrack
+
+ROW = ("Ann Lee", 30, "F", "fraud", "2020-01-02", "Wanted")
+
+def test_fresh_version_updates_and_bumps(conn):
+    st = conn.storage
+    rid = st.insert_record(conn, "criminals", ROW)
+    conn.commit()
+    row, version = st.get_versioned(conn, "criminals", rid)
+    assert st.update_columns(conn, "criminals", rid, {"status": "Arrested"}, version) == 1
+    conn.commit()
+    row, now = st.get_versioned(conn, "criminals", rid)
+    assert now == version + 1
+    assert row[5] == "Arrested"
+
+def test_stale_version_raises_with_current_row(conn):
+    st = conn.storage
+    rid = st.insert_record(conn, "criminals", ROW)
+    conn.commit()
+    _, version = st.get_versioned(conn, "criminals", rid)
+    st.update_columns(conn, "criminals", rid, {"crime": "theft"}, version)  # someone else saves first
+    conn.commit()
+    with pytest.raises(crimetrack.RecordConflict) as info:
+        st.update_record(conn, "criminals", rid, ("Ann Lee", 31, "F", "fraud", "2020-01-02", "Wanted"), version)
+    assert info.value.version == version
+    assert info.value.current_version == version + 1
+    assert info.value.current[3] == "theft"
+    # nothing of the stale write landed
+    assert st.get_versioned(conn, "criminals", rid)[0][1] == 30
+
+def test_record_diff_lists_only_changed_fields():
+    theirs = ("Ann Lee", 30, "F", "theft", "2020-01-02", "Wanted")
+    assert crimetrack.record_diff("criminals", {"age": "30", "status": "Wanted"}, theirs) == []
+    assert crimetrack.record_diff("criminals", {"age": "31"}, theirs) == [("age", None, "31", 30)]
+    # with base: your edit and the field someone else changed since you loaded the row
+    base = dict(zip(crimetrack.TABLES["criminals"].columns, ("Ann Lee", 30, "F", "fraud", "2020-01-02", "Wanted")))
+    assert crimetrack.record_diff("criminals", {"status": "Arrested"}, theirs, base) == [
+        ("crime", "fraud", "fraud", "theft"), ("status", "Wanted", "Arrested", "Wanted")]